@@ -1,16 +1,35 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 from io import BytesIO
 import datetime
 
-from data.sheets import read_tab, append_df
+from data.drivers import get_driver_registry
+from data.keys import rebuild_all_keys
+from data.storage import load_tabs, read_tab_week, get_stats, PartialAppendError
 from processing.disponibilidade import processar_disponibilidade
 from processing.carregamento import processar_carregamento
 from processing.devolucoes import processar_devolucoes
 from processing.cancelamento import processar_cancelamento
 from processing.recusas import processar_recusas
-from metrics.rodizio import consolidar_rodizio
+from processing.blocos import processar_em_blocos
+from processing.gravacao import gravar_novos
+from metrics.agregados import (
+    AGREGADORES,
+    reconstruir_agregados,
+    recalcular_semana,
+    revisao_agregados,
+    cubo_rodizio
+)
+from metrics.rodizio import fatiar_semana
+from utils.arquivos import ler_arquivo, ler_arquivo_em_blocos
+from utils.dates import coletar_avisos_datas
+from utils.perf import (
+    iniciar_coleta,
+    resumo,
+    exportar_jsonl,
+    iniciar_perfil,
+    encerrar_perfil
+)
 from config.settings import *
 
 # =====================================================
@@ -19,6 +38,10 @@ from config.settings import *
 st.set_page_config(layout="wide")
 st.title("📊 Rodízio Semanal")
 
+# spans de tempo desta execução do script (+ cProfile com RODIZIO_PROFILE=1)
+spans = iniciar_coleta()
+perfil = iniciar_perfil()
+
 # =====================================================
 # HELPERS
 # =====================================================
@@ -28,199 +51,331 @@ def ensure_df(df):
     return pd.DataFrame() if df is None else pd.DataFrame(df)
 
 
-def ler_arquivo(file):
-    return pd.read_csv(file) if file.name.endswith(".csv") else pd.read_excel(file)
+def avisar_falha_agregados(nome_tab, erro):
+    st.warning("⚠️ Dados salvos, mas os agregados do rodízio não foram atualizados (use 🔄 Recalcular)")
+    st.exception(erro)
 
 
-def preparar_para_sheets(df):
-    """🔥 FUNÇÃO CRÍTICA - evita erro de JSON"""
-    if df is None or df.empty:
-        return pd.DataFrame()
+def barra_de_progresso():
+    barra = st.progress(0.0)
 
-    df = df.copy()
-    df = df.replace([np.nan, None], "")
-    df = df.replace([np.inf, -np.inf], "")
-    df = df.astype(str)
+    def progress(enviadas, total):
+        barra.progress(enviadas / total, text=f"📤 {enviadas}/{total} linhas enviadas")
 
-    return df
+    return barra, progress
 
 
 def salvar_no_sheets(nome_tab, df):
-    """Centraliza append + tratamento"""
-    df = preparar_para_sheets(df)
-
-    if df.empty:
+    """Centraliza filtro de duplicados + append + tratamento"""
+    if df is None or df.empty:
         st.warning("⚠️ Nenhum dado válido para salvar")
         return
 
+    barra, progress = barra_de_progresso()
+
     try:
-        append_df(nome_tab, df)
-        st.success(f"✅ {len(df)} registros salvos com sucesso")
+        salvos = gravar_novos(nome_tab, df, progress, avisar_falha_agregados)
+    except PartialAppendError as e:
+        if nome_tab in NATURAL_KEYS:
+            st.error(f"❌ Envio interrompido: {e.rows_sent} registros foram salvos; reenvie o arquivo para gravar o restante")
+        else:
+            st.error(f"❌ Envio interrompido: {e.rows_sent} registros foram salvos; reenviar o arquivo duplica esses registros")
+        st.exception(e)
+        return
     except Exception as e:
         st.error("❌ Erro ao salvar no Google Sheets")
         st.exception(e)
+        return
+    finally:
+        barra.empty()
 
+    if salvos == 0:
+        st.warning("⚠️ Nenhum registro novo (todos já estavam salvos)")
+    else:
+        st.success(f"✅ {salvos} registros salvos com sucesso")
 
-def botao_modelo(df_modelo, nome_arquivo, label):
-    buffer = BytesIO()
-    df_modelo.to_excel(buffer, index=False, engine="openpyxl")
-    buffer.seek(0)
-
-    st.download_button(label, buffer, nome_arquivo)
 
+def salvar_em_blocos(nome_tab, blocos):
+    """Mesmo fluxo do salvar_no_sheets, gravando bloco a bloco"""
+    progresso = st.empty()
+    barra, progress = barra_de_progresso()
+    i = lidos = salvos = 0
+    invalidas = []
 
-# =====================================================
-# BASES
-# =====================================================
-try:
-    base_motoristas = ensure_df(read_tab(BASE_MOTORISTAS_TAB))
-    base_regiao = ensure_df(read_tab(BASE_REGIAO_TAB))
-except:
-    st.error("❌ Erro ao conectar com Google Sheets")
-    st.stop()
+    try:
+        for i, df in enumerate(blocos, start=1):
+            inv = df.attrs.pop("linhas_invalidas", None)
+            if inv is not None and not inv.empty:
+                invalidas.append(inv)
 
-# =====================================================
-# MENU
-# =====================================================
-menu = st.sidebar.selectbox("Menu", [
-    "Upload disponibilidade",
-    "Upload carregamento",
-    "Upload devolucoes",
-    "Upload cancelamento",
-    "Upload recusas",
-    "Rodízio (visualização)"
-])
+            lidos += len(df)
+            if not df.empty:
+                salvos += gravar_novos(nome_tab, df, progress, avisar_falha_agregados)
 
-# =====================================================
-# UPLOAD
-# =====================================================
-arquivo = None
-
-if menu == "Upload devolucoes":
-    modelo = pd.DataFrame({
-        "Driver ID": [""],
-        "Driver Name": [""],
-        "qtd_pacotes": [""],
-        "data": [datetime.datetime.now().strftime("%d/%m/%Y")]
-    })
-    botao_modelo(modelo, "modelo_devolucoes.xlsx", "⬇️ Baixar modelo")
-
-elif menu == "Upload cancelamento":
-    modelo = pd.DataFrame({
-        "Driver ID": [""],
-        "Driver Name": [""],
-        "Data": [datetime.datetime.now().strftime("%d/%m/%Y")],
-        "Turno": ["AM"]
-    })
-    botao_modelo(modelo, "modelo_cancelamento.xlsx", "⬇️ Baixar modelo")
-
-arquivo = st.file_uploader("Upload de arquivo", type=["csv", "xlsx"])
+            progresso.info(f"⏳ Bloco {i}: {lidos} linhas processadas, {salvos} registros novos salvos")
+    except Exception as e:
+        if isinstance(e, PartialAppendError):
+            salvos += e.rows_sent
 
-# =====================================================
-# PROCESSAMENTO
-# =====================================================
-if arquivo and menu != "Rodízio (visualização)":
-    df = ler_arquivo(arquivo)
+        if nome_tab in NATURAL_KEYS:
+            st.error(f"❌ Erro no bloco {i}; {salvos} registros já tinham sido salvos (reenviar o arquivo não duplica)")
+        else:
+            st.error(f"❌ Erro no bloco {i}; {salvos} registros já tinham sido salvos (reenviar o arquivo duplica esses registros)")
+        st.exception(e)
+        return
+    finally:
+        barra.empty()
+        if invalidas:
+            aviso = pd.DataFrame()
+            aviso.attrs["linhas_invalidas"] = pd.concat(invalidas, ignore_index=True)
+            avisar_linhas_invalidas(aviso)
 
-    try:
-        if menu == "Upload disponibilidade":
-            df = processar_disponibilidade(df, base_motoristas, base_regiao)
-            salvar_no_sheets(DISPONIBILIDADE_TAB, df)
+    progresso.empty()
 
-        elif menu == "Upload carregamento":
-            df_novo = processar_carregamento(df, base_motoristas)
+    if salvos == 0:
+        st.warning("⚠️ Nenhum registro novo (todos já estavam salvos)")
+    else:
+        st.success(f"✅ {salvos} registros salvos com sucesso")
 
-            df_existente = ensure_df(read_tab(CARREGAMENTO_TAB))
 
-            if not df_existente.empty:
-                df_existente.columns = df_existente.columns.str.strip().str.lower()
+def avisar_linhas_invalidas(df):
+    """Mostra de uma vez as linhas que o processamento descartou"""
+    invalidas = df.attrs.pop("linhas_invalidas", None)
 
-                df_existente["task_id"] = df_existente["task_id"].astype(str).str.replace(r"\.0$", "", regex=True)
-                df_novo["task_id"] = df_novo["task_id"].astype(str).str.replace(r"\.0$", "", regex=True)
+    if invalidas is None or invalidas.empty:
+        return
 
-                df_novo = df_novo[~df_novo["task_id"].isin(df_existente["task_id"])]
+    st.warning(f"⚠️ {len(invalidas)} linhas ignoradas por formato não reconhecido")
+    with st.expander("Ver linhas ignoradas"):
+        st.dataframe(invalidas, use_container_width=True)
 
-            if df_novo.empty:
-                st.warning("⚠️ Nenhuma AT nova")
-            else:
-                salvar_no_sheets(CARREGAMENTO_TAB, df_novo)
 
-        elif menu == "Upload devolucoes":
-            df = processar_devolucoes(df, base_motoristas)
-            salvar_no_sheets(DEVOLUCOES_TAB, df)
+def avisar_datas(avisos):
+    """Datas ambíguas ou inválidas do upload, um aviso por coluna"""
+    for aviso in dict.fromkeys(avisos):
+        st.warning(f"⚠️ {aviso}")
 
-        elif menu == "Upload cancelamento":
-            df = processar_cancelamento(df)
-            salvar_no_sheets(CANCELAMENTO_TAB, df)
 
-        elif menu == "Upload recusas":
-            df = processar_recusas(df, base_motoristas)
-            salvar_no_sheets(RECUSAS_TAB, df)
+def botao_modelo(df_modelo, nome_arquivo, label):
+    buffer = BytesIO()
+    df_modelo.to_excel(buffer, index=False, engine="openpyxl")
+    buffer.seek(0)
 
-    except Exception as e:
-        st.error("❌ Erro no processamento")
-        st.exception(e)
+    st.download_button(label, buffer, nome_arquivo)
 
-# =====================================================
-# NORMALIZAR SEMANA
-# =====================================================
-def normalizar_semana(df):
-    if df.empty or "semana" not in df.columns:
-        return df
 
-    df = df.copy()
+@st.cache_data(show_spinner=False, max_entries=4)
+def carregar_cubo(revisao, dia, base_motoristas):
+    """Cubo semana × driver; recalcula quando os agregados mudam ou o dia
+    vira (dias_sem_carregar)"""
+    return cubo_rodizio(base_motoristas)
 
-    def normalizar(valor, data):
-        if pd.isna(valor):
-            return None
 
-        valor = str(valor).strip()
+# o st.stop() encerra o script por exceção: o finally desliga o cProfile
+# mesmo assim
+try:
+    # =====================================================
+    # BASES
+    # =====================================================
+    try:
+        bases = load_tabs([BASE_MOTORISTAS_TAB, BASE_REGIAO_TAB])
+        base_motoristas = ensure_df(bases[BASE_MOTORISTAS_TAB])
+        base_regiao = ensure_df(bases[BASE_REGIAO_TAB])
+        # turno/CEP dos uploads: refeito só quando a aba base_motoristas muda
+        registro = get_driver_registry()
+    except:
+        st.error("❌ Erro ao conectar com Google Sheets")
+        st.stop()
 
-        if "-W" in valor:
-            return valor
+    # =====================================================
+    # MENU
+    # =====================================================
+    menu = st.sidebar.selectbox("Menu", [
+        "Upload disponibilidade",
+        "Upload carregamento",
+        "Upload devolucoes",
+        "Upload cancelamento",
+        "Upload recusas",
+        "Rodízio (visualização)"
+    ])
+
+    with st.sidebar.expander("🔌 Armazenamento"):
+        st.json(get_stats())
+
+        # linhas apagadas/editadas direto no Sheets: o índice não fica sabendo
+        if st.button("♻️ Refazer índice de duplicados"):
+            try:
+                rebuild_all_keys()
+                st.success("✅ Índice refeito a partir do Sheets")
+            except Exception as e:
+                st.error("❌ Erro ao refazer o índice (ele não foi alterado)")
+                st.exception(e)
+
+    # =====================================================
+    # UPLOAD
+    # =====================================================
+    arquivo = None
+
+    if menu == "Upload devolucoes":
+        modelo = pd.DataFrame({
+            "Driver ID": [""],
+            "Driver Name": [""],
+            "qtd_pacotes": [""],
+            "data": [datetime.datetime.now().strftime("%d/%m/%Y")]
+        })
+        botao_modelo(modelo, "modelo_devolucoes.xlsx", "⬇️ Baixar modelo")
+        st.caption("ℹ️ Devoluções não são conferidas contra o que já foi salvo: não reenvie o mesmo arquivo")
+
+    elif menu == "Upload cancelamento":
+        modelo = pd.DataFrame({
+            "Driver ID": [""],
+            "Driver Name": [""],
+            "Data": [datetime.datetime.now().strftime("%d/%m/%Y")],
+            "Turno": ["AM"]
+        })
+        botao_modelo(modelo, "modelo_cancelamento.xlsx", "⬇️ Baixar modelo")
+
+    arquivo = st.file_uploader("Upload de arquivo", type=["csv", "xlsx"])
+
+    # =====================================================
+    # PROCESSAMENTO
+    # =====================================================
+    PROCESSADORES = {
+        "Upload disponibilidade": (DISPONIBILIDADE_TAB, processar_disponibilidade, (registro, base_regiao)),
+        "Upload carregamento": (CARREGAMENTO_TAB, processar_carregamento, (registro,)),
+        "Upload devolucoes": (DEVOLUCOES_TAB, processar_devolucoes, (registro,)),
+        "Upload cancelamento": (CANCELAMENTO_TAB, processar_cancelamento, ()),
+        "Upload recusas": (RECUSAS_TAB, processar_recusas, (registro,)),
+    }
+
+    if arquivo and menu in PROCESSADORES:
+        nome_tab, processar, args = PROCESSADORES[menu]
+
+        with coletar_avisos_datas() as avisos:
+            try:
+                if arquivo.size >= STREAMING_MIN_BYTES:
+                    # arquivo grande: lê, processa e grava um bloco por vez
+                    blocos = ler_arquivo_em_blocos(arquivo, STREAMING_CHUNK_ROWS)
+                    salvar_em_blocos(nome_tab, processar_em_blocos(processar, blocos, *args))
+                else:
+                    df = processar(ler_arquivo(arquivo), *args)
+                    avisar_linhas_invalidas(df)
+                    salvar_no_sheets(nome_tab, df)
+
+            except Exception as e:
+                st.error("❌ Erro no processamento")
+                st.exception(e)
+
+        avisar_datas(avisos)
+
+    # =====================================================
+    # RODÍZIO
+    # =====================================================
+    if menu == "Rodízio (visualização)":
+
+        if st.button("🔄 Recalcular agregados"):
+            try:
+                reconstruir_agregados()
+            except Exception as e:
+                st.error("❌ Erro ao ler o histórico; os agregados não foram alterados")
+                st.exception(e)
 
         try:
-            ano = pd.to_datetime(data, dayfirst=True).year if pd.notna(data) else datetime.datetime.now().year
-            semana = int(valor)
-            return f"{ano}-W{str(semana).zfill(2)}"
-        except:
-            return None
-
-    df["semana"] = df.apply(lambda r: normalizar(r["semana"], r.get("data")), axis=1)
-    return df
+            cubo = carregar_cubo(revisao_agregados(), datetime.date.today(), base_motoristas)
+        except Exception as e:
+            st.error("❌ Erro ao montar os agregados do rodízio")
+            st.exception(e)
+            st.stop()
+
+        if cubo.empty:
+            st.warning("Nenhuma disponibilidade cadastrada")
+            st.stop()
+
+        semanas = sorted(cubo["semana"].unique())
+        semana_sel = st.selectbox("Selecione a semana", semanas)
+
+        if st.button("🔄 Recalcular semana"):
+            # lê só as linhas da semana (índice de faixas), não o histórico
+            try:
+                recalcular_semana(semana_sel)
+                cubo = carregar_cubo(revisao_agregados(), datetime.date.today(), base_motoristas)
+            except Exception as e:
+                st.error("❌ Erro ao ler a semana; os agregados não foram alterados")
+                st.exception(e)
+
+        rodizio = fatiar_semana(cubo, semana_sel)
+
+        st.subheader(f"📅 Rodízio – Semana {semana_sel}")
+        st.dataframe(rodizio, use_container_width=True)
+
+        st.download_button(
+            "📥 Exportar CSV",
+            rodizio.to_csv(index=False).encode("utf-8"),
+            f"rodizio_{semana_sel}.csv"
+        )
+
+        with st.expander("📈 Comparar semanas"):
+            comparativo = cubo.assign(
+                ativo=(cubo["status_rodizio"] == "ATIVO").astype(int)
+            ).groupby("semana").agg(
+                motoristas_ativos=("ativo", "sum"),
+                disponibilidades=("disp_total", "sum"),
+                carregamentos=("carg_total", "sum"),
+                recusas=("recusas", "sum"),
+                cancelamentos=("cancelamentos", "sum"),
+                devolucoes=("devolucoes", "sum")
+            )
+            st.dataframe(comparativo, use_container_width=True)
+
+        if st.checkbox("🔎 Registros da semana"):
+            aba = st.selectbox("Aba", list(AGREGADORES))
+            try:
+                st.dataframe(read_tab_week(aba, semana_sel), use_container_width=True)
+            except Exception as e:
+                st.error(f"❌ Erro ao ler a aba '{aba}'")
+                st.exception(e)
+
+finally:
+    if perfil is not None:
+        st.session_state["perfil"] = encerrar_perfil(perfil)
 
 # =====================================================
-# RODÍZIO
+# DESEMPENHO (OPCIONAL)
 # =====================================================
-if menu == "Rodízio (visualização)":
-
-    disp = normalizar_semana(ensure_df(read_tab(DISPONIBILIDADE_TAB)))
-    carg = normalizar_semana(ensure_df(read_tab(CARREGAMENTO_TAB)))
-    dev  = normalizar_semana(ensure_df(read_tab(DEVOLUCOES_TAB)))
-    canc = normalizar_semana(ensure_df(read_tab(CANCELAMENTO_TAB)))
-    rec  = normalizar_semana(ensure_df(read_tab(RECUSAS_TAB)))
-
-    if disp.empty:
-        st.warning("Nenhuma disponibilidade cadastrada")
-        st.stop()
-
-    semanas = sorted(disp["semana"].dropna().unique())
-    semana_sel = st.selectbox("Selecione a semana", semanas)
-
-    rodizio = consolidar_rodizio(
-        disp[disp["semana"] == semana_sel],
-        carg[carg["semana"] == semana_sel],
-        dev[dev["semana"] == semana_sel],
-        canc[canc["semana"] == semana_sel],
-        rec[rec["semana"] == semana_sel],
-        base_motoristas
-    )
-
-    st.subheader(f"📅 Rodízio – Semana {semana_sel}")
-    st.dataframe(rodizio, use_container_width=True)
-
-    st.download_button(
-        "📥 Exportar CSV",
-        rodizio.to_csv(index=False).encode("utf-8"),
-        f"rodizio_{semana_sel}.csv"
-    )
+if spans:
+    # últimas execuções da sessão; um clique no painel não apaga a do upload
+    execucoes = st.session_state.setdefault("execucoes", [])
+    execucoes.append((f"{datetime.datetime.now():%H:%M:%S} · {menu}", spans))
+    del execucoes[:-10]
+
+if st.sidebar.checkbox("⏱️ Desempenho por etapa"):
+    execucoes = st.session_state.get("execucoes", [])
+
+    with st.sidebar:
+        if not execucoes:
+            st.caption("Nenhuma etapa medida ainda")
+        else:
+            escolhida = st.selectbox(
+                "Execução",
+                range(len(execucoes) - 1, -1, -1),
+                format_func=lambda i: execucoes[i][0]
+            )
+            ultimos = execucoes[escolhida][1]
+
+            tabela = resumo(ultimos)
+            tabela["etapa"] = tabela["nivel"].map(lambda n: "  " * n) + tabela["etapa"]
+            st.dataframe(
+                tabela[["etapa", "segundos", "linhas_entrada", "linhas", "bytes"]],
+                use_container_width=True,
+                hide_index=True
+            )
+            st.download_button(
+                "📥 Exportar JSONL",
+                exportar_jsonl(ultimos).encode("utf-8"),
+                "desempenho.jsonl"
+            )
+
+        if "perfil" in st.session_state:
+            with st.expander("cProfile"):
+                st.caption(st.session_state["perfil"]["arquivo"])
+                st.code(st.session_state["perfil"]["top"])
@@ -0,0 +1,252 @@
+"""
+Benchmark de cada etapa do pipeline com dados sintéticos (benchmarks/gerador.py):
+tempo de parede e pico de memória (tracemalloc) por etapa e tamanho,
+comparados com o baseline gravado em benchmarks/baseline.json.
+
+Roda offline: nada aqui fala com o Sheets.
+
+Uso (da raiz do projeto):
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --linhas 1000 100000 --etapas carregamento recusas
+    python -m benchmarks.bench_pipeline --salvar-baseline
+    python -m benchmarks.bench_pipeline --falhar-se-regredir --tolerancia 0.3
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import time
+import tracemalloc
+import warnings
+
+from benchmarks.gerador import (
+    gerar_base_motoristas,
+    gerar_base_regiao,
+    gerar_upload_disponibilidade,
+    gerar_upload_carregamento,
+    gerar_upload_recusas,
+    gerar_upload_devolucoes,
+    gerar_upload_cancelamento,
+    gerar_historico,
+    n_motoristas
+)
+from processing.disponibilidade import processar_disponibilidade
+from processing.carregamento import processar_carregamento
+from processing.recusas import processar_recusas
+from processing.devolucoes import processar_devolucoes
+from processing.cancelamento import processar_cancelamento
+from config.settings import APPEND_MAX_ROWS, APPEND_MAX_BYTES
+from data.drivers import DriverRegistry
+from data.serializer import row_batches
+from data.sheets import _values_to_df
+from metrics.rodizio import consolidar_rodizio, consolidar_rodizio_multi
+from utils.arquivos import ler_arquivo
+
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+class ArquivoEmMemoria(io.BytesIO):
+    """Imita o UploadedFile do Streamlit (name + size)."""
+
+    def __init__(self, conteudo, name):
+        super().__init__(conteudo)
+        self.name = name
+        self.size = len(conteudo)
+
+
+# =====================================================
+# ETAPAS
+# =====================================================
+# Cada etapa recebe n e devolve (função a medir, argumentos). A geração
+# dos dados fica fora da medição.
+def _bases(n):
+    return gerar_base_motoristas(n_motoristas(n)), gerar_base_regiao()
+
+
+def _registro(n):
+    # como no app: o cadastro é montado uma vez, fora de cada upload
+    return DriverRegistry(gerar_base_motoristas(n_motoristas(n)))
+
+
+def etapa_leitura_csv(n):
+    csv = gerar_upload_carregamento(n).to_csv(index=False).encode()
+    return lambda: ler_arquivo(ArquivoEmMemoria(csv, "carregamento.csv")), ()
+
+
+def etapa_leitura_sheets(n):
+    # values como o values_batch_get devolve: texto, sem as vazias do fim
+    df = gerar_upload_carregamento(n).astype(str)
+    values = [df.columns.tolist()] + df.values.tolist()
+    return _values_to_df, (values,)
+
+
+def etapa_serializacao(n):
+    # payload do append (todos os batches), a partir do frame processado
+    base, _ = _bases(n)
+    df = processar_carregamento(gerar_upload_carregamento(n), base)
+
+    def serializar():
+        for _ in row_batches(df, APPEND_MAX_ROWS, APPEND_MAX_BYTES):
+            pass
+
+    return serializar, ()
+
+
+def etapa_cadastro_motoristas(n):
+    base, _ = _bases(n)
+    return DriverRegistry, (base,)
+
+
+def etapa_disponibilidade(n):
+    upload = gerar_upload_disponibilidade(n)
+    return processar_disponibilidade, (upload, _registro(n), gerar_base_regiao())
+
+
+def etapa_carregamento(n):
+    return processar_carregamento, (gerar_upload_carregamento(n), _registro(n))
+
+
+def etapa_recusas(n):
+    return processar_recusas, (gerar_upload_recusas(n), _registro(n))
+
+
+def etapa_devolucoes(n):
+    return processar_devolucoes, (gerar_upload_devolucoes(n), _registro(n))
+
+
+def etapa_cancelamento(n):
+    return processar_cancelamento, (gerar_upload_cancelamento(n),)
+
+
+def etapa_consolidar_rodizio(n):
+    base, _ = _bases(n)
+    return consolidar_rodizio, (*gerar_historico(n, semanas=1), base)
+
+
+def etapa_consolidar_rodizio_multi(n):
+    base, _ = _bases(n)
+    return consolidar_rodizio_multi, (*gerar_historico(n, semanas=8), base)
+
+
+ETAPAS = {
+    "leitura_csv": etapa_leitura_csv,
+    "leitura_sheets": etapa_leitura_sheets,
+    "cadastro_motoristas": etapa_cadastro_motoristas,
+    "disponibilidade": etapa_disponibilidade,
+    "carregamento": etapa_carregamento,
+    "recusas": etapa_recusas,
+    "devolucoes": etapa_devolucoes,
+    "cancelamento": etapa_cancelamento,
+    "consolidar_rodizio": etapa_consolidar_rodizio,
+    "consolidar_rodizio_multi": etapa_consolidar_rodizio_multi,
+    "serializacao": etapa_serializacao,
+}
+
+
+# =====================================================
+# MEDIÇÃO
+# =====================================================
+def medir(func, args, repeticoes):
+    """Melhor tempo de `repeticoes` execuções + pico de memória de uma execução à parte."""
+    tempos = []
+    for _ in range(repeticoes):
+        gc.collect()
+        inicio = time.perf_counter()
+        func(*args)
+        tempos.append(time.perf_counter() - inicio)
+
+    # tracemalloc deixa tudo mais lento, então fica fora da medição de tempo
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"segundos": round(min(tempos), 4), "pico_mb": round(pico / 2**20, 2)}
+
+
+def carregar_baseline():
+    if not os.path.exists(BASELINE):
+        return {}
+
+    with open(BASELINE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def salvar_baseline(resultados):
+    baseline = carregar_baseline()
+    baseline.update(resultados)
+
+    with open(BASELINE, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(baseline.items())), f, indent=2)
+        f.write("\n")
+
+
+def _variacao(atual, anterior):
+    if not anterior:
+        return None
+    return atual / anterior - 1
+
+
+def _fmt_variacao(v):
+    return "-" if v is None else f"{v:+.0%}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--linhas", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--etapas", nargs="+", choices=list(ETAPAS), default=list(ETAPAS))
+    parser.add_argument("--repeticoes", type=int, default=3, help="tempo = melhor de N execuções")
+    parser.add_argument("--salvar-baseline", action="store_true", help="grava os resultados como novo baseline")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="piora relativa aceita (0.25 = 25%%)")
+    parser.add_argument("--falhar-se-regredir", action="store_true", help="sai com código 1 se alguma etapa piorar além da tolerância")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", UserWarning)
+
+    baseline = carregar_baseline()
+    resultados = {}
+    regressoes = []
+
+    print(f"{'etapa':<26} {'linhas':>9} {'tempo (s)':>10} {'Δ tempo':>8} {'pico (MB)':>10} {'Δ pico':>8}")
+
+    for etapa in args.etapas:
+        for n in args.linhas:
+            func, func_args = ETAPAS[etapa](n)
+            repeticoes = 1 if n >= 1_000_000 else args.repeticoes
+
+            chave = f"{etapa}@{n}"
+            atual = medir(func, func_args, repeticoes)
+            resultados[chave] = atual
+
+            anterior = baseline.get(chave, {})
+            d_tempo = _variacao(atual["segundos"], anterior.get("segundos"))
+            d_pico = _variacao(atual["pico_mb"], anterior.get("pico_mb"))
+
+            # etapas muito rápidas variam demais para comparar tempo
+            if d_tempo is not None and atual["segundos"] >= 0.05 and d_tempo > args.tolerancia:
+                regressoes.append(chave)
+            elif d_pico is not None and atual["pico_mb"] >= 1 and d_pico > args.tolerancia:
+                regressoes.append(chave)
+
+            print(
+                f"{etapa:<26} {n:>9} {atual['segundos']:>10.3f} {_fmt_variacao(d_tempo):>8}"
+                f" {atual['pico_mb']:>10.1f} {_fmt_variacao(d_pico):>8}"
+            )
+
+    if args.salvar_baseline:
+        salvar_baseline(resultados)
+        print(f"\nBaseline gravado em {BASELINE}")
+
+    if regressoes:
+        print(f"\n⚠️ Piora acima de {args.tolerancia:.0%}: {', '.join(regressoes)}")
+        if args.falhar_se_regredir:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
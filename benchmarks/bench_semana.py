@@ -0,0 +1,94 @@
+"""
+Benchmark de normalizar_semana: apply linha a linha (versão antiga do
+app.py) x versão vetorizada de utils/dates.py.
+
+Uso (da raiz do projeto):
+    python -m benchmarks.bench_semana
+    python -m benchmarks.bench_semana --linhas 100000 1000000 --sem-legado
+"""
+import argparse
+import datetime
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from utils.dates import normalizar_semana
+
+
+def normalizar_semana_legado(df):
+    if df.empty or "semana" not in df.columns:
+        return df
+
+    df = df.copy()
+
+    def normalizar(valor, data):
+        if pd.isna(valor):
+            return None
+
+        valor = str(valor).strip()
+
+        if "-W" in valor:
+            return valor
+
+        try:
+            ano = pd.to_datetime(data, dayfirst=True).year if pd.notna(data) else datetime.datetime.now().year
+            semana = int(valor)
+            return f"{ano}-W{str(semana).zfill(2)}"
+        except:
+            return None
+
+    df["semana"] = df.apply(lambda r: normalizar(r["semana"], r.get("data")), axis=1)
+    return df
+
+
+def gerar_historico(n, seed=42):
+    """Mistura de semanas ISO (disp/carg) e inteiras (dev/canc/rec)."""
+    rng = np.random.default_rng(seed)
+
+    datas = pd.date_range("2024-01-01", "2026-12-31", freq="D")
+    data = datas[rng.integers(0, len(datas), n)]
+
+    iso = pd.Series(data.strftime("%G-W%V"))
+    inteira = pd.Series(data.isocalendar().week.to_numpy()).astype(object)
+
+    return pd.DataFrame({
+        "semana": iso.where(rng.random(n) < 0.5, inteira).to_numpy(),
+        "data": data.strftime("%Y-%m-%d"),
+    })
+
+
+def medir(func, df):
+    inicio = time.perf_counter()
+    resultado = func(df)
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--linhas", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--sem-legado", action="store_true", help="não roda a versão linha a linha")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", UserWarning)
+
+    print(f"{'linhas':>10} {'legado (s)':>12} {'vetorizado (s)':>15} {'speedup':>9}")
+
+    for n in args.linhas:
+        df = gerar_historico(n)
+
+        t_novo, novo = medir(normalizar_semana, df)
+
+        if args.sem_legado:
+            print(f"{n:>10} {'-':>12} {t_novo:>15.3f} {'-':>9}")
+            continue
+
+        t_legado, legado = medir(normalizar_semana_legado, df)
+        assert legado["semana"].equals(novo["semana"].astype(legado["semana"].dtype))
+
+        print(f"{n:>10} {t_legado:>12.3f} {t_novo:>15.3f} {t_legado / t_novo:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
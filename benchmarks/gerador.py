@@ -0,0 +1,252 @@
+"""
+Dados sintéticos no formato real dos uploads e das abas *_hist, para os
+benchmarks rodarem sem Sheets e sem rede.
+
+Todos os geradores recebem `n` (linhas do arquivo ou da aba) e uma seed,
+e são determinísticos.
+"""
+import numpy as np
+import pandas as pd
+
+from config.settings import (
+    DISPONIBILIDADE_TAB,
+    CARREGAMENTO_TAB,
+    DEVOLUCOES_TAB,
+    CANCELAMENTO_TAB,
+    RECUSAS_TAB
+)
+from data.schema import apply_schema
+
+
+INICIO = pd.Timestamp("2026-01-05")
+DIAS_POR_ARQUIVO = 7
+
+CLUSTERS = ["SP 05", "SP 06", "SP 08", "RJ 21", "RJ 22"]
+VEICULOS = ["Van", "Fiorino", "Moto", "Passeio"]
+NOMES = ["FELIPE BOTELHO DA ROCHA", "ANA PAULA SOUZA", "JOSE CARLOS LIMA", "MARIA DAS GRACAS", "JOAO PEDRO ALVES"]
+
+SLOTS_DISPONIBILIDADE = [
+    "05:45 - 09:30",
+    "12:30 - 15:00",
+    "05:45 - 09:30, 12:30 - 15:00",
+    "Not Available",
+    "Pending",
+    None,
+]
+PESOS_DISPONIBILIDADE = [0.3, 0.25, 0.15, 0.15, 0.05, 0.1]
+
+PRIMEIRO_ID = 1_400_000
+
+
+def _motoristas(n_motoristas):
+    return np.arange(PRIMEIRO_ID, PRIMEIRO_ID + n_motoristas)
+
+
+def n_motoristas(n):
+    # ~1 motorista para cada 20 linhas de histórico, com um piso
+    return max(50, n // 20)
+
+
+def _datas(rng, n, dias=28):
+    return INICIO + pd.to_timedelta(rng.integers(0, dias, n), unit="D")
+
+
+def _nomes(rng, n):
+    return np.asarray(NOMES, dtype=object)[rng.integers(0, len(NOMES), n)]
+
+
+# =====================================================
+# BASES
+# =====================================================
+def gerar_base_motoristas(n_motoristas, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = _motoristas(n_motoristas)
+    regiao = rng.choice([c[-2:] for c in CLUSTERS], n_motoristas)
+
+    return pd.DataFrame({
+        "Driver ID": ids,
+        "Driver Name": _nomes(rng, n_motoristas),
+        "CEP Ofertado": [f"{r}{i % 1000:03d}-000" for i, r in enumerate(regiao)],
+        "Turno": rng.choice(["AM", "SD", None], n_motoristas, p=[0.45, 0.45, 0.1]),
+    })
+
+
+def gerar_base_regiao():
+    return pd.DataFrame({
+        "Cluster": CLUSTERS,
+        "CEP Base": [f"{c[-2:]}000-000" for c in CLUSTERS],
+    })
+
+
+# =====================================================
+# UPLOADS (MESMOS CABEÇALHOS DOS ARQUIVOS REAIS)
+# =====================================================
+def gerar_upload_disponibilidade(n, seed=0):
+    """Planilha larga: 1 linha por motorista, 1 coluna por dia; n ≈ células."""
+    rng = np.random.default_rng(seed)
+    n_linhas = max(1, n // DIAS_POR_ARQUIVO)
+    ids = rng.choice(_motoristas(n_motoristas(n)), n_linhas)
+
+    df = pd.DataFrame({
+        "Driver ID": ids,
+        "Driver Name": _nomes(rng, n_linhas),
+        "Cluster": rng.choice(CLUSTERS, n_linhas),
+        "Vehicle Type": rng.choice(VEICULOS, n_linhas),
+        "No Show Time": rng.integers(0, 3, n_linhas),
+    })
+
+    slots = np.asarray(SLOTS_DISPONIBILIDADE, dtype=object)
+    for dia in pd.date_range(INICIO, periods=DIAS_POR_ARQUIVO):
+        df[dia.strftime("%Y-%m-%d")] = slots[
+            rng.choice(len(slots), n_linhas, p=PESOS_DISPONIBILIDADE)
+        ]
+
+    return df
+
+
+def gerar_upload_carregamento(n, seed=0):
+    """Export de ATs com ~2% de Task ID repetido (mesma linha exportada 2x)."""
+    rng = np.random.default_rng(seed)
+    entrega = _datas(rng, n)
+
+    # criação na véspera (AM de madrugada, SD pela manhã) ou fora de janela
+    hora = rng.choice([2, 3, 8, 10, 17], n, p=[0.3, 0.15, 0.3, 0.15, 0.1])
+    criacao = (
+        entrega - pd.Timedelta(days=1)
+        + pd.to_timedelta(hora * 60 + rng.integers(0, 60, n), unit="min")
+    )
+
+    df = pd.DataFrame({
+        "Task ID": (10**9 + np.arange(n)).astype(str),
+        "Driver ID": rng.choice(_motoristas(n_motoristas(n)), n),
+        "Driver name": _nomes(rng, n),
+        "Vehicle Type": rng.choice(VEICULOS, n),
+        "Delivery Date": entrega.strftime("%Y-%m-%d"),
+        "Create Time": criacao.strftime("%Y-%m-%d %H:%M:%S"),
+    })
+
+    repetidas = rng.random(n) < 0.02
+    df.loc[repetidas, :] = df.shift(1).loc[repetidas, :]
+    return df.iloc[1:].reset_index(drop=True) if n > 1 else df
+
+
+def gerar_upload_recusas(n, seed=0):
+    """Driver como '[id] NOME' e slot como 'AAAA-MM-DD HH:MM - HH:MM'; ~1% fora do padrão."""
+    rng = np.random.default_rng(seed)
+    ids = rng.choice(_motoristas(n_motoristas(n)), n).astype(str)
+    nomes = _nomes(rng, n)
+    datas = _datas(rng, n).strftime("%Y-%m-%d")
+    janelas = rng.choice(["05:45 - 09:30", "12:30 - 15:00"], n)
+
+    driver = pd.Series(ids, dtype=object).radd("[") + "] " + nomes
+    slot = pd.Series(datas, dtype=object) + " " + janelas
+
+    ruins = rng.random(n) < 0.01
+    driver[ruins] = nomes[ruins]
+
+    return pd.DataFrame({
+        "Notification ID": (5 * 10**8 + np.arange(n)).astype(str),
+        "Driver": driver,
+        "Call-up Time Slot": slot,
+        "Status": "Rejected",
+    })
+
+
+def gerar_upload_devolucoes(n, seed=0):
+    """Data em dd/mm/aaaa, como no modelo do app."""
+    rng = np.random.default_rng(seed)
+
+    return pd.DataFrame({
+        "Driver ID": rng.choice(_motoristas(n_motoristas(n)), n),
+        "Driver Name": _nomes(rng, n),
+        "qtd_pacotes": rng.integers(1, 6, n),
+        "data": _datas(rng, n).strftime("%d/%m/%Y"),
+    })
+
+
+def gerar_upload_cancelamento(n, seed=0):
+    """Data em dd/mm/aaaa, como no modelo do app."""
+    rng = np.random.default_rng(seed)
+
+    return pd.DataFrame({
+        "Driver ID": rng.choice(_motoristas(n_motoristas(n)), n),
+        "Driver Name": _nomes(rng, n),
+        "Data": _datas(rng, n).strftime("%d/%m/%Y"),
+        "Turno": rng.choice(["AM", "SD"], n),
+    })
+
+
+# =====================================================
+# ABAS *_hist (COMO VOLTAM DO read_tab)
+# =====================================================
+def gerar_historico(n, seed=0, semanas=4):
+    """
+    (disp, carg, dev, canc, rec) com `n` linhas de disponibilidade e
+    carregamento e n/10 das demais, espalhadas em `semanas` semanas.
+    Semana ISO em disp/carg e inteira (formato antigo) no resto. Já
+    tipados pelo schema, como o read_tab entrega.
+    """
+    rng = np.random.default_rng(seed)
+    ids = _motoristas(n_motoristas(n))
+    dias = semanas * 7
+    n_menor = max(1, n // 10)
+
+    def datas(k):
+        d = _datas(rng, k, dias)
+        return d.strftime("%Y-%m-%d"), d.strftime("%G-W%V"), d.isocalendar().week.to_numpy()
+
+    data, semana, _ = datas(n)
+    disp = pd.DataFrame({
+        "driver_id": rng.choice(ids, n),
+        "driver_name": _nomes(rng, n),
+        "cluster": rng.choice(CLUSTERS, n),
+        "vehicle_type": rng.choice(VEICULOS, n),
+        "turno_ofertado": rng.choice(["AM", "SD"], n),
+        "data": data,
+        "semana": semana,
+        "turno_base": rng.choice(["AM", "SD", "N/D"], n),
+    })
+
+    data, semana, _ = datas(n)
+    carg = pd.DataFrame({
+        "task_id": 10**9 + np.arange(n),
+        "driver_id": rng.choice(ids, n),
+        "driver_name": _nomes(rng, n),
+        "vehicle_type": rng.choice(VEICULOS, n),
+        "data": data,
+        "turno_carregamento": rng.choice(["AM", "SD", ""], n, p=[0.45, 0.45, 0.1]),
+        "semana": semana,
+        "turno_base": rng.choice(["AM", "SD", "N/D"], n),
+    })
+
+    data, _, semana_int = datas(n_menor)
+    dev = pd.DataFrame({
+        "driver_id": rng.choice(ids, n_menor),
+        "qtd_pacotes": rng.integers(1, 6, n_menor),
+        "data": data,
+        "semana": semana_int,
+    })
+
+    data, _, semana_int = datas(n_menor)
+    canc = pd.DataFrame({
+        "driver_id": rng.choice(ids, n_menor),
+        "turno": rng.choice(["AM", "SD"], n_menor),
+        "data": data,
+        "semana": semana_int,
+    })
+
+    data, _, semana_int = datas(n_menor)
+    rec = pd.DataFrame({
+        "notification_id": 5 * 10**8 + np.arange(n_menor),
+        "driver_id": rng.choice(ids, n_menor),
+        "data": data,
+        "semana": semana_int,
+    })
+
+    return (
+        apply_schema(DISPONIBILIDADE_TAB, disp),
+        apply_schema(CARREGAMENTO_TAB, carg),
+        apply_schema(DEVOLUCOES_TAB, dev),
+        apply_schema(CANCELAMENTO_TAB, canc),
+        apply_schema(RECUSAS_TAB, rec),
+    )
@@ -0,0 +1,281 @@
+"""
+Processamento em lote, sem Streamlit (cron / backfill).
+
+Lê todos os exports de um diretório, descobre o tipo de cada arquivo
+pelo cabeçalho, roda o processar_* correspondente em paralelo (um
+processo por núcleo) e grava o resultado no Sheets (mesmo fluxo do app:
+filtro de duplicados, append, índice de chaves e agregados) ou em um
+diretório local.
+
+Uso (da raiz do projeto):
+    RODIZIO_GCP_CREDENTIALS=sa.json RODIZIO_SPREADSHEET_ID=... \\
+        python cli.py exports/2025
+    python cli.py exports/2025 --destino local --saida saida/ \\
+        --base-motoristas bases/motoristas.xlsx --base-regiao bases/regiao.xlsx
+    python cli.py exports/2025 --dry-run
+    python cli.py exports/2025 --refazer-chaves
+    RODIZIO_STORAGE=local python cli.py exports/2025
+
+O "Sheets" é o backend de data.storage (RODIZIO_STORAGE: sheets, local
+ou fake_sheets).
+"""
+import argparse
+import csv
+import glob
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from config.settings import (
+    BASE_MOTORISTAS_TAB,
+    BASE_REGIAO_TAB,
+    NATURAL_KEYS,
+    DISPONIBILIDADE_TAB,
+    CARREGAMENTO_TAB,
+    DEVOLUCOES_TAB,
+    CANCELAMENTO_TAB
+)
+from data.aggregates import AggregateStore
+from data.drivers import DriverRegistry
+from data.keys import KeyIndex, hash_keys, rebuild_all_keys
+from data.serializer import iter_rows
+from data.storage import load_tabs
+from metrics.agregados import agregar_upload
+from processing.deteccao import detectar_tipo
+from processing.disponibilidade import processar_disponibilidade
+from processing.carregamento import processar_carregamento
+from processing.devolucoes import processar_devolucoes
+from processing.cancelamento import processar_cancelamento
+from processing.recusas import processar_recusas
+from processing.gravacao import gravar_novos
+from utils.arquivos import ler_arquivo, ler_cabecalho
+
+
+logger = logging.getLogger("rodizio.cli")
+
+EXTENSOES = (".csv", ".xlsx")
+
+
+# =====================================================
+# PROCESSAMENTO (NOS WORKERS)
+# =====================================================
+_bases = {}
+
+
+def _iniciar_worker(registro, base_regiao):
+    # as bases vão uma vez por processo, e não a cada arquivo
+    _bases["motoristas"] = registro
+    _bases["regiao"] = base_regiao
+
+
+def _processar(nome_tab, df):
+    motoristas, regiao = _bases["motoristas"], _bases["regiao"]
+
+    if nome_tab == DISPONIBILIDADE_TAB:
+        return processar_disponibilidade(df, motoristas, regiao)
+    if nome_tab == CARREGAMENTO_TAB:
+        return processar_carregamento(df, motoristas)
+    if nome_tab == DEVOLUCOES_TAB:
+        return processar_devolucoes(df, motoristas)
+    if nome_tab == CANCELAMENTO_TAB:
+        return processar_cancelamento(df)
+    return processar_recusas(df, motoristas)
+
+
+def processar_arquivo(caminho):
+    """(caminho, aba, df processado, linhas inválidas, erro) de um export."""
+    try:
+        with open(caminho, "rb") as f:
+            nome_tab = detectar_tipo(ler_cabecalho(f))
+
+        if nome_tab is None:
+            return caminho, None, None, 0, "tipo de arquivo não reconhecido pelo cabeçalho"
+
+        with open(caminho, "rb") as f:
+            df = _processar(nome_tab, ler_arquivo(f))
+
+        invalidas = df.attrs.pop("linhas_invalidas", None)
+        return caminho, nome_tab, df, 0 if invalidas is None else len(invalidas), None
+
+    except Exception as e:
+        return caminho, None, None, 0, f"{type(e).__name__}: {e}"
+
+
+# =====================================================
+# DESTINOS
+# =====================================================
+class GravadorSheets:
+    """Mesmo caminho de gravação do app (data.storage + índice + agregados)."""
+
+    def gravar(self, nome_tab, df):
+        return gravar_novos(nome_tab, df)
+
+
+class GravadorLocal:
+    """
+    Um CSV por aba em `saida`, com o mesmo filtro de chaves naturais e os
+    mesmos agregados do Sheets, em SQLite ao lado dos CSVs.
+    """
+
+    def __init__(self, saida):
+        os.makedirs(saida, exist_ok=True)
+        self.saida = saida
+        self.chaves = KeyIndex(os.path.join(saida, "chaves.sqlite"))
+        self.agregados = AggregateStore(os.path.join(saida, "agregados.sqlite"))
+
+    def gravar(self, nome_tab, df):
+        hashes = None
+        if nome_tab in NATURAL_KEYS:
+            hashes = hash_keys(nome_tab, df)
+            novas = ~hashes.duplicated() & ~hashes.isin(
+                self.chaves.existing(nome_tab, hashes.unique())
+            )
+            df, hashes = df[novas], hashes[novas]
+
+        if df.empty:
+            return 0
+
+        # mesmo texto que iria para o Sheets
+        caminho = os.path.join(self.saida, f"{nome_tab}.csv")
+        novo = not os.path.exists(caminho)
+
+        with open(caminho, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            if novo:
+                writer.writerow(df.columns)
+            for linhas in iter_rows(df):
+                writer.writerows(linhas)
+
+        if hashes is not None:
+            self.chaves.add(nome_tab, hashes.unique())
+        self.agregados.fold(agregar_upload(nome_tab, df))
+
+        return len(df)
+
+
+# =====================================================
+# BASES
+# =====================================================
+def carregar_bases(caminho_motoristas, caminho_regiao):
+    """Bases de arquivos locais, se informados; senão do Sheets."""
+    if caminho_motoristas and caminho_regiao:
+        with open(caminho_motoristas, "rb") as f1, open(caminho_regiao, "rb") as f2:
+            return ler_arquivo(f1), ler_arquivo(f2)
+
+    bases = load_tabs([BASE_MOTORISTAS_TAB, BASE_REGIAO_TAB])
+    return bases[BASE_MOTORISTAS_TAB], bases[BASE_REGIAO_TAB]
+
+
+def listar_arquivos(diretorio):
+    arquivos = [
+        caminho
+        for caminho in glob.glob(os.path.join(diretorio, "**", "*"), recursive=True)
+        if caminho.lower().endswith(EXTENSOES) and os.path.isfile(caminho)
+    ]
+    # ordem alfabética ≈ cronológica nos nomes dos exports
+    return sorted(arquivos)
+
+
+# =====================================================
+# MAIN
+# =====================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Processa em lote os exports do rodízio")
+    parser.add_argument("diretorio", help="diretório com os exports (.csv/.xlsx), lido recursivamente")
+    parser.add_argument("--destino", choices=["sheets", "local"], default="sheets")
+    parser.add_argument("--saida", default="saida", help="diretório do destino local")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processos em paralelo")
+    parser.add_argument("--base-motoristas", help="arquivo local da base de motoristas (senão, lê do Sheets)")
+    parser.add_argument("--base-regiao", help="arquivo local da base de região (senão, lê do Sheets)")
+    parser.add_argument("--dry-run", action="store_true", help="só processa e resume, sem gravar")
+    parser.add_argument("--refazer-chaves", action="store_true",
+                        help="refaz o índice de chaves do Sheets antes de gravar (linhas apagadas/editadas à mão)")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+
+    arquivos = listar_arquivos(args.diretorio)
+    if not arquivos:
+        logger.warning("Nenhum .csv/.xlsx em %s", args.diretorio)
+        return 0
+
+    try:
+        base_motoristas, base_regiao = carregar_bases(args.base_motoristas, args.base_regiao)
+    except Exception as e:
+        logger.error("Erro ao carregar as bases: %s", e)
+        return 1
+
+    if base_motoristas.empty or base_regiao.empty:
+        logger.error("Bases de motoristas/região vazias ou ilegíveis")
+        return 1
+
+    try:
+        # índice dos motoristas montado uma vez, aqui, e não em cada arquivo
+        registro = DriverRegistry(base_motoristas)
+    except ValueError as e:
+        logger.error("Base de motoristas inválida: %s", e)
+        return 1
+
+    gravador = None
+    if not args.dry_run:
+        gravador = GravadorLocal(args.saida) if args.destino == "local" else GravadorSheets()
+
+    if args.refazer_chaves and isinstance(gravador, GravadorSheets):
+        try:
+            rebuild_all_keys()
+        except Exception as e:
+            logger.error("Erro ao refazer o índice de chaves: %s", e)
+            return 1
+
+    logger.info("%d arquivos, %d processos, destino: %s", len(arquivos), args.workers,
+                "nenhum (dry-run)" if gravador is None else args.destino)
+
+    falhas = 0
+    totais = {}
+
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_iniciar_worker,
+        initargs=(registro, base_regiao)
+    ) as pool:
+        # map devolve na ordem dos arquivos: a gravação (serial, neste
+        # processo) segue a mesma ordem em que o app receberia os uploads
+        for caminho, nome_tab, df, n_invalidas, erro in pool.map(processar_arquivo, arquivos):
+            if erro is not None:
+                falhas += 1
+                logger.error("%s: %s", caminho, erro)
+                continue
+
+            if n_invalidas:
+                logger.warning("%s: %d linhas ignoradas por formato não reconhecido", caminho, n_invalidas)
+
+            salvos = 0
+            if gravador is not None and not df.empty:
+                try:
+                    salvos = gravador.gravar(nome_tab, df)
+                except Exception as e:
+                    falhas += 1
+                    logger.exception("%s: erro ao gravar em %s: %s", caminho, nome_tab, e)
+                    continue
+
+            linhas, novos = totais.get(nome_tab, (0, 0))
+            totais[nome_tab] = (linhas + len(df), novos + salvos)
+            logger.info("%s → %s: %d linhas, %d novas", caminho, nome_tab, len(df), salvos)
+
+    for nome_tab, (linhas, novos) in sorted(totais.items()):
+        logger.info("Total %s: %d linhas processadas, %d novas gravadas", nome_tab, linhas, novos)
+
+    if falhas:
+        logger.error("%d arquivo(s) com erro", falhas)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,3 +7,76 @@ CARREGAMENTO_TAB = "carregamento_hist"
 DEVOLUCOES_TAB = "devolucoes_hist"
 CANCELAMENTO_TAB = "cancelamento_hist"
 RECUSAS_TAB = "recusas_hist"
+
+# Fora do Streamlit (CLI/cron) a conexão vem do ambiente em vez do st.secrets
+GCP_CREDENTIALS_ENV = "RODIZIO_GCP_CREDENTIALS"
+SPREADSHEET_ID_ENV = "RODIZIO_SPREADSHEET_ID"
+
+# Onde as abas ficam: "sheets" (Google Sheets), "local" (banco embutido
+# em LOCAL_DB_PATH) ou "fake_sheets" (Sheets simulado em memória, com
+# latência e cota, para teste de carga). A variável de ambiente sobrepõe.
+STORAGE_BACKEND = "sheets"
+STORAGE_BACKEND_ENV = "RODIZIO_STORAGE"
+LOCAL_DB_PATH = ".cache/local/rodizio.sqlite"
+FAKE_SHEETS_LATENCY_SECONDS = 0.25
+FAKE_SHEETS_READS_PER_MINUTE = 300
+FAKE_SHEETS_WRITES_PER_MINUTE = 60
+
+# Cache de leitura das abas (compartilhado entre sessões)
+CACHE_TTL_SECONDS = 300
+CACHE_MAX_ENTRIES = 32
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+VERSION_PROBE_SECONDS = 10
+
+# Leituras simultâneas no carregamento paralelo das abas (load_tabs)
+READ_MAX_WORKERS = 4
+
+# Espelho local (SQLite) das abas de histórico, sincronizado por linhas novas
+MIRROR_DIR = ".cache/mirror"
+MIRRORED_TABS = [
+    DISPONIBILIDADE_TAB,
+    CARREGAMENTO_TAB,
+    DEVOLUCOES_TAB,
+    CANCELAMENTO_TAB,
+    RECUSAS_TAB,
+]
+
+# Índice de chaves naturais (idempotência dos uploads). Devoluções não
+# têm identificador de linha (o mesmo motorista pode ter duas devoluções
+# iguais no dia), então não são filtradas por conteúdo
+KEYS_DIR = ".cache/keys"
+NATURAL_KEYS = {
+    DISPONIBILIDADE_TAB: ["driver_id", "data", "turno_ofertado"],
+    CARREGAMENTO_TAB: ["task_id"],
+    CANCELAMENTO_TAB: ["driver_id", "data", "turno"],
+    RECUSAS_TAB: ["notification_id"],
+}
+
+# Agregados do rodízio materializados por semana + driver
+AGGREGATES_DIR = ".cache/agregados"
+
+# Faixas de linhas por semana das abas de histórico (leitura de uma semana só)
+WEEKS_DIR = ".cache/semanas"
+WEEK_INDEXED_TABS = [
+    DISPONIBILIDADE_TAB,
+    CARREGAMENTO_TAB,
+    DEVOLUCOES_TAB,
+    CANCELAMENTO_TAB,
+    RECUSAS_TAB,
+]
+
+# Uploads acima deste tamanho são lidos, processados e gravados em blocos
+STREAMING_MIN_BYTES = 20 * 1024 * 1024
+STREAMING_CHUNK_ROWS = 20_000
+
+# Escrita no Sheets: batches limitados, cota por minuto e retry com backoff
+APPEND_MAX_ROWS = 5_000
+APPEND_MAX_BYTES = 2 * 1024 * 1024
+WRITE_REQUESTS_PER_MINUTE = 60
+APPEND_MAX_RETRIES = 6
+APPEND_BACKOFF_SECONDS = 1.0
+APPEND_BACKOFF_MAX_SECONDS = 64.0
+
+# Instrumentação: RODIZIO_PROFILE=1 grava um cProfile por execução do script
+PERF_PROFILE_ENV = "RODIZIO_PROFILE"
+PROFILES_DIR = ".cache/perfis"
@@ -0,0 +1,235 @@
+import os
+import threading
+
+import pandas as pd
+
+from config.settings import AGGREGATES_DIR
+from data.localdb import SQLiteStore
+from data.schema import to_id
+from utils.dates import parse_datas
+
+
+SOMAVEIS = [
+    "disp_am",
+    "disp_sd",
+    "disp_total",
+    "carg_total",
+    "carg_am",
+    "carg_sd",
+    "devolucoes",
+    "cancelamentos",
+    "recusas",
+]
+
+COLUNAS = ["semana", "driver_id", "driver_name"] + SOMAVEIS + ["ultima_carga"]
+
+
+class AggregateStore(SQLiteStore):
+    """Agregados do rodízio materializados por (semana, driver_id).
+
+    Cada upload dobra o seu delta aqui (soma dos contadores, maior
+    ultima_carga), então abrir uma semana é uma consulta por chave e não
+    depende do tamanho do histórico. A última carga de cada motorista em
+    todo o histórico fica à parte (ultimas_cargas), uma linha por driver.
+    """
+
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS agregados ("
+        " semana TEXT NOT NULL,"
+        " driver_id TEXT NOT NULL,"
+        " driver_name TEXT,"
+        + "".join(f" {c} REAL NOT NULL DEFAULT 0," for c in SOMAVEIS)
+        + " ultima_carga TEXT,"
+        " PRIMARY KEY (semana, driver_id)) WITHOUT ROWID",
+        "CREATE TABLE IF NOT EXISTS agregados_meta ("
+        " chave TEXT PRIMARY KEY,"
+        " valor TEXT)",
+        # linhas e versão de cada aba que os agregados já cobrem
+        "CREATE TABLE IF NOT EXISTS fontes ("
+        " tab TEXT PRIMARY KEY,"
+        " linhas INTEGER NOT NULL,"
+        " versao TEXT)",
+        "CREATE TABLE IF NOT EXISTS ultimas_cargas ("
+        " driver_id TEXT PRIMARY KEY,"
+        " ultima_carga TEXT NOT NULL) WITHOUT ROWID",
+        # arquivos anteriores à tabela: preenche a partir dos agregados
+        "INSERT OR IGNORE INTO ultimas_cargas"
+        " SELECT driver_id, MAX(ultima_carga) FROM agregados"
+        " WHERE ultima_carga IS NOT NULL GROUP BY driver_id"
+    ]
+
+    def is_built(self):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM agregados_meta WHERE chave = 'construido'"
+            ).fetchone()
+
+        return row is not None
+
+    def fold(self, delta, conn=None):
+        """Soma o delta (mesmas COLUNAS) nos agregados existentes."""
+        if delta.empty:
+            return
+
+        delta = delta.reindex(columns=COLUNAS)
+        delta[SOMAVEIS] = delta[SOMAVEIS].fillna(0)
+        delta["ultima_carga"] = parse_datas(delta["ultima_carga"]).dt.strftime("%Y-%m-%d")
+        delta = delta.astype(object).where(delta.notna(), None)
+
+        sql = (
+            f"INSERT INTO agregados ({', '.join(COLUNAS)})"
+            f" VALUES ({', '.join('?' * len(COLUNAS))})"
+            " ON CONFLICT(semana, driver_id) DO UPDATE SET"
+            " driver_name = COALESCE(agregados.driver_name, excluded.driver_name),"
+            + "".join(f" {c} = agregados.{c} + excluded.{c}," for c in SOMAVEIS)
+            + " ultima_carga = CASE"
+            " WHEN agregados.ultima_carga IS NULL"
+            " OR excluded.ultima_carga > agregados.ultima_carga"
+            " THEN excluded.ultima_carga ELSE agregados.ultima_carga END"
+        )
+
+        cargas = delta.loc[delta["ultima_carga"].notna(), ["driver_id", "ultima_carga"]]
+
+        if conn is not None:
+            conn.executemany(sql, delta.itertuples(index=False, name=None))
+            self._fold_last_loads(conn, cargas)
+            self._bump(conn)
+            return
+
+        with self._connect() as conn:
+            conn.executemany(sql, delta.itertuples(index=False, name=None))
+            self._fold_last_loads(conn, cargas)
+            self._bump(conn)
+
+    @staticmethod
+    def _fold_last_loads(conn, cargas):
+        conn.executemany(
+            "INSERT INTO ultimas_cargas VALUES (?, ?)"
+            " ON CONFLICT(driver_id) DO UPDATE SET ultima_carga ="
+            " MAX(ultimas_cargas.ultima_carga, excluded.ultima_carga)",
+            cargas.itertuples(index=False, name=None)
+        )
+
+    @staticmethod
+    def _bump(conn):
+        conn.execute(
+            "INSERT INTO agregados_meta VALUES ('revisao', '1')"
+            " ON CONFLICT(chave) DO UPDATE SET valor = CAST(valor AS INTEGER) + 1"
+        )
+
+    def fold_upload(self, tab_name, delta, linhas, versao=None):
+        """fold do delta de `linhas` recém-gravadas na aba, contando-as nas
+        fontes; `versao` é a da aba depois da gravação."""
+        with self._connect() as conn:
+            self.fold(delta, conn)
+            conn.execute(
+                "UPDATE fontes SET linhas = linhas + ?, versao = ? WHERE tab = ?",
+                (linhas, versao, tab_name)
+            )
+
+    def sources(self):
+        """{aba: (linhas, versão)} do que os agregados cobrem."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT tab, linhas, versao FROM fontes").fetchall()
+
+        return {r[0]: (r[1], r[2]) for r in rows}
+
+    def mark_versions(self, versoes):
+        """As abas estão nestas versões sem linhas a mais ou a menos."""
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE fontes SET versao = ? WHERE tab = ?",
+                [(v, tab) for tab, v in versoes.items()]
+            )
+
+    def revision(self):
+        """Muda a cada fold/replace; serve de chave para caches do cubo."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT valor FROM agregados_meta WHERE chave = 'revisao'"
+            ).fetchone()
+
+        return 0 if row is None else int(row[0])
+
+    def replace(self, agregados, fontes=None):
+        """Troca tudo pelos agregados recalculados do histórico completo;
+        `fontes` = {aba: (linhas, versão)} lidas para o cálculo."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM agregados")
+            conn.execute("DELETE FROM ultimas_cargas")
+            conn.execute("DELETE FROM fontes")
+            conn.executemany(
+                "INSERT INTO fontes VALUES (?, ?, ?)",
+                [(tab, linhas, versao) for tab, (linhas, versao) in (fontes or {}).items()]
+            )
+            self.fold(agregados, conn)
+            self._bump(conn)
+            conn.execute(
+                "INSERT OR REPLACE INTO agregados_meta VALUES ('construido', datetime('now'))"
+            )
+
+    def replace_week(self, semana, agregados):
+        """Troca só a semana pelos agregados recalculados das linhas dela."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM agregados WHERE semana = ?", (semana,))
+            self.fold(agregados, conn)
+
+            # a semana pode ter perdido a última carga de alguém: refaz do agregado
+            conn.execute("DELETE FROM ultimas_cargas")
+            conn.execute(
+                "INSERT INTO ultimas_cargas"
+                " SELECT driver_id, MAX(ultima_carga) FROM agregados"
+                " WHERE ultima_carga IS NOT NULL GROUP BY driver_id"
+            )
+            self._bump(conn)
+
+    def read(self, semana=None):
+        query = f"SELECT {', '.join(COLUNAS)} FROM agregados"
+        params = ()
+
+        if semana is not None:
+            query += " WHERE semana = ?"
+            params = (semana,)
+
+        with self._connect() as conn:
+            df = pd.read_sql_query(query, conn, params=params)
+
+        df["driver_id"] = to_id(df["driver_id"])
+        df["ultima_carga"] = pd.to_datetime(df["ultima_carga"], format="%Y-%m-%d")
+        return df
+
+    def last_loads(self):
+        """Última carga de cada motorista em todo o histórico (driver_id, ultima_carga)."""
+        with self._connect() as conn:
+            df = pd.read_sql_query("SELECT driver_id, ultima_carga FROM ultimas_cargas", conn)
+
+        df["driver_id"] = to_id(df["driver_id"])
+        df["ultima_carga"] = pd.to_datetime(df["ultima_carga"], format="%Y-%m-%d")
+        return df
+
+    def weeks_with_availability(self):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT semana FROM agregados"
+                " WHERE disp_total > 0 ORDER BY semana"
+            ).fetchall()
+
+        return [r[0] for r in rows]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_aggregate_store():
+    from data.storage import dataset_id
+
+    sheet_id = dataset_id()
+
+    with _stores_lock:
+        store = _stores.get(sheet_id)
+        if store is None:
+            store = AggregateStore(os.path.join(AGGREGATES_DIR, f"{sheet_id}.sqlite"))
+            _stores[sheet_id] = store
+
+        return store
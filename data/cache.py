@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TabCache:
+    """Cache LRU de DataFrames por aba, validado por versão + TTL.
+
+    Uma entrada só é servida se a versão gravada for a versão atual da
+    planilha e se não tiver passado de `ttl` segundos. O total guardado
+    é limitado por `max_entries` e `max_bytes` (memória dos DataFrames).
+    """
+
+    def __init__(self, ttl=300, max_entries=32, max_bytes=256 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version, count=True):
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += count
+                return None
+
+            entry_version, df, stored_at, nbytes = entry
+
+            if entry_version != version or time.monotonic() - stored_at > self.ttl:
+                self._drop(key)
+                self.misses += count
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return df.copy()
+
+    def put(self, key, version, df):
+        nbytes = int(df.memory_usage(deep=True).sum())
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+            if nbytes > self.max_bytes:
+                return
+
+            self._entries[key] = (version, df, time.monotonic(), nbytes)
+            self._bytes += nbytes
+
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or self._bytes > self.max_bytes
+            ):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        """Descarta a entrada `key` e as derivadas dela (chaves (key, ...),
+        ex.: as semanas da aba); sem key, tudo."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+
+            for k in [k for k in self._entries if k == key or (isinstance(k, tuple) and k[0] == key)]:
+                self._drop(k)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _drop(self, key):
+        _, _, _, nbytes = self._entries.pop(key)
+        self._bytes -= nbytes
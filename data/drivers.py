@@ -0,0 +1,176 @@
+"""
+Cadastro de motoristas em memória para enriquecer os uploads (turno e
+CEP ofertado por driver_id): montado uma vez a partir da base_motoristas
+e consultado por hash, sem normalizar a base nem fazer merge a cada
+arquivo.
+"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from config.settings import BASE_MOTORISTAS_TAB, CACHE_TTL_SECONDS
+from data.schema import to_id
+from utils.normalize import normalize_columns
+
+
+def _canonical_text(ids):
+    # mesma regra do align_ids quando algum id não é inteiro
+    return ids.astype("string").str.strip().str.replace(r"\.0$", "", regex=True)
+
+
+def _cep_prefix(valores):
+    return valores.astype(str).str.replace(r"\D", "", regex=True).str[:2]
+
+
+class _Coluna:
+    """Coluna do cadastro como códigos compactos + valores distintos;
+    `vazio` é o valor de quem não tem (vazio na base ou fora do cadastro)."""
+
+    def __init__(self, serie, vazio=np.nan):
+        codes, uniques = pd.factorize(serie)
+
+        self.codes = codes.astype(np.int8 if len(uniques) < 127 else np.int32)
+        self.vazio = vazio
+        # -1 (vazio na base ou fora do cadastro) cai no último valor
+        self.values = np.append(np.asarray(uniques, dtype=object), vazio)
+
+    def take(self, pos):
+        if len(self.codes) == 0:
+            return np.full(len(pos), self.vazio, dtype=object)
+
+        codes = np.where(pos >= 0, self.codes.take(pos, mode="clip"), -1)
+        return self.values.take(codes)
+
+
+def _unique_index(values):
+    """(Index sem repetidos, posição de cada entrada no cadastro)."""
+    primeiro = ~values.duplicated().to_numpy() & values.notna().to_numpy()
+    return pd.Index(values[primeiro]), np.flatnonzero(primeiro)
+
+
+class DriverRegistry:
+    """
+    driver_id canônico (to_id) → posição, por um índice hash; turno,
+    cep_ofertado e o prefixo de 2 dígitos do CEP ficam em arrays
+    compactos. Id repetido na base: vale a primeira linha.
+    """
+
+    COLUNAS = ("turno", "cep_ofertado", "cep_prefixo")
+
+    def __init__(self, base_motoristas, version=None):
+        base = normalize_columns(base_motoristas)
+
+        if "driver_id" not in base.columns:
+            raise ValueError("base_motoristas precisa ter a coluna driver_id")
+
+        self.version = version
+        self.built_at = time.monotonic()
+        self.colunas = set(base.columns)
+
+        self._ids = to_id(base["driver_id"]).reset_index(drop=True)
+        self._inteiro = pd.api.types.is_integer_dtype(self._ids)
+        self._index, self._pos = _unique_index(self._ids)
+        self._texto = None
+
+        vazia = pd.Series(np.nan, index=base.index, dtype=object)
+        cep = base["cep_ofertado"] if "cep_ofertado" in base.columns else vazia
+
+        self._colunas = {
+            "turno": _Coluna(base["turno"] if "turno" in base.columns else vazia),
+            "cep_ofertado": _Coluna(cep),
+            # como o astype(str) do merge antigo: sem CEP, prefixo ""
+            "cep_prefixo": _Coluna(_cep_prefix(cep), vazio=""),
+        }
+
+    def __len__(self):
+        return len(self._pos)
+
+    def _text_index(self):
+        if self._texto is None:
+            index, pos = _unique_index(_canonical_text(self._ids))
+            self._texto = (index, pos)
+
+        return self._texto
+
+    def align(self, driver_ids):
+        """driver_id do upload no tipo do cadastro (regra do align_ids):
+        Int64 se os dois lados são inteiros, senão texto limpo."""
+        ids = to_id(driver_ids)
+
+        if self._inteiro and pd.api.types.is_integer_dtype(ids):
+            return ids
+
+        codes, uniques = pd.factorize(ids)
+
+        return pd.Series(
+            _canonical_text(pd.Series(uniques)).array.take(codes, allow_fill=True),
+            index=ids.index,
+            name=ids.name
+        )
+
+    def positions(self, driver_ids):
+        """Linha do cadastro de cada id já alinhado (-1 se não está), uma
+        busca por id distinto."""
+        codes, uniques = pd.factorize(driver_ids)
+
+        if len(uniques) == 0:
+            return np.full(len(codes), -1)
+
+        if pd.api.types.is_integer_dtype(driver_ids.dtype):
+            index, pos = self._index, self._pos
+        else:
+            index, pos = self._text_index()
+
+        achados = index.get_indexer(uniques)
+        linhas = np.where(achados >= 0, pos.take(achados, mode="clip"), -1)
+
+        return np.where(codes >= 0, linhas.take(codes, mode="clip"), -1)
+
+    def enrich(self, driver_ids, colunas):
+        """DataFrame com as `colunas` (de COLUNAS) de cada id alinhado, no
+        índice de driver_ids; quem não está no cadastro fica vazio."""
+        pos = self.positions(driver_ids)
+
+        return pd.DataFrame(
+            {c: self._colunas[c].take(pos) for c in colunas},
+            index=driver_ids.index
+        )
+
+
+def as_registry(base_motoristas):
+    """O próprio cadastro, ou um montado a partir do DataFrame da base."""
+    if isinstance(base_motoristas, DriverRegistry):
+        return base_motoristas
+
+    return DriverRegistry(base_motoristas)
+
+
+# =====================================================
+# CADASTRO DO PROCESSO
+# =====================================================
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_driver_registry():
+    """Cadastro da aba base_motoristas, refeito quando a versão dela muda
+    (sem versão conhecida, a cada CACHE_TTL_SECONDS)."""
+    global _registry
+
+    from data import storage
+
+    version = (storage.dataset_id(), storage.tab_version(BASE_MOTORISTAS_TAB))
+
+    with _registry_lock:
+        registry = _registry
+
+        if registry is not None and registry.version == version and (
+            version[1] is not None
+            or time.monotonic() - registry.built_at < CACHE_TTL_SECONDS
+        ):
+            return registry
+
+        _registry = DriverRegistry(storage.read_tab(BASE_MOTORISTAS_TAB), version=version)
+        return _registry
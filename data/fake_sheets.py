@@ -0,0 +1,223 @@
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import requests
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range, rowcol_to_a1
+
+from data.serializer import iter_rows
+
+
+class _Quota:
+    """Janela deslizante de 60 s, como a cota por minuto da API."""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self._calls = deque()
+
+    def take(self, now):
+        while self._calls and now - self._calls[0] >= 60:
+            self._calls.popleft()
+
+        if self.per_minute and len(self._calls) >= self.per_minute:
+            return False
+
+        self._calls.append(now)
+        return True
+
+
+def _api_error(code, message, status):
+    response = requests.Response()
+    response.status_code = code
+    response._content = json.dumps(
+        {"error": {"code": code, "message": message, "status": status}}
+    ).encode()
+    return APIError(response)
+
+
+def _split_range(range_name):
+    """'aba'!A2:C → ("aba", "A2:C"); só o nome da aba → ("aba", None)."""
+    if "!" not in range_name:
+        return range_name.strip("'").replace("''", "'"), None
+
+    tab, _, cells = range_name.rpartition("!")
+    return tab.strip("'").replace("''", "'"), cells
+
+
+def _trim(rows):
+    # a API não devolve células vazias no fim da linha nem linhas vazias no fim
+    out = []
+    for row in rows:
+        end = len(row)
+        while end and row[end - 1] == "":
+            end -= 1
+        out.append(list(row[:end]))
+
+    while out and not out[-1]:
+        out.pop()
+
+    return out
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title, sheet_id):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = sheet_id
+
+    def get_values(self, range_name=None, value_render_option=None, **kwargs):
+        self.spreadsheet._request("read")
+        return self.spreadsheet._values(self.title, range_name)
+
+    def append_rows(self, values, value_input_option=None, **kwargs):
+        self.spreadsheet._request("write")
+        return self.spreadsheet._append(self.title, values)
+
+
+class FakeSpreadsheet:
+    """Substituto em memória do gspread.Spreadsheet, para rodar o app e a
+    CLI sem Google: mesmos métodos que data.sheets usa, com latência fixa
+    por requisição e cota por minuto (429 como a API real).
+
+    Os valores ficam como texto, exatamente como enviados; não há a
+    reformatação de números do USER_ENTERED.
+    """
+
+    def __init__(self, latency=0.0, reads_per_minute=0, writes_per_minute=0, spreadsheet_id="fake"):
+        self.id = spreadsheet_id
+        self.title = "fake"
+        self.latency = latency
+
+        self._lock = threading.Lock()
+        self._tabs = {}
+        self._sheets = {}
+        self._quotas = {
+            "read": _Quota(reads_per_minute),
+            "write": _Quota(writes_per_minute),
+        }
+        self._updated = datetime.now(timezone.utc)
+        self.requests = {"read": 0, "write": 0, "throttled": 0}
+
+    # -------------------------------
+    # Simulação de rede e cota
+    # -------------------------------
+    def _request(self, kind):
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            if not self._quotas[kind].take(time.monotonic()):
+                self.requests["throttled"] += 1
+                raise _api_error(
+                    429,
+                    f"Quota exceeded for quota metric '{kind} requests' (fake)",
+                    "RESOURCE_EXHAUSTED"
+                )
+            self.requests[kind] += 1
+
+    def _touch(self):
+        self._updated = datetime.now(timezone.utc)
+
+    # -------------------------------
+    # Dados
+    # -------------------------------
+    def seed(self, tab_name, df):
+        """Cria/troca a aba com o conteúdo do df (sem latência nem cota)."""
+        rows = [list(map(str, df.columns))]
+        for linhas in iter_rows(df):
+            rows.extend(linhas)
+
+        with self._lock:
+            self._tabs[tab_name] = rows
+            self._sheets.setdefault(tab_name, len(self._sheets))
+            self._touch()
+
+    def _values(self, tab_name, cells):
+        with self._lock:
+            if tab_name not in self._tabs:
+                raise _api_error(400, f"Unable to parse range: {tab_name}", "INVALID_ARGUMENT")
+            rows = self._tabs[tab_name]
+
+            if cells is None:
+                return _trim(rows)
+
+            grid = a1_range_to_grid_range(cells)
+            r0, r1 = grid.get("startRowIndex", 0), grid.get("endRowIndex", len(rows))
+            c0, c1 = grid.get("startColumnIndex", 0), grid.get("endColumnIndex")
+
+            # a grade da aba vai até a última linha escrita: faixa que começa
+            # depois dela é recusada, como no Sheets (o batch inteiro falha)
+            n_rows = max(len(rows), 1)
+            if r0 >= n_rows:
+                n_cols = max((len(r) for r in rows), default=1) or 1
+                raise _api_error(
+                    400,
+                    f"Range ('{tab_name}'!{cells}) exceeds grid limits. "
+                    f"Max rows: {n_rows}, max columns: {n_cols}",
+                    "INVALID_ARGUMENT"
+                )
+
+            return _trim([row[c0:c1] for row in rows[r0:r1]])
+
+    def _append(self, tab_name, values):
+        values = [[str(v) for v in row] for row in values]
+
+        with self._lock:
+            rows = self._tabs.setdefault(tab_name, [])
+            first = len(_trim(rows)) + 1
+            del rows[first - 1:]
+            rows.extend(values)
+            self._touch()
+
+        width = max((len(r) for r in values), default=1) or 1
+        updated = (
+            f"'{tab_name}'!{rowcol_to_a1(first, 1)}:"
+            f"{rowcol_to_a1(first + len(values) - 1, width)}"
+        )
+
+        return {
+            "spreadsheetId": self.id,
+            "updates": {
+                "spreadsheetId": self.id,
+                "updatedRange": updated,
+                "updatedRows": len(values),
+                "updatedColumns": width,
+                "updatedCells": sum(len(r) for r in values),
+            },
+        }
+
+    # -------------------------------
+    # API do gspread usada pelo data.sheets
+    # -------------------------------
+    def worksheet(self, title):
+        self._request("read")
+
+        with self._lock:
+            if title not in self._tabs:
+                raise WorksheetNotFound(title)
+            return FakeWorksheet(self, title, self._sheets[title])
+
+    def values_batch_get(self, ranges, params=None):
+        self._request("read")
+
+        value_ranges = []
+        for range_name in ranges:
+            tab_name, cells = _split_range(range_name)
+            value_ranges.append({"range": range_name, "values": self._values(tab_name, cells)})
+
+        return {"spreadsheetId": self.id, "valueRanges": value_ranges}
+
+    def get_lastUpdateTime(self):
+        # no Sheets real é uma chamada ao Drive, com cota própria
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            return self._updated.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+    def stats(self):
+        with self._lock:
+            return dict(self.requests)
@@ -0,0 +1,192 @@
+import os
+import threading
+
+import pandas as pd
+
+from config.settings import KEYS_DIR, NATURAL_KEYS
+from data.localdb import SQLiteStore
+from utils.dates import parse_datas
+from utils.perf import medido
+
+
+class KeyIndex(SQLiteStore):
+    """Índice persistente (SQLite) de hashes das chaves naturais por aba.
+
+    Permite saber se uma linha já foi gravada sem ler a aba: cada upload
+    consulta só os hashes das linhas novas.
+    """
+
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS keys ("
+        " tab TEXT NOT NULL,"
+        " h INTEGER NOT NULL,"
+        " PRIMARY KEY (tab, h)) WITHOUT ROWID",
+        "CREATE TABLE IF NOT EXISTS keys_meta ("
+        " tab TEXT PRIMARY KEY,"
+        " total INTEGER NOT NULL)"
+    ]
+
+    def is_built(self, tab_name):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM keys_meta WHERE tab = ?", (tab_name,)
+            ).fetchone()
+
+        return row is not None
+
+    def existing(self, tab_name, hashes):
+        """Quais dos hashes já estão no índice."""
+        if len(hashes) == 0:
+            return set()
+
+        with self._connect() as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS candidatos (h INTEGER)")
+            conn.execute("DELETE FROM candidatos")
+            conn.executemany(
+                "INSERT INTO candidatos VALUES (?)",
+                ((int(h),) for h in hashes)
+            )
+            rows = conn.execute(
+                "SELECT c.h FROM candidatos c"
+                " JOIN keys k ON k.tab = ? AND k.h = c.h",
+                (tab_name,)
+            ).fetchall()
+
+        return {r[0] for r in rows}
+
+    def add(self, tab_name, hashes):
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO keys (tab, h) VALUES (?, ?)",
+                ((tab_name, int(h)) for h in hashes)
+            )
+            conn.execute(
+                "INSERT INTO keys_meta (tab, total) VALUES (?, 0)"
+                " ON CONFLICT(tab) DO NOTHING",
+                (tab_name,)
+            )
+            conn.execute(
+                "UPDATE keys_meta SET total ="
+                " (SELECT COUNT(*) FROM keys WHERE tab = ?) WHERE tab = ?",
+                (tab_name, tab_name)
+            )
+
+    def replace(self, tab_name, hashes):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM keys WHERE tab = ?", (tab_name,))
+            conn.execute("DELETE FROM keys_meta WHERE tab = ?", (tab_name,))
+
+        self.add(tab_name, hashes)
+
+    def drop(self, tab_name):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM keys WHERE tab = ?", (tab_name,))
+            conn.execute("DELETE FROM keys_meta WHERE tab = ?", (tab_name,))
+
+
+# =====================================================
+# CHAVES NATURAIS
+# =====================================================
+def _canonical(col, serie):
+    """Mesma representação para o valor do upload (texto/número) e o valor
+    lido do Sheets (já tipado pelo schema: Int64, categoria, datetime)."""
+    texto = (
+        serie.astype("string")
+        .fillna("")
+        .str.strip()
+        .str.replace(r"\.0$", "", regex=True)
+    )
+
+    if col == "data":
+        return parse_datas(serie).dt.strftime("%Y-%m-%d").fillna(texto)
+
+    return texto
+
+
+def hash_keys(tab_name, df):
+    """Hash (int64) da chave natural de cada linha, alinhado ao df."""
+    cols = NATURAL_KEYS[tab_name]
+
+    canonico = pd.DataFrame(
+        {col: _canonical(col, df[col]) for col in cols},
+        index=df.index
+    )
+
+    return pd.util.hash_pandas_object(canonico, index=False).astype("int64")
+
+
+# =====================================================
+# ÍNDICE POR PLANILHA
+# =====================================================
+# Sobe quando a forma canônica das chaves muda: índices antigos ficam
+# órfãos e o novo é refeito do Sheets no primeiro upload.
+KEYS_VERSION = 2
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_key_index():
+    from data.storage import dataset_id
+
+    sheet_id = dataset_id()
+
+    with _indexes_lock:
+        index = _indexes.get(sheet_id)
+        if index is None:
+            index = KeyIndex(os.path.join(KEYS_DIR, f"{sheet_id}-v{KEYS_VERSION}.sqlite"))
+            _indexes[sheet_id] = index
+
+        return index
+
+
+def rebuild_keys(tab_name, resync=False):
+    """Refaz o índice da aba a partir do conteúdo atual do Sheets.
+
+    Erro de leitura sobe (TabReadError) e o índice fica como estava: um
+    índice vazio deixaria o próximo upload gravar duplicados. Com
+    resync=True a aba é relida da fonte (linhas apagadas ou editadas à mão).
+    """
+    from data import storage
+
+    if tab_name not in NATURAL_KEYS:
+        return
+
+    if resync:
+        storage.resync(tab_name)
+
+    df = storage.read_tab(tab_name, strict=True)
+
+    get_key_index().replace(tab_name, [] if df.empty else hash_keys(tab_name, df))
+
+
+def rebuild_all_keys(resync=True):
+    """Refaz o índice de todas as abas com chave natural."""
+    for tab_name in NATURAL_KEYS:
+        rebuild_keys(tab_name, resync)
+
+
+@medido()
+def filter_new_rows(tab_name, df):
+    """Remove do df as linhas já gravadas na aba e as repetidas no próprio df."""
+    if df.empty or tab_name not in NATURAL_KEYS:
+        return df
+
+    index = get_key_index()
+    if not index.is_built(tab_name):
+        rebuild_keys(tab_name)
+
+    hashes = hash_keys(tab_name, df)
+
+    novas = ~hashes.duplicated() & ~hashes.isin(index.existing(tab_name, hashes.unique()))
+
+    return df[novas]
+
+
+@medido()
+def register_rows(tab_name, df):
+    """Registra no índice as chaves das linhas que acabaram de ser gravadas."""
+    if df.empty or tab_name not in NATURAL_KEYS:
+        return
+
+    get_key_index().add(tab_name, hash_keys(tab_name, df).unique())
@@ -0,0 +1,41 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class SQLiteStore:
+    """Base dos armazenamentos locais em SQLite (espelho, índices, agregados).
+
+    Subclasses declaram o DDL em SCHEMA; o arquivo e as tabelas são
+    criados na primeira conexão. Cada operação abre sua própria conexão,
+    então a instância pode ser usada por várias threads.
+    """
+
+    SCHEMA = []
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._ready = False
+
+    @contextmanager
+    def _connect(self):
+        with self._lock:
+            if not self._ready:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with self._lock:
+                if not self._ready:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    for ddl in self.SCHEMA:
+                        conn.execute(ddl)
+                    conn.commit()
+                    self._ready = True
+
+            with conn:
+                yield conn
+        finally:
+            conn.close()
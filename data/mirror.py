@@ -0,0 +1,112 @@
+import json
+
+from data.localdb import SQLiteStore
+
+
+class TabMirror(SQLiteStore):
+    """Espelho local (SQLite) das abas *_hist.
+
+    Guarda, por aba, o cabeçalho, as linhas já sincronizadas (valores
+    crus, como vêm do Sheets) e quantas linhas de dados já foram
+    copiadas. Como as abas só crescem via append_rows, a cada leitura
+    basta buscar as linhas depois de `synced_rows`.
+    """
+
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS mirror_meta ("
+        " tab TEXT PRIMARY KEY,"
+        " header TEXT NOT NULL,"
+        " synced_rows INTEGER NOT NULL)"
+    ]
+
+    @staticmethod
+    def _table(tab_name):
+        return '"rows_' + tab_name.replace('"', '""') + '"'
+
+    def state(self, tab_name):
+        """(cabeçalho, linhas sincronizadas) ou None se a aba nunca foi espelhada."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT header, synced_rows FROM mirror_meta WHERE tab = ?",
+                (tab_name,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return json.loads(row[0]), row[1]
+
+    def last_row(self, tab_name):
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT * FROM {self._table(tab_name)} ORDER BY _row DESC LIMIT 1"
+            ).fetchone()
+
+        return None if row is None else list(row[1:])
+
+    def replace(self, tab_name, header, rows):
+        """Reescreve o espelho da aba inteira (primeira sync ou ressync)."""
+        table = self._table(tab_name)
+        cols = [f"c{i}" for i in range(len(header))]
+
+        with self._connect() as conn:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(
+                f"CREATE TABLE {table} (_row INTEGER PRIMARY KEY"
+                + "".join(f", {c} TEXT" for c in cols)
+                + ")"
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO mirror_meta (tab, header, synced_rows)"
+                " VALUES (?, ?, 0)",
+                (tab_name, json.dumps(header))
+            )
+            self._insert(conn, tab_name, len(header), 0, rows)
+
+    def append(self, tab_name, rows):
+        """Acrescenta linhas novas depois das já sincronizadas."""
+        header, synced_rows = self.state(tab_name)
+
+        with self._connect() as conn:
+            self._insert(conn, tab_name, len(header), synced_rows, rows)
+
+    def _insert(self, conn, tab_name, width, start, rows):
+        if rows:
+            placeholders = ", ".join("?" * (width + 1))
+            conn.executemany(
+                f"INSERT INTO {self._table(tab_name)} VALUES ({placeholders})",
+                (
+                    [start + i] + (list(r[:width]) + [""] * (width - len(r)))
+                    for i, r in enumerate(rows, start=1)
+                )
+            )
+
+        conn.execute(
+            "UPDATE mirror_meta SET synced_rows = ? WHERE tab = ?",
+            (start + len(rows), tab_name)
+        )
+
+    def read_values(self, tab_name):
+        """Cabeçalho + linhas, no mesmo formato de ws.get_values()."""
+        state = self.state(tab_name)
+        if state is None:
+            return []
+
+        header, _ = state
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM {self._table(tab_name)} ORDER BY _row"
+            ).fetchall()
+
+        return [header] + [list(r[1:]) for r in rows]
+
+    def drop(self, tab_name=None):
+        with self._connect() as conn:
+            tabs = (
+                [tab_name] if tab_name is not None
+                else [r[0] for r in conn.execute("SELECT tab FROM mirror_meta")]
+            )
+            for tab in tabs:
+                conn.execute(f"DROP TABLE IF EXISTS {self._table(tab)}")
+                conn.execute("DELETE FROM mirror_meta WHERE tab = ?", (tab,))
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import deque
+
+
+class TokenBucket:
+    """Limitador de taxa (token bucket) compartilhado entre threads.
+
+    Enche `rate_per_minute` fichas por minuto até `capacity` (padrão: um
+    décimo da cota, uma rajada pequena); cada chamada à API consome uma
+    ficha e espera se não houver nenhuma. A cota do Sheets é uma janela
+    deslizante de 60 s, e saldo + reposição passariam dela no primeiro
+    minuto: as chamadas dos últimos 60 s também são contadas, e nunca
+    passam de `rate_per_minute`.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.per_minute = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or max(1, rate_per_minute // 10)
+
+        self._lock = threading.Lock()
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._janela = deque()
+
+        self.acquired = 0
+        self.waits = 0
+        self.waited_seconds = 0.0
+
+    def _refill(self, now):
+        self._tokens = min(
+            self.capacity,
+            self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def acquire(self, tokens=1):
+        """Consome `tokens` fichas, bloqueando até haver saldo."""
+        waited = 0.0
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                while self._janela and now - self._janela[0] >= 60:
+                    self._janela.popleft()
+
+                # a janela cheia manda esperar a chamada mais antiga sair dela
+                livre = 0.0
+                if len(self._janela) + tokens > self.per_minute:
+                    livre = self._janela[len(self._janela) + tokens - self.per_minute - 1] + 60 - now
+
+                if self._tokens >= tokens and livre <= 0:
+                    self._tokens -= tokens
+                    self._janela.extend([now] * tokens)
+                    self.acquired += 1
+                    if waited:
+                        self.waits += 1
+                        self.waited_seconds += waited
+                    return waited
+
+                wait = max((tokens - self._tokens) / self.rate, livre)
+
+            time.sleep(wait)
+            waited += wait
+
+    def drain(self):
+        """Zera o saldo (ex.: a API respondeu 429 mesmo dentro da cota)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = 0.0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "acquired": self.acquired,
+                "waits": self.waits,
+                "waited_seconds": round(self.waited_seconds, 2),
+            }
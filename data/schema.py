@@ -0,0 +1,223 @@
+import numpy as np
+import pandas as pd
+
+from config.settings import (
+    BASE_MOTORISTAS_TAB,
+    BASE_REGIAO_TAB,
+    DISPONIBILIDADE_TAB,
+    CARREGAMENTO_TAB,
+    DEVOLUCOES_TAB,
+    CANCELAMENTO_TAB,
+    RECUSAS_TAB
+)
+from utils.dates import parse_datas
+
+
+ID = "id"
+CATEGORY = "category"
+DATE = "date"
+BOOL = "bool"
+NUMBER = "number"
+
+# Tipos por aba, pelo nome normalizado da coluna (minúsculas, "_" no
+# lugar de espaço). Colunas fora do schema ficam como vieram.
+SCHEMAS = {
+    BASE_MOTORISTAS_TAB: {
+        "driver_id": ID,
+        "turno": CATEGORY,
+        "cep_ofertado": CATEGORY,
+    },
+    BASE_REGIAO_TAB: {
+        "cluster": CATEGORY,
+        "cep_base": CATEGORY,
+    },
+    DISPONIBILIDADE_TAB: {
+        "driver_id": ID,
+        "driver_name": CATEGORY,
+        "cluster": CATEGORY,
+        "vehicle_type": CATEGORY,
+        "cep_ofertado": CATEGORY,
+        "cep_base": CATEGORY,
+        "disponivel": BOOL,
+        "fora_da_regiao": BOOL,
+        "data": DATE,
+        "semana": CATEGORY,
+        "turno_base": CATEGORY,
+        "turno_ofertado": CATEGORY,
+        "data_importacao": DATE,
+    },
+    CARREGAMENTO_TAB: {
+        "task_id": ID,
+        "driver_id": ID,
+        "driver_name": CATEGORY,
+        "vehicle_type": CATEGORY,
+        "data": DATE,
+        "turno_carregamento": CATEGORY,
+        "semana": CATEGORY,
+        "turno_base": CATEGORY,
+        "fora_do_turno": BOOL,
+        "data_importacao": DATE,
+    },
+    DEVOLUCOES_TAB: {
+        "driver_id": ID,
+        "driver_name": CATEGORY,
+        "qtd_pacotes": NUMBER,
+        "data": DATE,
+        "semana": CATEGORY,
+        "turno_base": CATEGORY,
+        "data_importacao": DATE,
+    },
+    CANCELAMENTO_TAB: {
+        "driver_id": ID,
+        "driver_name": CATEGORY,
+        "data": DATE,
+        "turno": CATEGORY,
+        "semana": CATEGORY,
+        "data_importacao": DATE,
+    },
+    RECUSAS_TAB: {
+        "notification_id": ID,
+        "driver_id": ID,
+        "driver_name": CATEGORY,
+        "data": DATE,
+        "semana": CATEGORY,
+        "turno_recusa": CATEGORY,
+        "turno_base": CATEGORY,
+        "data_importacao": DATE,
+    },
+}
+
+
+# =====================================================
+# CONVERSORES (UMA VEZ POR VALOR DISTINTO)
+# =====================================================
+def to_id(serie):
+    """
+    Id canônico (Int64): 1414170, 1414170.0, "1414170" e " 1414170 "
+    viram o mesmo valor; vazio vira <NA>. Se algum valor não for um
+    inteiro (id alfanumérico), a coluna fica como está.
+    """
+    if pd.api.types.is_integer_dtype(serie):
+        return serie.astype("Int64")
+
+    codes, uniques = pd.factorize(serie)
+
+    texto = (
+        pd.Series(uniques, dtype=object)
+        .astype(str)
+        .str.strip()
+        .str.replace(r"\.0$", "", regex=True)
+    )
+    inteiros = texto.str.fullmatch(r"[+-]?\d+")
+    vazios = texto.eq("")
+
+    if not (inteiros | vazios).all():
+        return serie
+
+    valores = pd.Series(pd.NA, index=texto.index, dtype="Int64")
+    valores[inteiros] = texto[inteiros].astype("int64")
+
+    return pd.Series(
+        valores.array.take(codes, allow_fill=True),
+        index=serie.index,
+        name=serie.name
+    )
+
+
+def align_ids(*series):
+    """
+    to_id em cada série, para merge: se alguma tiver id não inteiro,
+    todas voltam como texto limpo (mesma regra, sem ".0").
+    """
+    ids = [to_id(s) for s in series]
+
+    if all(pd.api.types.is_integer_dtype(s) for s in ids):
+        return ids
+
+    return [
+        s.astype("string").str.strip().str.replace(r"\.0$", "", regex=True)
+        for s in ids
+    ]
+
+
+def to_category(serie):
+    """Categoria de strings; None/NaN vira <NA> (texto vazio continua "")."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie
+
+    codes, uniques = pd.factorize(serie)
+
+    # 5 e "5" são valores distintos no factorize, mas a mesma categoria
+    remap, categorias = pd.factorize(pd.Series(uniques, dtype=object).astype(str))
+    codes = np.where(codes >= 0, remap[np.maximum(codes, 0)], -1)
+
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=categorias),
+        index=serie.index,
+        name=serie.name
+    )
+
+
+_BOOLEANOS = {"true": True, "false": False, "verdadeiro": True, "falso": False}
+
+
+def to_bool(serie):
+    if pd.api.types.is_bool_dtype(serie):
+        return serie.astype("boolean")
+
+    codes, uniques = pd.factorize(serie)
+    valores = (
+        pd.Series(uniques, dtype=object)
+        .astype(str)
+        .str.strip()
+        .str.lower()
+        .map(_BOOLEANOS)
+        .astype("boolean")
+    )
+
+    return pd.Series(
+        valores.array.take(codes, allow_fill=True),
+        index=serie.index,
+        name=serie.name
+    )
+
+
+def to_number(serie):
+    return pd.to_numeric(serie, errors="coerce")
+
+
+CONVERSORES = {
+    ID: to_id,
+    CATEGORY: to_category,
+    DATE: parse_datas,
+    BOOL: to_bool,
+    NUMBER: to_number,
+}
+
+
+def decategorize(df):
+    """Cópia com as categorias em object, para quem escreve valores novos
+    nas colunas (fillna("N/D"), turno inferido...). Uso em frames pequenos:
+    bases e agregados."""
+    categoricas = df.select_dtypes("category").columns
+    return df.astype({c: object for c in categoricas}) if len(categoricas) else df.copy()
+
+
+def _normalizar_nome(coluna):
+    return str(coluna).strip().lower().replace(" ", "_")
+
+
+def apply_schema(tab_name, df):
+    """Aplica os tipos da aba às colunas presentes (sem renomear nada)."""
+    schema = SCHEMAS.get(tab_name)
+    if not schema or df is None or df.empty:
+        return df
+
+    df = df.copy(deep=False)
+
+    for coluna in df.columns:
+        tipo = schema.get(_normalizar_nome(coluna))
+        if tipo is not None:
+            df[coluna] = CONVERSORES[tipo](df[coluna])
+
+    return df
@@ -0,0 +1,159 @@
+"""
+DataFrame → linhas de texto para o append do Sheets (ou um CSV), coluna
+a coluna e em fatias: nada de cópia do frame inteiro em texto.
+
+Vazio (None, NaN, NaT, <NA>) e ±inf viram ""; o resto vira o mesmo
+texto que o astype(str) do pandas daria (bool "True", float "1.0",
+datas "AAAA-MM-DD" ou com hora quando a coluna tem hora).
+"""
+import numpy as np
+import pandas as pd
+
+
+# =====================================================
+# FORMATADORES POR COLUNA
+# =====================================================
+def _datetime_format(serie):
+    # o formato é decidido uma vez para a coluna inteira (como o astype(str)),
+    # e não por fatia: senão uma fatia só de meia-noite perderia a hora
+    valores = serie.dropna()
+    if valores.empty or (valores == valores.dt.normalize()).all():
+        return "%Y-%m-%d"
+    if (valores.dt.microsecond == 0).all():
+        return "%Y-%m-%d %H:%M:%S"
+    return "%Y-%m-%d %H:%M:%S.%f"
+
+
+def _format_datetime(fmt):
+    def formatar(serie):
+        return serie.dt.strftime(fmt).fillna("").tolist()
+    return formatar
+
+
+def _format_bool(serie):
+    return np.where(serie.to_numpy(), "True", "False").tolist()
+
+
+def _format_int(serie):
+    return serie.to_numpy().astype(str).tolist()
+
+
+def _format_float(serie):
+    valores = serie.to_numpy()
+    texto = valores.astype(str)
+    texto[~np.isfinite(valores)] = ""
+    return texto.tolist()
+
+
+def _format_category(serie):
+    # cada categoria vira texto uma vez; -1 (vazio) cai no "" do fim
+    categorias = [str(c) for c in serie.cat.categories] + [""]
+    return np.asarray(categorias, dtype=object)[serie.cat.codes.to_numpy()].tolist()
+
+
+def _format_masked(serie):
+    # Int64 / boolean: texto do valor numpy, "" onde é <NA>
+    vazio = serie.isna().to_numpy()
+    valores = serie.to_numpy(dtype=serie.dtype.numpy_dtype, na_value=0)
+    texto = np.where(valores, "True", "False") if valores.dtype == bool else valores.astype(str)
+    texto = texto.astype(object)
+    texto[vazio] = ""
+    return texto.tolist()
+
+
+def _format_object(serie):
+    # object e string: o caso comum (só texto) não passa por str() célula a célula
+    vazio = serie.isna().to_numpy()
+    valores = serie.to_numpy(dtype=object, copy=True)
+
+    if pd.api.types.infer_dtype(valores, skipna=True) in ("string", "empty"):
+        valores[vazio] = ""
+        return valores.tolist()
+
+    return [
+        "" if vazio[i] or (isinstance(v, float) and np.isinf(v)) else str(v)
+        for i, v in enumerate(valores)
+    ]
+
+
+def _formatter(serie):
+    dtype = serie.dtype
+
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return _format_datetime(_datetime_format(serie))
+    if isinstance(dtype, pd.CategoricalDtype):
+        return _format_category
+    if pd.api.types.is_extension_array_dtype(dtype):
+        if pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+            return _format_masked
+        return _format_object
+    if dtype == object:
+        return _format_object
+    if pd.api.types.is_bool_dtype(dtype):
+        return _format_bool
+    if pd.api.types.is_integer_dtype(dtype):
+        return _format_int
+    if pd.api.types.is_float_dtype(dtype):
+        return _format_float
+    return _format_object
+
+
+# =====================================================
+# LINHAS E BATCHES
+# =====================================================
+def row_size(row):
+    # aspas + vírgula por célula no JSON do request
+    return sum(len(v) + 3 for v in row) + 2
+
+
+def payload_bytes(rows):
+    return sum(row_size(r) for r in rows)
+
+
+def _chunks(df, chunk_rows):
+    """(linhas, tamanho de cada linha no payload) por fatia do df."""
+    formatadores = [_formatter(df.iloc[:, j]) for j in range(df.shape[1])]
+
+    for inicio in range(0, len(df), chunk_rows):
+        fatia = df.iloc[inicio:inicio + chunk_rows]
+        colunas = [f(fatia.iloc[:, j]) for j, f in enumerate(formatadores)]
+
+        # mesmo cálculo do row_size, por coluna em vez de célula a célula
+        tamanhos = np.full(len(fatia), 2 + 3 * len(colunas), dtype=np.int64)
+        for coluna in colunas:
+            tamanhos += np.fromiter(map(len, coluna), dtype=np.int64, count=len(coluna))
+
+        yield list(map(list, zip(*colunas))), tamanhos
+
+
+def iter_rows(df, chunk_rows=5_000):
+    """Listas de linhas (list[str]) de até chunk_rows, geradas sob demanda."""
+    if df is None or df.empty:
+        return
+
+    for linhas, _ in _chunks(df, chunk_rows):
+        yield linhas
+
+
+def row_batches(df, max_rows, max_bytes):
+    """(início, linhas, bytes) consecutivos com até max_rows linhas e
+    ~max_bytes de payload; cada fatia do df só é convertida quando o
+    batch é pedido."""
+    if df is None or df.empty:
+        return
+
+    inicio = 0
+    batch, size = [], 0
+
+    for linhas, tamanhos in _chunks(df, max_rows):
+        for linha, tamanho in zip(linhas, tamanhos.tolist()):
+            if batch and (len(batch) >= max_rows or size + tamanho > max_bytes):
+                yield inicio, batch, size
+                inicio += len(batch)
+                batch, size = [], 0
+
+            batch.append(linha)
+            size += tamanho
+
+    if batch:
+        yield inicio, batch, size
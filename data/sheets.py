@@ -1,52 +1,888 @@
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
-import streamlit as st
 import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import requests
+from gspread.exceptions import APIError, GSpreadException, WorksheetNotFound
+from gspread.utils import (
+    a1_range_to_grid_range,
+    absolute_range_name,
+    numericise,
+    rowcol_to_a1,
+    ValueRenderOption
+)
+from google.oauth2.service_account import Credentials
+
+from config.settings import (
+    CACHE_TTL_SECONDS,
+    CACHE_MAX_ENTRIES,
+    CACHE_MAX_BYTES,
+    VERSION_PROBE_SECONDS,
+    READ_MAX_WORKERS,
+    MIRROR_DIR,
+    MIRRORED_TABS,
+    APPEND_MAX_ROWS,
+    APPEND_MAX_BYTES,
+    WRITE_REQUESTS_PER_MINUTE,
+    APPEND_MAX_RETRIES,
+    APPEND_BACKOFF_SECONDS,
+    APPEND_BACKOFF_MAX_SECONDS,
+    WEEK_INDEXED_TABS,
+    GCP_CREDENTIALS_ENV,
+    SPREADSHEET_ID_ENV
+)
+from data.cache import TabCache
+from data.mirror import TabMirror
+from data.quota import TokenBucket
+from data.schema import apply_schema
+from data.serializer import row_batches
+from data.weeks import get_week_index, semanas_das_linhas
+from utils.perf import medir
+
+
+SCOPES = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive"
+]
+
+logger = logging.getLogger(__name__)
+
+# Mesmo texto que aparece na planilha (o padrão do get_all_records):
+# datas e ids chegam como estão formatados, e o numericise/schema tipam
+VALUE_RENDER_OPTION = ValueRenderOption.formatted
+
+
+# =====================================================
+# STREAMLIT OPCIONAL
+# =====================================================
+# Este módulo não importa o Streamlit: no app ele já está carregado e
+# em execução; na CLI/cron as credenciais vêm de variáveis de ambiente
+# e os erros vão para o logging.
+def _streamlit():
+    """Módulo streamlit se houver um script do Streamlit rodando, senão None."""
+    st = sys.modules.get("streamlit")
+    if st is None:
+        return None
+
+    from streamlit.runtime import exists
+    return st if exists() else None
+
+
+def _report_error(message):
+    logger.error(message)
+
+    st = _streamlit()
+    if st is not None:
+        st.error(message)
+
+
+def _service_account_info():
+    """Credencial do service account: RODIZIO_GCP_CREDENTIALS (caminho do
+    JSON ou o próprio JSON) ou, no app, st.secrets["gcp_service_account"]."""
+    value = os.environ.get(GCP_CREDENTIALS_ENV)
+
+    if value:
+        if value.lstrip().startswith("{"):
+            return json.loads(value)
+        with open(value, encoding="utf-8") as f:
+            return json.load(f)
+
+    st = _streamlit()
+    if st is None:
+        raise RuntimeError(
+            f"Sem credencial do Google: defina {GCP_CREDENTIALS_ENV} fora do Streamlit"
+        )
+
+    return dict(st.secrets["gcp_service_account"])
+
+
+def _default_spreadsheet_id():
+    value = os.environ.get(SPREADSHEET_ID_ENV)
+    if value:
+        return value
+
+    st = _streamlit()
+    if st is None:
+        raise RuntimeError(
+            f"Sem planilha: defina {SPREADSHEET_ID_ENV} fora do Streamlit"
+        )
+
+    return st.secrets["spreadsheet_id"]
+
+# =====================================================
+# POOL DE CONEXÃO (1 POR PROCESSO)
+# =====================================================
+# Credenciais, cliente gspread (sessão HTTP keep-alive) e handles de
+# planilha/aba vivem enquanto o processo do Streamlit viver e são
+# compartilhados entre threads e sessões.
+_lock = threading.RLock()
+_client = None
+_spreadsheets = {}
+_worksheets = {}
+_override = None
+
+_stats = {
+    "auth_calls": 0,
+    "auth_reused": 0,
+    "open_calls": 0,
+    "open_reused": 0,
+    "worksheet_calls": 0,
+    "worksheet_reused": 0,
+    "version_probes": 0,
+    "mirror_full_syncs": 0,
+    "mirror_rows_fetched": 0,
+    "append_batches": 0,
+    "append_retries": 0,
+}
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
 
 
 def get_client():
-    scope = [
-        "https://spreadsheets.google.com/feeds",
-        "https://www.googleapis.com/auth/drive"
-    ]
+    """Cliente gspread compartilhado.
+
+    O token é renovado automaticamente pela AuthorizedSession do
+    google-auth quando expira, então não é preciso reautorizar.
+    """
+    global _client
+
+    with _lock:
+        if _client is not None:
+            _stats["auth_reused"] += 1
+            return _client
+
+        creds = Credentials.from_service_account_info(
+            _service_account_info(),
+            scopes=SCOPES
+        )
+
+        _client = gspread.authorize(creds)
+        _stats["auth_calls"] += 1
+
+        return _client
+
+
+def use_spreadsheet(spreadsheet):
+    """Usa `spreadsheet` (ex.: data.fake_sheets.FakeSpreadsheet) no lugar
+    da planilha do Google neste processo; None volta ao normal."""
+    global _override
+
+    with _lock:
+        _override = spreadsheet
+        _worksheets.clear()
+
+    invalidate_cache()
+
+
+def get_spreadsheet(spreadsheet_id=None):
+    if _override is not None:
+        return _override
+
+    spreadsheet_id = spreadsheet_id or _default_spreadsheet_id()
+
+    with _lock:
+        sh = _spreadsheets.get(spreadsheet_id)
+        if sh is not None:
+            _stats["open_reused"] += 1
+            return sh
+
+        sh = get_client().open_by_key(spreadsheet_id)
+        _spreadsheets[spreadsheet_id] = sh
+        _stats["open_calls"] += 1
+
+        return sh
+
+
+def get_worksheet(tab_name):
+    sh = get_spreadsheet()
+
+    with _lock:
+        ws = _worksheets.get((sh.id, tab_name))
+        if ws is not None:
+            _stats["worksheet_reused"] += 1
+            return ws
+
+        ws = sh.worksheet(tab_name)
+        _worksheets[(sh.id, tab_name)] = ws
+        _stats["worksheet_calls"] += 1
+
+        return ws
+
+
+def reset_client():
+    """Descarta cliente e handles (ex.: credencial trocada ou aba recriada)."""
+    global _client
+
+    with _lock:
+        _client = None
+        _spreadsheets.clear()
+        _worksheets.clear()
+
+
+def get_stats():
+    with _lock:
+        stats = dict(_stats)
+
+    stats["write_quota"] = _write_quota.stats()
+    return stats
+
+
+# =====================================================
+# LEITURA / ESCRITA
+# =====================================================
+def _numericise_column(values):
+    """numericise de cada célula da coluna, calculado uma vez por valor
+    distinto (datas, turnos, nomes se repetem muito)."""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
 
-    creds_dict = st.secrets["gcp_service_account"]
+    convertidos = np.empty(len(uniques), dtype=object)
+    convertidos[:] = [numericise(v) for v in uniques]
 
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(
-        creds_dict,
-        scope
+    # mesma inferência de tipo do DataFrame montado a partir de dicts
+    return pd.Series(convertidos.take(codes)).infer_objects()
+
+
+def _values_to_df(values):
+    """Mesmo DataFrame que pd.DataFrame(ws.get_all_records()) geraria,
+    montado coluna a coluna em vez de um dict por linha."""
+    if not values:
+        return pd.DataFrame()
+
+    # linhas vêm sem as células vazias do fim: completa até a mais larga
+    # (o cabeçalho também, como no fill_gaps do get_all_records)
+    width = max(len(row) for row in values)
+    if len(values) < 2:
+        return pd.DataFrame()
+
+    header = _pad(values[0], width)
+
+    duplicadas = {c for c in header if header.count(c) > 1}
+    if duplicadas:
+        raise GSpreadException(f"Cabeçalho com colunas duplicadas: {duplicadas}")
+
+    rows = [row if len(row) == width else _pad(row, width) for row in values[1:]]
+
+    return pd.DataFrame(
+        {col: _numericise_column(cells) for col, cells in zip(header, zip(*rows))},
+        index=pd.RangeIndex(len(rows))
+    )
+
+
+# =====================================================
+# ESPELHO LOCAL DAS ABAS *_hist (SYNC INCREMENTAL)
+# =====================================================
+_mirrors = {}
+
+
+def get_mirror():
+    sh = get_spreadsheet()
+
+    with _lock:
+        mirror = _mirrors.get(sh.id)
+        if mirror is None:
+            mirror = TabMirror(os.path.join(MIRROR_DIR, f"{sh.id}.sqlite"))
+            _mirrors[sh.id] = mirror
+
+        return mirror
+
+
+def _pad(row, width):
+    return list(row[:width]) + [""] * (width - len(row))
+
+
+def _apply_tail(mirror, tab_name, header_values, tail_values):
+    """Aplica no espelho as linhas novas de uma busca incremental.
+
+    A busca começa na última linha já sincronizada; se ela ou o cabeçalho
+    não baterem com o espelho, a aba foi editada fora do append e o
+    espelho precisa ser refeito (retorna False).
+    """
+    header, _ = mirror.state(tab_name)
+    width = len(header)
+
+    if not header_values or header_values[0] != header:
+        return False
+
+    if not tail_values or _pad(tail_values[0], width) != mirror.last_row(tab_name):
+        return False
+
+    new_rows = tail_values[1:]
+    if new_rows:
+        mirror.append(tab_name, new_rows)
+
+    with _lock:
+        _stats["mirror_rows_fetched"] += len(new_rows)
+
+    return True
+
+
+def _plan_fetch(mirror, tab_names):
+    """[(aba, "full" | "tail", faixas)]: espelhadas com espelho buscam só o
+    cabeçalho e a partir da última linha sincronizada."""
+    plan = []
+    for tab_name in tab_names:
+        state = mirror.state(tab_name) if tab_name in MIRRORED_TABS else None
+
+        if state is None or state[1] == 0:
+            plan.append((tab_name, "full", [absolute_range_name(tab_name)]))
+            continue
+
+        header, synced_rows = state
+        last_col = rowcol_to_a1(1, len(header))[:-1]
+        plan.append((tab_name, "tail", [
+            absolute_range_name(tab_name, "1:1"),
+            absolute_range_name(tab_name, f"A{synced_rows + 1}:{last_col}")
+        ]))
+
+    return plan
+
+
+def _batch_get(plan):
+    with medir("sheets_batch_get") as span:
+        resp = get_spreadsheet().values_batch_get(
+            [r for _, _, ranges in plan for r in ranges],
+            params={"valueRenderOption": VALUE_RENDER_OPTION}
+        )
+        span.registrar(linhas=sum(
+            len(vr.get("values", [])) for vr in resp.get("valueRanges", [])
+        ))
+
+    return resp
+
+
+def _outside_grid(exc):
+    # 400 de faixa fora da grade (aba encolheu); aba inexistente também é
+    # 400, mas com outra mensagem ("Unable to parse range")
+    return (
+        isinstance(exc, APIError)
+        and exc.response.status_code == 400
+        and "exceeds grid limits" in str(exc)
     )
 
-    return gspread.authorize(creds)
 
+def _fetch_tabs(tab_names, contar=False):
+    """Baixa as abas em um único values_batch_get.
 
-def read_tab(tab_name):
-    client = get_client()
-    sh = client.open_by_key(st.secrets["spreadsheet_id"])
+    Abas espelhadas (MIRRORED_TABS) só buscam o cabeçalho e as linhas
+    depois da última sincronizada, e são respondidas pelo espelho local.
+    As demais vêm inteiras. Abas que falharem voltam como None (erro já
+    reportado). Se uma espelhada encolheu (a busca sai da grade), os
+    espelhos são refeitos e o batch é repetido uma vez; outras falhas do
+    batch (ex.: aba inexistente) caem para leitura aba a aba.
+
+    Com contar=True, devolve o número de linhas de dados de cada aba em
+    vez do DataFrame: as espelhadas só sincronizam o espelho.
+    """
+    mirror = get_mirror()
+    plan = _plan_fetch(mirror, tab_names)
 
     try:
-        ws = sh.worksheet(tab_name)
-        records = ws.get_all_records()
+        resp = _batch_get(plan)
+    except Exception as e:
+        tails = [tab_name for tab_name, kind, _ in plan if kind == "tail"]
+        if not (tails and _outside_grid(e)):
+            return _fetch_each(tab_names, contar)
+
+        # aba espelhada encolheu por fora: a busca incremental começa depois
+        # do fim dela. Refaz esses espelhos e tenta o batch uma vez mais
+        for tab_name in tails:
+            mirror.drop(tab_name)
+        plan = _plan_fetch(mirror, tab_names)
+
+        try:
+            resp = _batch_get(plan)
+        except Exception:
+            return _fetch_each(tab_names, contar)
+
+    value_ranges = iter(resp.get("valueRanges", []))
+
+    frames = {}
+    resync = []
+    for tab_name, kind, ranges in plan:
+        got = [next(value_ranges, {}).get("values", []) for _ in ranges]
+
+        try:
+            if kind == "full":
+                values = got[0]
+                if tab_name in MIRRORED_TABS and values:
+                    mirror.replace(tab_name, values[0], values[1:])
+                    with _lock:
+                        _stats["mirror_full_syncs"] += 1
+                frames[tab_name] = max(len(values) - 1, 0) if contar else _values_to_df(values)
+
+            elif _apply_tail(mirror, tab_name, *got):
+                frames[tab_name] = (
+                    mirror.state(tab_name)[1] if contar
+                    else _values_to_df(mirror.read_values(tab_name))
+                )
+
+            else:
+                resync.append(tab_name)
+
+        except Exception as e:
+            _report_error(f"Erro ao ler aba '{tab_name}': {e}")
+            frames[tab_name] = None
+
+    if resync:
+        for tab_name in resync:
+            mirror.drop(tab_name)
+        frames.update(_fetch_tabs(resync, contar))
+
+    return frames
+
+
+def _fetch_each(tab_names, contar=False):
+    frames = {t: _fetch_tab_single(t) for t in tab_names}
+    if contar:
+        return {t: None if df is None else len(df) for t, df in frames.items()}
+
+    return frames
+
+
+def resync_tab(tab_name):
+    """Força o espelho da aba a ser refeito na próxima leitura."""
+    get_mirror().drop(tab_name)
+    invalidate_cache(tab_name)
 
-        if not records:
-            return pd.DataFrame()
 
-        return pd.DataFrame(records)
+def _fetch_tab_single(tab_name):
+    try:
+        ws = get_worksheet(tab_name)
+        return _values_to_df(ws.get_values(value_render_option=VALUE_RENDER_OPTION))
+
+    except WorksheetNotFound:
+        # aba que ainda não existe (planilha nova) não tem linhas: não é
+        # falha de leitura nem erro para o usuário
+        logger.info("Aba '%s' ainda não existe; lida como vazia", tab_name)
+        return _values_to_df([])
 
     except Exception as e:
-        st.error(f"Erro ao ler aba '{tab_name}': {e}")
-        return pd.DataFrame()
+        _report_error(f"Erro ao ler aba '{tab_name}': {e}")
+        return None
+
+
+# =====================================================
+# CACHE DE LEITURA (VERSÃO DA PLANILHA + TTL + LRU)
+# =====================================================
+_cache = TabCache(
+    ttl=CACHE_TTL_SECONDS,
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=CACHE_MAX_BYTES
+)
+_tab_locks = {}
+_version = {"value": None, "probed_at": None}
+
+
+def _tab_lock(tab_name):
+    with _lock:
+        return _tab_locks.setdefault(tab_name, threading.Lock())
+
+
+def spreadsheet_version():
+    """modifiedTime da planilha no Drive, sondado no máximo a cada
+    VERSION_PROBE_SECONDS. None se a sonda falhar (vale só o TTL)."""
+    with _lock:
+        probed_at = _version["probed_at"]
+        if probed_at is not None and time.monotonic() - probed_at < VERSION_PROBE_SECONDS:
+            return _version["value"]
+
+    try:
+        value = get_spreadsheet().get_lastUpdateTime()
+    except Exception:
+        value = None
+
+    with _lock:
+        _version["value"] = value
+        _version["probed_at"] = time.monotonic()
+        _stats["version_probes"] += 1
+
+    return value
+
+
+def invalidate_cache(tab_name=None):
+    _cache.invalidate(tab_name)
+
+    with _lock:
+        _version["probed_at"] = None
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+class TabReadError(Exception):
+    """Abas que não puderam ser lidas (cota, rede, 5xx...). Quem não pode
+    tratar a aba como vazia (índices, agregados) lê com strict=True."""
+
+    def __init__(self, tab_names):
+        super().__init__(f"Erro ao ler as abas: {', '.join(tab_names)}")
+        self.tab_names = list(tab_names)
+
+
+def read_tabs(tab_names, strict=False):
+    """Lê várias abas, servindo do cache o que ainda estiver na versão
+    atual e baixando o resto em um único values_batch_get.
+
+    Retorna {aba: DataFrame}; aba que falhou vem vazia, ou, com
+    strict=True, levanta TabReadError.
+    """
+    tab_names = list(dict.fromkeys(tab_names))
+    if not tab_names:
+        return {}
+
+    with medir(f"read_tabs[{','.join(tab_names)}]") as span:
+        frames = _read_tabs(tab_names, strict)
+        span.registrar(
+            linhas=sum(len(df) for df in frames.values()),
+            n_bytes=sum(int(df.memory_usage(index=False).sum()) for df in frames.values())
+        )
+
+    return frames
+
+
+def _read_tabs(tab_names, strict=False):
+
+    version = spreadsheet_version()
+
+    frames = {}
+    failed = []
+    for tab_name in tab_names:
+        df = _cache.get(tab_name, version)
+        if df is not None:
+            frames[tab_name] = df
+
+    missing = sorted(t for t in tab_names if t not in frames)
+
+    # Um download por aba mesmo com várias sessões pedindo ao mesmo tempo
+    locks = [_tab_lock(t) for t in missing]
+    for lock in locks:
+        lock.acquire()
+
+    try:
+        pending = []
+        for tab_name in missing:
+            df = _cache.get(tab_name, version, count=False)
+            if df is not None:
+                frames[tab_name] = df
+            else:
+                pending.append(tab_name)
+
+        if pending:
+            for tab_name, df in _fetch_tabs(pending).items():
+                if df is None:
+                    failed.append(tab_name)
+                    frames[tab_name] = pd.DataFrame()
+                    continue
+
+                # tipado uma vez, antes do cache: quem lê do cache já
+                # recebe ids inteiros, categorias e datas
+                df = apply_schema(tab_name, df)
+                _cache.put(tab_name, version, df)
+                frames[tab_name] = df.copy()
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+
+    if strict and failed:
+        raise TabReadError(failed)
+
+    return {t: frames[t] for t in tab_names}
+
+
+def read_tab(tab_name, strict=False):
+    return read_tabs([tab_name], strict)[tab_name]
+
+
+def tab_rows(tab_names, strict=False):
+    """{aba: linhas de dados}, sem montar os DataFrames: as abas espelhadas
+    só baixam o que entrou depois da última sincronização. Aba que falhou
+    vem como None, ou, com strict=True, levanta TabReadError."""
+    tab_names = list(dict.fromkeys(tab_names))
+    if not tab_names:
+        return {}
+
+    locks = [_tab_lock(t) for t in sorted(tab_names)]
+    for lock in locks:
+        lock.acquire()
+
+    try:
+        with medir(f"tab_rows[{','.join(tab_names)}]") as span:
+            linhas = _fetch_tabs(tab_names, contar=True)
+            span.registrar(linhas=sum(n or 0 for n in linhas.values()))
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+
+    failed = [t for t in tab_names if linhas.get(t) is None]
+    if strict and failed:
+        raise TabReadError(failed)
+
+    return {t: linhas.get(t) for t in tab_names}
+
+
+def load_tabs(tab_names, max_workers=READ_MAX_WORKERS, strict=False):
+    """Lê as abas em paralelo, uma requisição por aba e no máximo
+    `max_workers` ao mesmo tempo; a latência fica perto da aba mais
+    lenta em vez da soma. Mesmo cache/espelho do read_tabs.
+
+    Retorna {aba: DataFrame}.
+    """
+    tab_names = list(dict.fromkeys(tab_names))
+    if len(tab_names) <= 1 or max_workers <= 1:
+        return read_tabs(tab_names, strict)
+
+    # sonda a versão uma vez aqui, e não uma por thread
+    spreadsheet_version()
+
+    # st.error dentro das threads precisa do contexto da sessão
+    ctx = None
+    if _streamlit() is not None:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+
+    def _read(tab_name):
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return read_tab(tab_name, strict)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tab_names))) as pool:
+        # um contexto por tarefa: os spans de cada thread vão para o coletor da sessão
+        futures = [
+            pool.submit(contextvars.copy_context().run, _read, tab_name)
+            for tab_name in tab_names
+        ]
+        return {t: f.result() for t, f in zip(tab_names, futures)}
 
 
-def append_df(tab_name, df):
+# =====================================================
+# LEITURA DE UMA SEMANA (ÍNDICE DE FAIXAS)
+# =====================================================
+def _fetch_week(tab_name, semana, index, state):
+    """Cabeçalho + faixas da semana + linhas ainda não indexadas, em um
+    values_batch_get. None se a aba mudou por fora do append (o que veio
+    não bate com o índice).
+
+    Como no espelho, as linhas novas são buscadas a partir da última já
+    indexada: uma faixa que começa depois do fim da aba sai da grade e o
+    Sheets recusa o batch inteiro.
+    """
+    linhas, colunas = state
+    last_col = rowcol_to_a1(1, max(colunas, 1))[:-1]
+    faixas = index.ranges(tab_name, semana)
+
+    try:
+        with medir("sheets_batch_get") as span:
+            resp = get_spreadsheet().values_batch_get(
+                [
+                    absolute_range_name(tab_name, "1:1"),
+                    absolute_range_name(tab_name, f"A{linhas}:{last_col}")
+                ] + [
+                    absolute_range_name(tab_name, f"A{primeira}:{last_col}{ultima}")
+                    for primeira, ultima in faixas
+                ],
+                params={"valueRenderOption": VALUE_RENDER_OPTION}
+            )
+            got = [vr.get("values", []) for vr in resp.get("valueRanges", [])]
+            span.registrar(linhas=sum(len(v) for v in got))
+
+    except APIError as e:
+        # 400: faixa fora da grade, a aba encolheu por fora do append
+        if e.response.status_code == 400:
+            return None
+        raise
+
+    if len(got) != len(faixas) + 2:
+        return None
+
+    header, tail = got[0], got[1]
+    if not header or len(header[0]) > colunas:
+        # coluna nova depois do índice: as faixas viriam cortadas
+        return None
+
+    if not tail:
+        # nem a última linha indexada existe mais
+        return None
+    tail = tail[1:]
+
+    values = header[:1]
+    for (primeira, ultima), rows in zip(faixas, got[2:]):
+        if len(rows) != ultima - primeira + 1:
+            return None
+        values.extend(rows)
+
+    if (semanas_das_linhas(_values_to_df(values)) != semana).any():
+        return None
+
+    # linhas gravadas sem passar pelo append_df (ou antes de o índice existir)
+    if tail:
+        semanas = semanas_das_linhas(_values_to_df(header[:1] + tail))
+        index.register(tab_name, linhas + 1, semanas, len(header[0]))
+        values.extend(row for row, s in zip(tail, semanas) if s == semana)
+
+    return apply_schema(tab_name, _values_to_df(values))
+
+
+def _read_week_full(tab_name, semana, index):
+    # aba sem índice (ou índice descartado): lê tudo uma vez e indexa
+    df = read_tab(tab_name, strict=True)
+    semanas = semanas_das_linhas(df)
+    index.rebuild(tab_name, semanas, len(df.columns))
+
+    return df[semanas == semana].reset_index(drop=True)
+
+
+def read_tab_week(tab_name, semana):
+    """Só as linhas da semana ('YYYY-Www') da aba.
+
+    Busca as faixas de linhas da semana (data.weeks) em vez da aba
+    inteira: o tráfego não cresce com o histórico. A primeira leitura de
+    uma aba sem índice lê a aba inteira e monta o índice.
+
+    Falha de leitura levanta TabReadError: um DataFrame vazio aqui seria
+    lido como "semana sem linhas".
+    """
+    version = spreadsheet_version()
+    key = (tab_name, semana)
+
+    df = _cache.get(key, version)
+    if df is not None:
+        return df
+
+    index = get_week_index()
+
+    with medir(f"read_tab_week[{tab_name}]") as span:
+        try:
+            state = index.state(tab_name)
+            df = None if state is None else _fetch_week(tab_name, semana, index, state)
+            if df is None:
+                df = _read_week_full(tab_name, semana, index)
+
+        except TabReadError:
+            raise
+
+        except Exception as e:
+            _report_error(f"Erro ao ler a semana {semana} da aba '{tab_name}': {e}")
+            raise TabReadError([tab_name]) from e
+
+        span.registrar(linhas=len(df))
+
+    _cache.put(key, version, df)
+    return df.copy()
+
+
+# =====================================================
+# ESCRITA (BATCHES + COTA + RETRY)
+# =====================================================
+_write_quota = TokenBucket(WRITE_REQUESTS_PER_MINUTE)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class PartialAppendError(Exception):
+    """Falha no meio do append; as `rows_sent` primeiras linhas já foram gravadas."""
+
+    def __init__(self, tab_name, rows_sent, cause):
+        super().__init__(
+            f"Append em '{tab_name}' interrompido após {rows_sent} linhas: {cause}"
+        )
+        self.tab_name = tab_name
+        self.rows_sent = rows_sent
+
+
+def _is_retryable(exc):
+    if isinstance(exc, APIError):
+        return exc.response.status_code in RETRYABLE_STATUS
+
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+
+
+def _append_batch(ws, batch):
+    """Um append_rows respeitando a cota; tenta de novo em 429/5xx/rede
+    com backoff exponencial e jitter.
+
+    Um 5xx pode vir depois de o Sheets já ter gravado o batch; nesse caso
+    o retry duplica as linhas na aba (raro, e visível no espelho/índice).
+    """
+    for attempt in range(APPEND_MAX_RETRIES + 1):
+        _write_quota.acquire()
+
+        try:
+            resp = ws.append_rows(batch, value_input_option="USER_ENTERED")
+            _count("append_batches")
+            return resp
+
+        except Exception as e:
+            if attempt == APPEND_MAX_RETRIES or not _is_retryable(e):
+                raise
+
+            if isinstance(e, APIError) and e.response.status_code == 429:
+                _write_quota.drain()
+
+            _count("append_retries")
+            delay = min(APPEND_BACKOFF_MAX_SECONDS, APPEND_BACKOFF_SECONDS * 2 ** attempt)
+            time.sleep(random.uniform(0, delay))
+
+
+def _index_appended(tab_name, resp, semanas, colunas):
+    """Registra no índice de semanas as linhas do batch, na faixa que a
+    resposta do append informa (updates.updatedRange)."""
+    index = get_week_index()
+
+    try:
+        updated = resp["updates"]["updatedRange"].rpartition("!")[2]
+        first_row = a1_range_to_grid_range(updated)["startRowIndex"] + 1
+        index.register(tab_name, first_row, semanas, colunas)
+    except Exception as e:
+        logger.warning("Índice de semanas de '%s' descartado: %s", tab_name, e)
+        index.drop(tab_name)
+
+
+def append_df(tab_name, df, progress=None):
+    """Grava o df no fim da aba em batches limitados por linhas e bytes.
+
+    `progress(enviadas, total)` é chamado depois de cada batch. Se um
+    batch falhar de vez, levanta PartialAppendError com quantas linhas
+    (do início do df) já foram gravadas.
+    """
     if df.empty:
         return
 
-    client = get_client()
-    sh = client.open_by_key(st.secrets["spreadsheet_id"])
-    ws = sh.worksheet(tab_name)
+    ws = get_worksheet(tab_name)
+    total = len(df)
+    sent = 0
+    semanas = semanas_das_linhas(df) if tab_name in WEEK_INDEXED_TABS else None
 
-    ws.append_rows(
-        df.astype(str).values.tolist(),
-        value_input_option="USER_ENTERED"
-    )
+    with medir(f"append_df[{tab_name}]") as span:
+        try:
+            # cada batch é serializado só quando vai ser enviado; um erro
+            # na serialização também deixa os batches anteriores gravados
+            for start, batch, n_bytes in row_batches(df, APPEND_MAX_ROWS, APPEND_MAX_BYTES):
+                with medir("append_batch") as batch_span:
+                    resp = _append_batch(ws, batch)
+                    batch_span.registrar(linhas=len(batch), n_bytes=n_bytes)
+
+                if semanas is not None:
+                    _index_appended(tab_name, resp, semanas[start:start + len(batch)], df.shape[1])
+
+                sent = start + len(batch)
+                if progress is not None:
+                    progress(sent, total)
+
+        except Exception as e:
+            raise PartialAppendError(tab_name, sent, e) from e
+
+        finally:
+            span.registrar(linhas=sent)
+            invalidate_cache(tab_name)
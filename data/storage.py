@@ -0,0 +1,425 @@
+"""
+Onde as abas são lidas e gravadas, atrás de uma interface só:
+
+    SheetsBackend      Google Sheets (data.sheets: cache, espelho, cota)
+    FakeSheetsBackend  o mesmo caminho do Sheets contra um FakeSpreadsheet
+                       em memória, com latência e cota configuráveis
+    LocalBackend       banco embutido (SQLite)
+                       com as abas como tabelas, para consultas pesadas
+
+O backend do processo vem de RODIZIO_STORAGE ou de STORAGE_BACKEND
+(config/settings.py). O resto do código usa as funções deste módulo
+(read_tabs, load_tabs, append_df...) e não sabe qual backend está ativo.
+"""
+import os
+import re
+import threading
+
+import pandas as pd
+
+from config.settings import (
+    STORAGE_BACKEND,
+    STORAGE_BACKEND_ENV,
+    LOCAL_DB_PATH,
+    FAKE_SHEETS_LATENCY_SECONDS,
+    FAKE_SHEETS_READS_PER_MINUTE,
+    FAKE_SHEETS_WRITES_PER_MINUTE,
+    CACHE_TTL_SECONDS,
+    CACHE_MAX_ENTRIES,
+    CACHE_MAX_BYTES,
+    MIRROR_DIR,
+    KEYS_DIR,
+    AGGREGATES_DIR,
+    WEEKS_DIR
+)
+from data.cache import TabCache
+from data.localdb import SQLiteStore
+from data.schema import apply_schema
+from data.serializer import iter_rows
+from data.sheets import PartialAppendError, TabReadError
+from data.weeks import semanas_das_linhas
+from utils.perf import medir
+
+
+class StorageBackend:
+    """Interface comum dos backends."""
+
+    name = None
+
+    def dataset_id(self):
+        """Identifica os dados (nome dos índices/agregados locais)."""
+        raise NotImplementedError
+
+    def read_tabs(self, tab_names, strict=False):
+        """{aba: DataFrame já tipado pelo schema}; aba ilegível → DataFrame
+        vazio, ou TabReadError com strict=True."""
+        raise NotImplementedError
+
+    def load_tabs(self, tab_names, strict=False):
+        return self.read_tabs(tab_names, strict)
+
+    def tab_version(self, tab_name):
+        """Muda quando a aba muda; None se não dá para saber (vale o TTL)."""
+        return None
+
+    def tab_rows(self, tab_names, strict=False):
+        """{aba: linhas de dados}; aqui, contando as abas lidas."""
+        return {t: len(df) for t, df in self.read_tabs(tab_names, strict).items()}
+
+    def read_tab_week(self, tab_name, semana):
+        """Só as linhas da semana ('YYYY-Www'); aqui, filtrando a aba lida."""
+        df = self.read_tabs([tab_name], strict=True)[tab_name]
+        return df[semanas_das_linhas(df) == semana].reset_index(drop=True)
+
+    def append_df(self, tab_name, df, progress=None):
+        """Grava o df no fim da aba; progress(enviadas, total) por batch."""
+        raise NotImplementedError
+
+    def invalidate(self, tab_name=None):
+        pass
+
+    def resync(self, tab_name):
+        """A próxima leitura vem da fonte, sem cache nem cópia local."""
+        self.invalidate(tab_name)
+
+    def stats(self):
+        return {}
+
+
+# =====================================================
+# GOOGLE SHEETS
+# =====================================================
+class SheetsBackend(StorageBackend):
+    name = "sheets"
+
+    def dataset_id(self):
+        from data.sheets import get_spreadsheet
+        return get_spreadsheet().id
+
+    def read_tabs(self, tab_names, strict=False):
+        from data.sheets import read_tabs
+        return read_tabs(tab_names, strict)
+
+    def load_tabs(self, tab_names, strict=False):
+        from data.sheets import load_tabs
+        return load_tabs(tab_names, strict=strict)
+
+    def tab_version(self, tab_name):
+        # o Drive só dá o modifiedTime da planilha inteira
+        from data.sheets import spreadsheet_version
+        return spreadsheet_version()
+
+    def tab_rows(self, tab_names, strict=False):
+        from data.sheets import tab_rows
+        return tab_rows(tab_names, strict)
+
+    def read_tab_week(self, tab_name, semana):
+        from data.sheets import read_tab_week
+        return read_tab_week(tab_name, semana)
+
+    def append_df(self, tab_name, df, progress=None):
+        from data.sheets import append_df
+        return append_df(tab_name, df, progress=progress)
+
+    def invalidate(self, tab_name=None):
+        from data.sheets import invalidate_cache
+        invalidate_cache(tab_name)
+
+    def resync(self, tab_name):
+        # o espelho só confere a última linha: edições no meio passariam
+        from data.sheets import resync_tab
+        resync_tab(tab_name)
+
+    def stats(self):
+        from data.sheets import get_stats, cache_stats
+        return {"conexao": get_stats(), "cache": cache_stats()}
+
+
+class FakeSheetsBackend(SheetsBackend):
+    """Todo o caminho do Sheets (cache, espelho, batches, retry) contra um
+    FakeSpreadsheet em memória. Os dados somem com o processo; o estado
+    local (espelho, chaves, agregados) do id "fake" é apagado ao criar."""
+
+    name = "fake_sheets"
+
+    def __init__(self, latency=FAKE_SHEETS_LATENCY_SECONDS,
+                 reads_per_minute=FAKE_SHEETS_READS_PER_MINUTE,
+                 writes_per_minute=FAKE_SHEETS_WRITES_PER_MINUTE):
+        from data.fake_sheets import FakeSpreadsheet
+        from data.sheets import use_spreadsheet
+
+        self.spreadsheet = FakeSpreadsheet(latency, reads_per_minute, writes_per_minute)
+        _drop_local_state(self.spreadsheet.id)
+        use_spreadsheet(self.spreadsheet)
+
+    def seed(self, frames):
+        """Preenche as abas ({aba: DataFrame}) antes do teste de carga."""
+        for tab_name, df in frames.items():
+            self.spreadsheet.seed(tab_name, df)
+        self.invalidate()
+
+    def stats(self):
+        stats = super().stats()
+        stats["fake"] = self.spreadsheet.stats()
+        return stats
+
+
+def _drop_local_state(dataset_id):
+    from data import aggregates, keys, sheets, weeks
+
+    # instâncias já abertas neste processo apontariam para arquivos apagados
+    sheets._mirrors.pop(dataset_id, None)
+    keys._indexes.pop(dataset_id, None)
+    aggregates._stores.pop(dataset_id, None)
+    weeks._indexes.pop(dataset_id, None)
+
+    for path in (
+        os.path.join(MIRROR_DIR, f"{dataset_id}.sqlite"),
+        os.path.join(KEYS_DIR, f"{dataset_id}-v{keys.KEYS_VERSION}.sqlite"),
+        os.path.join(AGGREGATES_DIR, f"{dataset_id}.sqlite"),
+        os.path.join(WEEKS_DIR, f"{dataset_id}.sqlite"),
+    ):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+# =====================================================
+# BANCO LOCAL (SQLite)
+# =====================================================
+META_DDL = (
+    "CREATE TABLE IF NOT EXISTS tabs_meta ("
+    " tab TEXT PRIMARY KEY,"
+    " revision INTEGER NOT NULL)"
+)
+
+
+class _SQLiteEngine(SQLiteStore):
+    SCHEMA = [META_DDL]
+
+    def connect(self):
+        return self._connect()
+
+    def read_df(self, conn, sql, params=()):
+        return pd.read_sql_query(sql, conn, params=params)
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class LocalBackend(StorageBackend):
+    """Abas como tabelas de texto (o mesmo texto que iria para o Sheets),
+    na ordem de gravação. A leitura passa pelo mesmo numericise + schema
+    do Sheets, então os DataFrames são equivalentes; query() roda SQL
+    direto no banco para as consultas pesadas de histórico."""
+
+    name = "local"
+
+    def __init__(self, path=LOCAL_DB_PATH):
+        self.engine = _SQLiteEngine(path)
+        self.path = path
+        self._cache = TabCache(
+            ttl=CACHE_TTL_SECONDS,
+            max_entries=CACHE_MAX_ENTRIES,
+            max_bytes=CACHE_MAX_BYTES
+        )
+
+    def dataset_id(self):
+        nome = os.path.splitext(os.path.basename(self.path))[0]
+        return "local-" + re.sub(r"[^0-9A-Za-z_-]", "_", nome)
+
+    # -------------------------------
+    # Leitura
+    # -------------------------------
+    def _revision(self, conn, tab_name):
+        row = conn.execute(
+            "SELECT revision FROM tabs_meta WHERE tab = ?", (tab_name,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def _read_tab(self, conn, tab_name):
+        from data.sheets import _numericise_column
+
+        df = self.engine.read_df(conn, f"SELECT * FROM {_quote(tab_name)} ORDER BY rowid")
+        if df.empty:
+            return pd.DataFrame()
+
+        # colunas criadas depois têm NULL nas linhas antigas: no Sheets, ""
+        return pd.DataFrame(
+            {col: _numericise_column(df[col].fillna("").to_numpy()) for col in df.columns},
+            index=pd.RangeIndex(len(df))
+        )
+
+    def tab_version(self, tab_name):
+        with self.engine.connect() as conn:
+            return self._revision(conn, tab_name)
+
+    def read_tabs(self, tab_names, strict=False):
+        # erro do banco já sobe; aba que não existe é só vazia
+        tab_names = list(dict.fromkeys(tab_names))
+        frames = {}
+
+        with medir(f"read_tabs[{','.join(tab_names)}]") as span, self.engine.connect() as conn:
+            for tab_name in tab_names:
+                revision = self._revision(conn, tab_name)
+                if revision is None:
+                    frames[tab_name] = pd.DataFrame()
+                    continue
+
+                df = self._cache.get(tab_name, revision)
+                if df is None:
+                    df = apply_schema(tab_name, self._read_tab(conn, tab_name))
+                    self._cache.put(tab_name, revision, df)
+                    df = df.copy()
+
+                frames[tab_name] = df
+
+            span.registrar(linhas=sum(len(df) for df in frames.values()))
+
+        return frames
+
+    def tab_rows(self, tab_names, strict=False):
+        with self.engine.connect() as conn:
+            return {
+                tab_name: 0 if self._revision(conn, tab_name) is None
+                else conn.execute(f"SELECT COUNT(*) FROM {_quote(tab_name)}").fetchone()[0]
+                for tab_name in dict.fromkeys(tab_names)
+            }
+
+    def query(self, sql, params=()):
+        """DataFrame com o resultado de um SELECT (abas = tabelas com o nome da aba)."""
+        with self.engine.connect() as conn:
+            return self.engine.read_df(conn, sql, params)
+
+    # -------------------------------
+    # Escrita
+    # -------------------------------
+    def _ensure_columns(self, conn, tab_name, columns):
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {_quote(tab_name)} ("
+            + ", ".join(f"{_quote(c)} TEXT" for c in columns) + ")"
+        )
+
+        existing = set(self.engine.read_df(conn, f"SELECT * FROM {_quote(tab_name)} LIMIT 0").columns)
+        for col in columns:
+            if col not in existing:
+                conn.execute(f"ALTER TABLE {_quote(tab_name)} ADD COLUMN {_quote(col)} TEXT")
+
+    def append_df(self, tab_name, df, progress=None):
+        """Tudo em uma transação: ou o df inteiro entra, ou nada."""
+        if df.empty:
+            return
+
+        columns = [str(c) for c in df.columns]
+        insert = (
+            f"INSERT INTO {_quote(tab_name)} ({', '.join(map(_quote, columns))})"
+            f" VALUES ({', '.join('?' * len(columns))})"
+        )
+
+        sent = 0
+        with medir(f"append_df[{tab_name}]") as span:
+            try:
+                with self.engine.connect() as conn:
+                    self._ensure_columns(conn, tab_name, columns)
+
+                    for linhas in iter_rows(df):
+                        conn.executemany(insert, linhas)
+                        sent += len(linhas)
+                        if progress is not None:
+                            progress(sent, len(df))
+
+                    conn.execute(
+                        "INSERT INTO tabs_meta VALUES (?, 1)"
+                        " ON CONFLICT(tab) DO UPDATE SET revision = revision + 1",
+                        (tab_name,)
+                    )
+            except Exception as e:
+                # a transação foi desfeita: nenhuma linha gravada
+                raise PartialAppendError(tab_name, 0, e) from e
+            finally:
+                span.registrar(linhas=sent)
+
+    def invalidate(self, tab_name=None):
+        self._cache.invalidate(tab_name)
+
+    def stats(self):
+        return {"engine": "sqlite", "path": self.path, "cache": self._cache.stats()}
+
+
+# =====================================================
+# BACKEND DO PROCESSO
+# =====================================================
+BACKENDS = {
+    "sheets": SheetsBackend,
+    "fake_sheets": FakeSheetsBackend,
+    "local": LocalBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+
+    with _backend_lock:
+        if _backend is None:
+            name = os.environ.get(STORAGE_BACKEND_ENV) or STORAGE_BACKEND
+            if name not in BACKENDS:
+                raise ValueError(f"Backend de armazenamento desconhecido: {name!r} ({', '.join(BACKENDS)})")
+            _backend = BACKENDS[name]()
+
+        return _backend
+
+
+def set_backend(backend):
+    """Troca o backend do processo (ex.: testes de carga, CLI)."""
+    global _backend
+
+    with _backend_lock:
+        _backend = backend
+
+
+def dataset_id():
+    return get_backend().dataset_id()
+
+
+def read_tabs(tab_names, strict=False):
+    return get_backend().read_tabs(tab_names, strict)
+
+
+def read_tab(tab_name, strict=False):
+    return read_tabs([tab_name], strict)[tab_name]
+
+
+def load_tabs(tab_names, strict=False):
+    return get_backend().load_tabs(tab_names, strict)
+
+
+def tab_version(tab_name):
+    return get_backend().tab_version(tab_name)
+
+
+def tab_rows(tab_names, strict=False):
+    return get_backend().tab_rows(tab_names, strict)
+
+
+def read_tab_week(tab_name, semana):
+    return get_backend().read_tab_week(tab_name, semana)
+
+
+def append_df(tab_name, df, progress=None):
+    return get_backend().append_df(tab_name, df, progress=progress)
+
+
+def invalidate(tab_name=None):
+    get_backend().invalidate(tab_name)
+
+
+def resync(tab_name):
+    get_backend().resync(tab_name)
+
+
+def get_stats():
+    return get_backend().stats()
@@ -0,0 +1,179 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config.settings import WEEKS_DIR
+from data.localdb import SQLiteStore
+from utils.dates import normalizar_semana
+from utils.normalize import normalize_columns
+
+
+def semanas_das_linhas(df):
+    """Semana normalizada ('YYYY-Www') de cada linha do df, na ordem; None
+    onde não há semana. Só as colunas semana/data são copiadas."""
+    if df is None or df.empty:
+        return np.empty(0, dtype=object)
+
+    colunas = [
+        c for c in df.columns
+        if str(c).strip().lower().replace(" ", "_") in ("semana", "data")
+    ]
+    sub = normalize_columns(df[colunas])
+
+    if "semana" not in sub.columns:
+        return np.full(len(df), None, dtype=object)
+
+    return normalizar_semana(sub)["semana"].to_numpy(dtype=object)
+
+
+def ordenar_por_semana(df):
+    """Linhas da mesma semana juntas (ordem estável; sem semana no fim),
+    para o append gravar poucas faixas por semana."""
+    if df is None or len(df) < 2:
+        return df
+
+    chave = pd.Series(semanas_das_linhas(df), dtype=object).fillna("~")
+    ordem = chave.argsort(kind="stable").to_numpy()
+
+    return df.iloc[ordem].reset_index(drop=True)
+
+
+def _faixas(semanas, primeira_linha):
+    """(semana, primeira, última) de cada sequência de linhas seguidas da
+    mesma semana; linhas sem semana ficam de fora."""
+    if len(semanas) == 0:
+        return []
+
+    valores = pd.Series(semanas, dtype=object).fillna("").to_numpy()
+    inicios = np.flatnonzero(np.r_[True, valores[1:] != valores[:-1]])
+    fins = np.r_[inicios[1:], len(valores)] - 1
+
+    return [
+        (valores[i], primeira_linha + int(i), primeira_linha + int(f))
+        for i, f in zip(inicios, fins)
+        if valores[i] != ""
+    ]
+
+
+class WeekIndex(SQLiteStore):
+    """Faixas de linhas de cada semana por aba (linha 1 = cabeçalho).
+
+    As abas *_hist recebem as linhas mais ou menos em ordem cronológica,
+    então cada semana ocupa poucas faixas contíguas: ler uma semana vira
+    um values_batch_get só dessas faixas, do mesmo tamanho com um ano ou
+    dez de histórico. `linhas` é até onde a aba já está indexada.
+    """
+
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS faixas ("
+        " tab TEXT NOT NULL,"
+        " semana TEXT NOT NULL,"
+        " primeira INTEGER NOT NULL,"
+        " ultima INTEGER NOT NULL,"
+        " PRIMARY KEY (tab, primeira)) WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS faixas_semana ON faixas (tab, semana)",
+        "CREATE TABLE IF NOT EXISTS faixas_meta ("
+        " tab TEXT PRIMARY KEY,"
+        " linhas INTEGER NOT NULL,"
+        " colunas INTEGER NOT NULL)"
+    ]
+
+    def state(self, tab_name):
+        """(linhas indexadas, largura do cabeçalho) ou None se a aba não tem índice."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT linhas, colunas FROM faixas_meta WHERE tab = ?", (tab_name,)
+            ).fetchone()
+
+        return None if row is None else (row[0], row[1])
+
+    def ranges(self, tab_name, semana):
+        """[(primeira, última)] da semana, em ordem de linha."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT primeira, ultima FROM faixas"
+                " WHERE tab = ? AND semana = ? ORDER BY primeira",
+                (tab_name, semana)
+            ).fetchall()
+
+        return [(r[0], r[1]) for r in rows]
+
+    def rebuild(self, tab_name, semanas, colunas):
+        """Índice da aba inteira, a partir das semanas de todas as linhas."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM faixas WHERE tab = ?", (tab_name,))
+            conn.execute(
+                "INSERT OR REPLACE INTO faixas_meta VALUES (?, 1, ?)",
+                (tab_name, colunas)
+            )
+            self._extend(conn, tab_name, 2, semanas, colunas)
+
+    def register(self, tab_name, primeira_linha, semanas, colunas):
+        """Linhas gravadas a partir de `primeira_linha` (ex.: resposta do
+        append). Se não emendarem no que já está indexado, a aba mudou por
+        fora e o índice dela é descartado (refeito na próxima leitura)."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT linhas FROM faixas_meta WHERE tab = ?", (tab_name,)
+            ).fetchone()
+
+            if row is None:
+                return
+
+            if primeira_linha != row[0] + 1:
+                self._drop(conn, tab_name)
+                return
+
+            self._extend(conn, tab_name, primeira_linha, semanas, colunas)
+
+    def _extend(self, conn, tab_name, primeira_linha, semanas, colunas):
+        faixas = _faixas(semanas, primeira_linha)
+
+        # a primeira faixa pode só continuar a última já gravada
+        if faixas:
+            semana, primeira, ultima = faixas[0]
+            emendou = conn.execute(
+                "UPDATE faixas SET ultima = ?"
+                " WHERE tab = ? AND semana = ? AND ultima = ?",
+                (ultima, tab_name, semana, primeira - 1)
+            ).rowcount
+            if emendou:
+                faixas = faixas[1:]
+
+        conn.executemany(
+            "INSERT INTO faixas VALUES (?, ?, ?, ?)",
+            [(tab_name, s, p, u) for s, p, u in faixas]
+        )
+        conn.execute(
+            "UPDATE faixas_meta SET linhas = ?, colunas = MAX(colunas, ?) WHERE tab = ?",
+            (primeira_linha + len(semanas) - 1, colunas, tab_name)
+        )
+
+    @staticmethod
+    def _drop(conn, tab_name):
+        conn.execute("DELETE FROM faixas WHERE tab = ?", (tab_name,))
+        conn.execute("DELETE FROM faixas_meta WHERE tab = ?", (tab_name,))
+
+    def drop(self, tab_name):
+        with self._connect() as conn:
+            self._drop(conn, tab_name)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_week_index():
+    from data.storage import dataset_id
+
+    sheet_id = dataset_id()
+
+    with _indexes_lock:
+        index = _indexes.get(sheet_id)
+        if index is None:
+            index = WeekIndex(os.path.join(WEEKS_DIR, f"{sheet_id}.sqlite"))
+            _indexes[sheet_id] = index
+
+        return index
@@ -0,0 +1,173 @@
+import logging
+
+import pandas as pd
+
+from config.settings import (
+    DISPONIBILIDADE_TAB,
+    CARREGAMENTO_TAB,
+    DEVOLUCOES_TAB,
+    CANCELAMENTO_TAB,
+    RECUSAS_TAB
+)
+from data.aggregates import get_aggregate_store
+from data.storage import load_tabs, read_tab_week, tab_rows, tab_version
+from metrics.rodizio import (
+    agregar_disponibilidade,
+    agregar_carregamento,
+    agregar_devolucoes,
+    agregar_cancelamentos,
+    agregar_recusas,
+    agregar_rodizio,
+    pontuar_rodizio_multi,
+    preparar_historico
+)
+from utils.dates import normalizar_semana
+from utils.perf import medido
+
+
+logger = logging.getLogger(__name__)
+
+CHAVES = ["semana", "driver_id"]
+
+AGREGADORES = {
+    DISPONIBILIDADE_TAB: agregar_disponibilidade,
+    CARREGAMENTO_TAB: agregar_carregamento,
+    DEVOLUCOES_TAB: agregar_devolucoes,
+    CANCELAMENTO_TAB: agregar_cancelamentos,
+    RECUSAS_TAB: agregar_recusas,
+}
+
+
+def agregar_upload(nome_tab, df):
+    """Delta de um upload já salvo, por (semana, driver_id)"""
+    if nome_tab not in AGREGADORES or df is None or df.empty:
+        return pd.DataFrame()
+
+    df = normalizar_semana(preparar_historico(df))
+    return AGREGADORES[nome_tab](df, CHAVES)
+
+
+def _versoes():
+    versoes = {tab: tab_version(tab) for tab in AGREGADORES}
+    return {tab: None if v is None else str(v) for tab, v in versoes.items()}
+
+
+@medido()
+def reconstruir_agregados():
+    """Recalcula todos os agregados a partir do histórico completo. Erro
+    ao ler qualquer aba (TabReadError) sobe e o store fica como estava."""
+    # versões antes da leitura: o que for gravado depois já muda a versão
+    versoes = _versoes()
+    hist = load_tabs(list(AGREGADORES), strict=True)
+
+    if all(df.empty for df in hist.values()):
+        return
+
+    frames = [
+        normalizar_semana(preparar_historico(hist[tab]))
+        for tab in AGREGADORES
+    ]
+
+    get_aggregate_store().replace(
+        agregar_rodizio(*frames, chaves=CHAVES),
+        {tab: (len(hist[tab]), versoes[tab]) for tab in AGREGADORES}
+    )
+
+
+@medido()
+def recalcular_semana(semana):
+    """Recalcula os agregados de uma semana lendo só as linhas dela.
+    Se alguma aba não puder ser lida, levanta o erro sem tocar na semana."""
+    store = get_aggregate_store()
+
+    if not store.is_built():
+        reconstruir_agregados()
+        return
+
+    frames = [
+        normalizar_semana(preparar_historico(read_tab_week(tab, semana)))
+        for tab in AGREGADORES
+    ]
+
+    store.replace_week(semana, agregar_rodizio(*frames, chaves=CHAVES))
+
+
+@medido()
+def atualizar_agregados(nome_tab, df):
+    """Dobra no agregado o que acabou de ser gravado na aba"""
+    store = get_aggregate_store()
+
+    if not store.is_built():
+        # o histórico lido já inclui as linhas recém-gravadas
+        reconstruir_agregados()
+        return
+
+    versao = tab_version(nome_tab)
+    store.fold_upload(
+        nome_tab, agregar_upload(nome_tab, df), len(df),
+        None if versao is None else str(versao)
+    )
+
+
+def _em_dia(store):
+    """
+    Os agregados cobrem tudo o que está nas abas? Com a versão de cada aba
+    igual à guardada, sim, sem ler nada; se mudou, compara o número de
+    linhas das abas que mudaram (tab_rows: no Sheets, só o que entrou
+    depois do espelho): linhas gravadas por fora (CLI em outra máquina,
+    outra réplica, edição à mão) deixam o store desatualizado. Edição que
+    não muda o número de linhas só entra com 🔄 Recalcular.
+    """
+    fontes = store.sources()
+    versoes = _versoes()
+
+    mudaram = [
+        tab for tab, v in versoes.items()
+        if v is None or fontes.get(tab, (None, None))[1] != v
+    ]
+    if not mudaram:
+        return True
+
+    linhas = tab_rows(mudaram, strict=True)
+    if any(fontes.get(tab, (None, None))[0] != linhas[tab] for tab in mudaram):
+        return False
+
+    store.mark_versions(versoes)
+    return True
+
+
+def _store_pronto():
+    store = get_aggregate_store()
+
+    if not store.is_built():
+        reconstruir_agregados()
+        return store
+
+    try:
+        if not _em_dia(store):
+            reconstruir_agregados()
+    except Exception as e:
+        # sem conseguir conferir/reler as abas, vale o que já está no store
+        logger.warning("Agregados não conferidos com as abas: %s", e)
+
+    return store
+
+
+def semanas_disponiveis():
+    return _store_pronto().weeks_with_availability()
+
+
+def ler_agregados(semana=None):
+    return _store_pronto().read(semana)
+
+
+def revisao_agregados():
+    return _store_pronto().revision()
+
+
+@medido()
+def cubo_rodizio(base_motoristas=None):
+    """Cubo semana × driver de todas as semanas, direto dos agregados;
+    dias_sem_carregar vem da última carga de cada motorista no histórico"""
+    store = _store_pronto()
+    return pontuar_rodizio_multi(store.read(), base_motoristas, store.last_loads())
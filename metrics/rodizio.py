@@ -1,91 +1,229 @@
 import pandas as pd
-from datetime import datetime
+from data.schema import align_ids, decategorize, to_id
 from utils.normalize import normalize_columns
-import streamlit as st
+from utils.dates import dias_desde, normalizar_semana, parse_datas
+from utils.perf import medido
 
 
-def consolidar_rodizio(
-    disp,
-    carg,
-    dev,
-    canc,
-    rec,
-    base_motoristas=None,
-):
-    # ==================================================
-    # NORMALIZA
-    # ==================================================
-    disp = normalize_columns(disp)
-    carg = normalize_columns(carg)
-    dev = normalize_columns(dev)
-    canc = normalize_columns(canc)
-    rec = normalize_columns(rec)
+COLUNAS_AGREGADAS = [
+    "driver_name",
+    "disp_am",
+    "disp_sd",
+    "disp_total",
+    "carg_total",
+    "carg_am",
+    "carg_sd",
+    "ultima_carga",
+    "devolucoes",
+    "cancelamentos",
+    "recusas",
+]
 
-    if base_motoristas is not None:
-        base_motoristas = normalize_columns(base_motoristas)
 
-    # ==================================================
-    # DRIVER_ID STRING (ANTI-FLOAT .0)
-    # ==================================================
-    for df_ in [disp, carg, dev, canc, rec, base_motoristas]:
-        if df_ is not None and "driver_id" in df_.columns:
-            df_["driver_id"] = (
-                df_["driver_id"]
-                .astype(str)
-                .str.replace(r"\.0$", "", regex=True)
-            )
+# ==================================================
+# HELPERS
+# ==================================================
+def preparar_historico(df):
+    """Normaliza colunas e deixa driver_id no tipo do schema (Int64)"""
+    df = normalize_columns(df)
+
+    if "driver_id" in df.columns:
+        df["driver_id"] = to_id(df["driver_id"])
+
+    return df
+
+
+def _vazio(chaves, colunas):
+    return pd.DataFrame(columns=list(chaves) + colunas)
+
+
+# ==================================================
+# AGREGAÇÃO POR FONTE
+# (somáveis entre uploads: o que chega em cada upload
+#  pode ser dobrado no agregado já existente)
+# ==================================================
+def agregar_disponibilidade(disp, chaves=("driver_id",)):
+    chaves = list(chaves)
+    if disp.empty:
+        return _vazio(chaves, ["driver_name", "disp_am", "disp_sd", "disp_total"])
+
+    disp = disp.assign(
+        disp_am=(disp["turno_ofertado"] == "AM").astype(int),
+        disp_sd=(disp["turno_ofertado"] == "SD").astype(int),
+    )
+
+    return disp.groupby(chaves, as_index=False).agg(
+        driver_name=("driver_name", "first"),
+        disp_am=("disp_am", "sum"),
+        disp_sd=("disp_sd", "sum"),
+        disp_total=("turno_ofertado", "count")
+    )
+
+
+def agregar_carregamento(carg, chaves=("driver_id",)):
+    chaves = list(chaves)
+    if carg.empty:
+        return _vazio(chaves, ["carg_total", "carg_am", "carg_sd", "ultima_carga"])
+
+    carg = carg.assign(
+        carg_am=(carg["turno_carregamento"] == "AM").astype(int),
+        carg_sd=(carg["turno_carregamento"] == "SD").astype(int),
+        ultima_carga=(
+            parse_datas(carg["data"]) if "data" in carg.columns
+            else pd.Series(pd.NaT, index=carg.index)
+        ),
+    )
+
+    return carg.groupby(chaves, as_index=False).agg(
+        carg_total=("task_id", "count"),
+        carg_am=("carg_am", "sum"),
+        carg_sd=("carg_sd", "sum"),
+        ultima_carga=("ultima_carga", "max")
+    )
+
+
+def agregar_devolucoes(dev, chaves=("driver_id",)):
+    chaves = list(chaves)
+    if dev.empty:
+        return _vazio(chaves, ["devolucoes"])
+
+    dev = dev.assign(qtd_pacotes=pd.to_numeric(dev["qtd_pacotes"], errors="coerce"))
+
+    return dev.groupby(chaves, as_index=False).agg(devolucoes=("qtd_pacotes", "sum"))
+
+
+def agregar_cancelamentos(canc, chaves=("driver_id",)):
+    chaves = list(chaves)
+    if canc.empty:
+        return _vazio(chaves, ["cancelamentos"])
+
+    return (
+        canc.groupby(chaves, as_index=False)
+        .size()
+        .rename(columns={"size": "cancelamentos"})
+    )
+
+
+def agregar_recusas(rec, chaves=("driver_id",)):
+    chaves = list(chaves)
+    if rec.empty:
+        return _vazio(chaves, ["recusas"])
+
+    return (
+        rec.groupby(chaves, as_index=False)
+        .size()
+        .rename(columns={"size": "recusas"})
+    )
+
+
+@medido()
+def agregar_rodizio(disp, carg, dev, canc, rec, chaves=("driver_id",)):
+    """
+    1 linha por chave (driver_id, ou semana + driver_id) com tudo que o
+    rodízio precisa antes da pontuação.
+    """
+    chaves = list(chaves)
+
+    partes = [
+        agregar_disponibilidade(preparar_historico(disp), chaves),
+        agregar_carregamento(preparar_historico(carg), chaves),
+        agregar_devolucoes(preparar_historico(dev), chaves),
+        agregar_cancelamentos(preparar_historico(canc), chaves),
+        agregar_recusas(preparar_historico(rec), chaves),
+    ]
+
+    agg = partes[0]
+    for parte in partes[1:]:
+        agg = agg.merge(parte, on=chaves, how="outer")
+
+    for col in COLUNAS_AGREGADAS:
+        if col not in ("driver_name", "ultima_carga"):
+            agg[col] = pd.to_numeric(agg[col], errors="coerce").fillna(0)
+
+    return agg[chaves + COLUNAS_AGREGADAS]
+
+
+# ==================================================
+# PONTUAÇÃO FINAL
+# ==================================================
+def _dias_sem_carregar(agg, ultimas_cargas):
+    """driver_id → dias desde a última carga. Sem o índice global
+    (ultimas_cargas), vale a última carga que aparece nos agregados."""
+    if ultimas_cargas is None:
+        ultimas_cargas = (
+            agg.loc[agg["ultima_carga"].notna(), ["driver_id", "ultima_carga"]]
+            .groupby("driver_id", as_index=False)["ultima_carga"].max()
+        )
+
+    return pd.DataFrame({
+        "driver_id": ultimas_cargas["driver_id"],
+        "dias_sem_carregar": dias_desde(ultimas_cargas["ultima_carga"]),
+    })
+
+
+def _pontuar(agg, base_motoristas, chaves, ultimas_cargas=None):
+    """
+    Regra do rodízio sobre os agregados, por chave. Com semana nas
+    chaves, todo o cadastro entra em todas as semanas com disponibilidade.
+    dias_sem_carregar é por motorista (última carga em todo o histórico
+    quando ultimas_cargas é passado), igual em todas as semanas.
+    """
+    agg = decategorize(agg)
+    por_semana = "semana" in chaves
 
     # ==================================================
     # BASE DO RODÍZIO = DISP + CADASTRO
     # ==================================================
-    base_disp = disp[[
-        "driver_id",
+    base_disp = agg.loc[agg["disp_total"] > 0, chaves + [
         "driver_name",
-        "turno_ofertado"
-    ]].copy()
+        "disp_am",
+        "disp_sd",
+        "disp_total"
+    ]]
 
     if base_motoristas is not None:
-        base_cad = base_motoristas[[
+        base_cad = decategorize(preparar_historico(base_motoristas)[[
             "driver_id",
             "driver_name",
             "turno"
-        ]].copy()
+        ]])
 
         base_cad = base_cad.rename(columns={"turno": "turno_base"})
-        base_cad["turno_ofertado"] = pd.NA
+        base_cad[["disp_am", "disp_sd", "disp_total"]] = 0
+
+        if por_semana:
+            base_cad = base_cad.merge(
+                base_disp[["semana"]].drop_duplicates(),
+                how="cross"
+            )
 
         base = pd.concat(
             [base_disp, base_cad],
             ignore_index=True
         )
     else:
-        base = base_disp
+        base = base_disp.copy()
         base["turno_base"] = pd.NA
 
-    # ==================================================
-    # DISPONIBILIDADE POR TURNO
-    # ==================================================
-    base["disp_am"] = (base["turno_ofertado"] == "AM").astype(int)
-    base["disp_sd"] = (base["turno_ofertado"] == "SD").astype(int)
-
     # ==================================================
     # AGREGAÇÃO — 1 LINHA POR DRIVER
     # ==================================================
-    disp_agg = base.groupby("driver_id", as_index=False).agg(
+    disp_agg = base.groupby(chaves, as_index=False).agg(
         driver_name=("driver_name", "first"),
         turno_base=("turno_base", "first"),
         disp_am=("disp_am", "sum"),
         disp_sd=("disp_sd", "sum"),
-        disp_total=("turno_ofertado", "count")
+        disp_total=("disp_total", "sum")
     )
 
     # ==================================================
     # TURNO PREDOMINANTE / REFERÊNCIA
     # ==================================================
-    disp_agg["turno_predominante"] = disp_agg.apply(
-        lambda r: "AM" if r["disp_am"] >= r["disp_sd"] else "SD",
-        axis=1
-    )
+    disp_agg["turno_predominante"] = "SD"
+    disp_agg.loc[
+        disp_agg["disp_am"] >= disp_agg["disp_sd"],
+        "turno_predominante"
+    ] = "AM"
 
     disp_agg["turno_referencia"] = disp_agg["turno_base"]
     disp_agg.loc[
@@ -94,97 +232,59 @@ def consolidar_rodizio(
     ] = disp_agg["turno_predominante"]
 
     # ==================================================
-    # CARREGAMENTOS (GRANULAR + MERGE)
+    # CARREGAMENTOS NO TURNO DE REFERÊNCIA
     # ==================================================
-    if not carg.empty:
-        carg = carg.merge(
-            disp_agg[["driver_id", "turno_referencia"]],
-            on="driver_id",
-            how="left"
-        )
-
-        carg["carg_no_turno"] = (
-            carg["turno_carregamento"] == carg["turno_referencia"]
-        ).astype(int)
-
-        carg["carg_am"] = (carg["turno_carregamento"] == "AM").astype(int)
-        carg["carg_sd"] = (carg["turno_carregamento"] == "SD").astype(int)
-
-        carg_agg = carg.groupby("driver_id", as_index=False).agg(
-            carg_total=("task_id", "count"),
-            carg_no_turno=("carg_no_turno", "sum"),
-            carg_am=("carg_am", "sum"),
-            carg_sd=("carg_sd", "sum")
-        )
-    else:
-        carg_agg = pd.DataFrame(
-            columns=[
-                "driver_id",
-                "carg_total",
-                "carg_no_turno",
-                "carg_am",
-                "carg_sd"
-            ]
-        )
-
-    # ==================================================
-    # DEV / CANC / REC
-    # ==================================================
-    dev_agg = (
-        dev.groupby("driver_id", as_index=False)
-        .agg(devolucoes=("qtd_pacotes", "sum"))
-        if not dev.empty else pd.DataFrame(columns=["driver_id", "devolucoes"])
-    )
-
-    canc_agg = (
-        canc.groupby("driver_id", as_index=False)
-        .size()
-        .rename(columns={"size": "cancelamentos"})
-        if not canc.empty else pd.DataFrame(columns=["driver_id", "cancelamentos"])
+    carg_agg = agg.loc[agg["carg_total"] > 0, chaves + [
+        "carg_total",
+        "carg_am",
+        "carg_sd"
+    ]].merge(
+        disp_agg[chaves + ["turno_referencia"]],
+        on=chaves,
+        how="left"
     )
 
-    rec_agg = (
-        rec.groupby("driver_id", as_index=False)
-        .size()
-        .rename(columns={"size": "recusas"})
-        if not rec.empty else pd.DataFrame(columns=["driver_id", "recusas"])
-    )
-    # ==================================================
-    # ÚLTIMO CARREGAMENTO / DIAS SEM CARREGAR
-    # ==================================================
-    if not carg.empty and "data" in carg.columns:
-        # Primeiro tenta converter como ano-mês-dia
-        carg["data_dt"] = pd.to_datetime(carg["data"], format="%Y-%m-%d", errors="coerce")
-    
-        # Para os que ficaram NaT, tenta ano-dia-mês
-        mask = carg["data_dt"].isna()
-        carg.loc[mask, "data_dt"] = pd.to_datetime(carg.loc[mask, "data"], format="%Y-%d-%m", errors="coerce")
-    
-        hoje = datetime.today().date()
-    
-        # Última data de carregamento por motorista
-        ultimos = carg.groupby("driver_id", as_index=False)["data_dt"].max()
-    
-        # Diferença em dias
-        ultimos["dias_sem_carregar"] = ultimos["data_dt"].apply(
-            lambda d: (hoje - d.date()).days if pd.notna(d) else None
-        )
-    else:
-        ultimos = pd.DataFrame(columns=["driver_id", "dias_sem_carregar"])
+    carg_agg["carg_no_turno"] = 0
+    carg_agg.loc[carg_agg["turno_referencia"] == "AM", "carg_no_turno"] = carg_agg["carg_am"]
+    carg_agg.loc[carg_agg["turno_referencia"] == "SD", "carg_no_turno"] = carg_agg["carg_sd"]
 
     # ==================================================
     # CONSOLIDAÇÃO FINAL
     # ==================================================
     df = (
         disp_agg
-        .merge(carg_agg, on="driver_id", how="left")
-        .merge(ultimos[["driver_id", "dias_sem_carregar"]], on="driver_id", how="left")
-        .merge(dev_agg, on="driver_id", how="left")
-        .merge(canc_agg, on="driver_id", how="left")
-        .merge(rec_agg, on="driver_id", how="left")
+        .merge(carg_agg[chaves + [
+            "carg_total",
+            "carg_no_turno",
+            "carg_am",
+            "carg_sd"
+        ]], on=chaves, how="left")
+        .merge(
+            agg.loc[agg["devolucoes"] != 0, chaves + ["devolucoes"]],
+            on=chaves, how="left"
+        )
+        .merge(
+            agg.loc[agg["cancelamentos"] > 0, chaves + ["cancelamentos"]],
+            on=chaves, how="left"
+        )
+        .merge(
+            agg.loc[agg["recusas"] > 0, chaves + ["recusas"]],
+            on=chaves, how="left"
+        )
         .fillna(0)
     )
 
+    # ==================================================
+    # ÚLTIMO CARREGAMENTO / DIAS SEM CARREGAR
+    # ==================================================
+    dias = _dias_sem_carregar(agg, ultimas_cargas)
+    ids, dias["driver_id"] = align_ids(df["driver_id"], dias["driver_id"])
+
+    df.insert(
+        df.columns.get_loc("carg_sd") + 1,
+        "dias_sem_carregar",
+        dias.set_index("driver_id")["dias_sem_carregar"].reindex(ids).fillna(0).to_numpy()
+    )
 
     # ==================================================
     # DISP NO PRÓPRIO TURNO
@@ -228,7 +328,72 @@ def consolidar_rodizio(
     df["status_rodizio"] = "ATIVO"
     df.loc[df["disp_total"] == 0, "status_rodizio"] = "SEM DISPONIBILIDADE"
 
+    return df
+
+
+@medido()
+def pontuar_rodizio(agg, base_motoristas=None, ultimas_cargas=None):
+    """Aplica a regra do rodízio sobre os agregados de uma semana"""
+    df = _pontuar(agg, base_motoristas, ["driver_id"], ultimas_cargas)
+
     return (
         df.sort_values("indice_prioridade", ascending=True)
         .reset_index(drop=True)
     )
+
+
+@medido()
+def pontuar_rodizio_multi(agg, base_motoristas=None, ultimas_cargas=None):
+    """Mesma regra, para agregados de várias semanas de uma vez"""
+    return _pontuar(agg, base_motoristas, ["semana", "driver_id"], ultimas_cargas)
+
+
+def fatiar_semana(cubo, semana):
+    """Rodízio de uma semana a partir do cubo semana × driver"""
+    df = cubo[cubo["semana"] == semana].drop(columns="semana")
+
+    return (
+        df.sort_values("indice_prioridade", ascending=True)
+        .reset_index(drop=True)
+    )
+
+
+@medido()
+def consolidar_rodizio(
+    disp,
+    carg,
+    dev,
+    canc,
+    rec,
+    base_motoristas=None,
+    ultimas_cargas=None,
+):
+    """
+    Rodízio dos dados passados (ex.: uma semana). Com ultimas_cargas
+    (AggregateStore.last_loads), dias_sem_carregar considera o histórico
+    todo e não só o carregamento passado.
+    """
+    agg = agregar_rodizio(disp, carg, dev, canc, rec)
+    return pontuar_rodizio(agg, base_motoristas, ultimas_cargas)
+
+
+@medido()
+def consolidar_rodizio_multi(
+    disp,
+    carg,
+    dev,
+    canc,
+    rec,
+    base_motoristas=None,
+):
+    """
+    Cubo semana × driver de todo o histórico em uma passada agrupada por
+    (semana, driver_id). Trocar de semana é só fatiar_semana(cubo, semana).
+    """
+    frames = [
+        normalizar_semana(preparar_historico(df))
+        for df in (disp, carg, dev, canc, rec)
+    ]
+
+    agg = agregar_rodizio(*frames, chaves=["semana", "driver_id"])
+    return pontuar_rodizio_multi(agg, base_motoristas)
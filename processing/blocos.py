@@ -0,0 +1,25 @@
+import contextvars
+
+from utils.dates import fixar_formatos_datas
+
+
+def processar_em_blocos(processador, blocos, *args, **kwargs):
+    """
+    Aplica um processar_* a cada bloco do upload, devolvendo os blocos
+    processados sob demanda (só um bloco em memória por vez).
+
+    Duplicados entre blocos não são tratados aqui: o índice de chaves
+    (data.keys) filtra cada bloco contra o que já foi gravado, inclusive
+    pelos blocos anteriores do mesmo upload.
+    """
+    # um contexto para o upload todo: o formato de data inferido no
+    # primeiro bloco vale para os seguintes (utils.dates.fixar_formatos_datas)
+    contexto = contextvars.copy_context()
+    contexto.run(fixar_formatos_datas)
+
+    for bloco in blocos:
+        if bloco.empty:
+            continue
+
+        # bloco processado vazio ainda pode trazer attrs (linhas inválidas)
+        yield contexto.run(processador, bloco, *args, **kwargs)
@@ -2,8 +2,10 @@ import datetime
 from utils.normalize import normalize_columns
 from utils.validation import validar_colunas
 from utils.dates import calcular_semana
+from utils.perf import medido
 
 
+@medido()
 def processar_cancelamento(df):
     # Normaliza colunas
     df = normalize_columns(df)
@@ -16,10 +18,7 @@ def processar_cancelamento(df):
         "turno"
     ])
 
-    # Garante tipo data
-    df["data"] = df["data"].astype(str)
-
-    # Calcula semana
+    # Calcula semana (data de texto ou do Excel)
     df = calcular_semana(df)
 
     # Data de importação (automática)
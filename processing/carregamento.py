@@ -1,6 +1,11 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
+from data.drivers import as_registry
+from utils.dates import formatar_datas, parse_datas
+from utils.perf import medido
+
 
 def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
@@ -14,24 +19,23 @@ def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def identificar_turno_carregamento(create_time: str):
-    if not isinstance(create_time, str):
-        return None
-    try:
-        hora = pd.to_datetime(create_time).hour
-    except Exception:
-        return None
+def identificar_turno_carregamento(create_time: pd.Series) -> pd.Series:
+    hora = create_time.dt.hour
 
-    if 0 <= hora <= 4:
-        return "AM"
-    if 6 <= hora <= 12:
-        return "SD"
-    return None
+    return pd.Series(
+        np.select(
+            [hora.between(0, 4), hora.between(6, 12)],
+            ["AM", "SD"],
+            default=None
+        ).astype(object),
+        index=create_time.index
+    )
 
 
+@medido()
 def processar_carregamento(
     df_raw: pd.DataFrame,
-    base_motoristas: pd.DataFrame
+    base_motoristas
 ) -> pd.DataFrame:
 
     # ===============================
@@ -40,7 +44,7 @@ def processar_carregamento(
     df = df_raw.copy()
     df.columns = df.columns.astype(str).str.strip()
 
-    base_motoristas = normalize_columns(base_motoristas)
+    registro = as_registry(base_motoristas)
 
     # ===============================
     # VALIDAÇÕES
@@ -59,38 +63,24 @@ def processar_carregamento(
             raise ValueError(f"Coluna obrigatória ausente: {col}")
 
     # ===============================
-    # NORMALIZA DATAS ANTES DE DEDUP
-    # ===============================
-    df["delivery_date_norm"] = pd.to_datetime(
-        df["Delivery Date"],
-        errors="coerce"
-    ).dt.strftime("%Y-%m-%d")
-
-    # ===============================
-    # DEDUPLICAÇÃO REAL (RAIZ)
-    # 1 AT / 1 DRIVER / 1 DIA
+    # DEDUPLICAÇÃO (1 LINHA POR AT)
     # ===============================
     df = (
-        df
-        .drop_duplicates(
-            subset=["Task ID", "Driver ID", "delivery_date_norm"],
-            keep="first"
-        )
+        df[df["Task ID"].notna()]
+        .drop_duplicates(subset="Task ID", keep="first")
         .reset_index(drop=True)
     )
 
     # ===============================
-    # CAMPOS DERIVADOS
+    # CAMPOS DERIVADOS (1 PARSE POR COLUNA)
     # ===============================
-    df["data"] = df["delivery_date_norm"]
+    delivery = parse_datas(df["Delivery Date"], coluna="Delivery Date", avisar=True)
 
-    df["semana"] = pd.to_datetime(
-        df["delivery_date_norm"],
-        errors="coerce"
-    ).dt.strftime("%G-W%V")
+    df["data"] = formatar_datas(delivery, "%Y-%m-%d")
+    df["semana"] = formatar_datas(delivery, "%G-W%V")
 
-    df["turno_carregamento"] = df["Create Time"].apply(
-        identificar_turno_carregamento
+    df["turno_carregamento"] = identificar_turno_carregamento(
+        parse_datas(df["Create Time"], coluna="Create Time", avisar=True)
     )
 
     # ===============================
@@ -108,15 +98,8 @@ def processar_carregamento(
     # ===============================
     # ENRIQUECE COM BASE MOTORISTAS
     # ===============================
-    df = df.merge(
-        base_motoristas[["driver_id", "turno"]].rename(
-            columns={"turno": "turno_base"}
-        ),
-        on="driver_id",
-        how="left"
-    )
-
-    df["turno_base"] = df["turno_base"].fillna("N/D")
+    df["driver_id"] = registro.align(df["driver_id"])
+    df["turno_base"] = registro.enrich(df["driver_id"], ["turno"])["turno"].fillna("N/D")
 
     # ===============================
     # FORA DO TURNO
@@ -133,16 +116,6 @@ def processar_carregamento(
     df["data_importacao"] = datetime.now().strftime(
         "%Y-%m-%d %H:%M:%S"
     )
-    # ======================================================
-    # 🔥 DEDUPLICAÇÃO DEFINITIVA (RAIZ DO PROBLEMA)
-    # 1 LINHA POR TASK_ID (NÃO IMPORTA O RESTO)
-    # ======================================================
-    df = (
-        df
-        .sort_values("data_importacao")
-        .groupby("task_id", as_index=False)
-        .first()
-    )
 
     # ===============================
     # RETORNO FINAL
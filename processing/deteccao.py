@@ -0,0 +1,32 @@
+from config.settings import (
+    DISPONIBILIDADE_TAB,
+    CARREGAMENTO_TAB,
+    DEVOLUCOES_TAB,
+    CANCELAMENTO_TAB,
+    RECUSAS_TAB
+)
+
+
+# colunas (já normalizadas: minúsculas, "_" no lugar de espaço) que
+# identificam cada export; a primeira regra que bater vence
+ASSINATURAS = [
+    (DISPONIBILIDADE_TAB, {"driver_id", "cluster", "no_show_time"}),
+    (CARREGAMENTO_TAB, {"task_id", "create_time", "delivery_date"}),
+    (RECUSAS_TAB, {"notification_id", "call-up_time_slot", "driver"}),
+    (DEVOLUCOES_TAB, {"driver_id", "qtd_pacotes", "data"}),
+    (CANCELAMENTO_TAB, {"driver_id", "data", "turno"}),
+]
+
+
+def detectar_tipo(colunas):
+    """Aba de destino do arquivo pelo cabeçalho, ou None se não reconhecer."""
+    normalizadas = {
+        str(c).strip().lower().replace(" ", "_")
+        for c in colunas
+    }
+
+    for nome_tab, obrigatorias in ASSINATURAS:
+        if obrigatorias <= normalizadas:
+            return nome_tab
+
+    return None
@@ -1,12 +1,15 @@
 from utils.normalize import normalize_columns
 from utils.validation import validar_colunas
 from utils.dates import calcular_semana
+from data.drivers import as_registry
+from utils.perf import medido
 from datetime import datetime
 
 
+@medido()
 def processar_devolucoes(df, base_motoristas):
     df = normalize_columns(df)
-    base_motoristas = normalize_columns(base_motoristas)
+    registro = as_registry(base_motoristas)
 
     # ✅ valida só o que vem do arquivo
     validar_colunas(df, [
@@ -19,12 +22,8 @@ def processar_devolucoes(df, base_motoristas):
     df = calcular_semana(df)
 
     # vínculo com base de motoristas
-    df = df.merge(
-        base_motoristas[["driver_id", "turno"]]
-        .rename(columns={"turno": "turno_base"}),
-        on="driver_id",
-        how="left"
-    )
+    df["driver_id"] = registro.align(df["driver_id"])
+    df["turno_base"] = registro.enrich(df["driver_id"], ["turno"])["turno"]
 
     # coluna gerada pelo sistema
     df["data_importacao"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
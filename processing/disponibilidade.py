@@ -1,6 +1,12 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
+from data.drivers import as_registry
+from data.schema import decategorize
+from utils.dates import parse_datas
+from utils.perf import medido
+
 
 # ------------------------------------------------------
 # Helpers
@@ -16,41 +22,42 @@ def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def identificar_turno(valor: str):
+def identificar_turnos(valores: pd.Series) -> pd.Series:
     """
-    Retorna:
+    Classifica a coluna inteira, uma vez por valor distinto:
     - 'AM'
     - 'SD'
     - 'AM+SD'
     - None (quando não disponível)
     """
-    if not isinstance(valor, str):
-        return None
-
-    v = valor.lower()
+    codigos, unicos = pd.factorize(valores)
 
-    if "not available" in v or "pending" in v:
-        return None
+    v = pd.Series(unicos, dtype=object).str.lower()
 
-    tem_am = "05:45" in v or "09:30" in v
-    tem_sd = "12:30" in v or "15:00" in v
+    bloqueado = v.str.contains("not available|pending", regex=True).fillna(False)
+    tem_am = v.str.contains("05:45|09:30", regex=True).fillna(False)
+    tem_sd = v.str.contains("12:30|15:00", regex=True).fillna(False)
 
-    if tem_am and tem_sd:
-        return "AM+SD"
-    if tem_am:
-        return "AM"
-    if tem_sd:
-        return "SD"
+    turnos = np.select(
+        [bloqueado, tem_am & tem_sd, tem_am, tem_sd],
+        [None, "AM+SD", "AM", "SD"],
+        default=None
+    ).astype(object)
 
-    return None
+    return pd.Series(
+        np.append(turnos, None).take(codigos),
+        index=valores.index,
+        dtype=object
+    )
 
 
 # ------------------------------------------------------
 # PROCESSAMENTO PRINCIPAL
 # ------------------------------------------------------
+@medido()
 def processar_disponibilidade(
     df_raw: pd.DataFrame,
-    base_motoristas: pd.DataFrame,
+    base_motoristas,
     base_regiao: pd.DataFrame
 ) -> pd.DataFrame:
 
@@ -60,8 +67,8 @@ def processar_disponibilidade(
     df = df_raw.copy()
     df.columns = df.columns.astype(str).str.strip()
 
-    base_motoristas = normalize_columns(base_motoristas)
-    base_regiao = normalize_columns(base_regiao)
+    registro = as_registry(base_motoristas)
+    base_regiao = decategorize(normalize_columns(base_regiao))
 
     # -------------------------------
     # Validações mínimas
@@ -79,7 +86,7 @@ def processar_disponibilidade(
             raise ValueError(f"Coluna obrigatória ausente no upload: {col}")
 
     for col in ["driver_id", "cep_ofertado", "turno"]:
-        if col not in base_motoristas.columns:
+        if col not in registro.colunas:
             raise ValueError(f"base_motoristas precisa ter a coluna {col}")
 
     for col in ["cluster", "cep_base"]:
@@ -96,44 +103,53 @@ def processar_disponibilidade(
         raise ValueError("Nenhuma coluna de data encontrada após 'No Show Time'")
 
     # -------------------------------
-    # Explodir por data + turno
+    # Wide → long (todas as datas de uma vez)
     # -------------------------------
-    registros = []
+    datas_ref = dict(zip(
+        colunas_data,
+        parse_datas(pd.Series(colunas_data, dtype=object), coluna="colunas de data", avisar=True)
+    ))
+    datas_ref = {col: d for col, d in datas_ref.items() if pd.notna(d)}
 
-    for col_data in colunas_data:
-        data_ref = pd.to_datetime(col_data, errors="coerce")
-        if pd.isna(data_ref):
-            continue
-
-        temp = df[
-            [
-                "Driver ID",
-                "Driver Name",
-                "Cluster",
-                "Vehicle Type",
-                col_data
-            ]
-        ].copy()
+    if not datas_ref:
+        return pd.DataFrame()
 
-        temp["turno_raw"] = temp[col_data].apply(identificar_turno)
-        temp = temp[temp["turno_raw"].notna()]
+    colunas_id = [
+        "Driver ID",
+        "Driver Name",
+        "Cluster",
+        "Vehicle Type"
+    ]
 
-        # 🔥 AM+SD vira duas linhas
-        temp["turno_ofertado"] = temp["turno_raw"].apply(
-            lambda x: ["AM", "SD"] if x == "AM+SD" else [x]
-        )
+    longo = df[colunas_id + list(datas_ref)].melt(
+        id_vars=colunas_id,
+        var_name="col_data",
+        value_name="valor"
+    )
 
-        temp = temp.explode("turno_ofertado").drop(columns=["turno_raw", col_data])
+    longo["turno_raw"] = identificar_turnos(longo["valor"])
 
-        temp["data"] = data_ref.strftime("%Y-%m-%d")
-        temp["semana"] = data_ref.strftime("%G-W%V")
+    # 🔥 AM+SD vira duas linhas (AM antes de SD, na ordem original)
+    tem_am = longo["turno_raw"].isin(["AM", "AM+SD"])
+    tem_sd = longo["turno_raw"].isin(["SD", "AM+SD"])
 
-        registros.append(temp)
+    hist = (
+        pd.concat([
+            longo.loc[tem_am].assign(turno_ofertado="AM"),
+            longo.loc[tem_sd].assign(turno_ofertado="SD")
+        ])
+        .sort_index(kind="stable")
+        .reset_index(drop=True)
+    )
 
-    if not registros:
-        return pd.DataFrame()
+    hist["data"] = hist["col_data"].map(
+        {col: d.strftime("%Y-%m-%d") for col, d in datas_ref.items()}
+    )
+    hist["semana"] = hist["col_data"].map(
+        {col: d.strftime("%G-W%V") for col, d in datas_ref.items()}
+    )
 
-    hist = pd.concat(registros, ignore_index=True)
+    hist = hist.drop(columns=["col_data", "valor", "turno_raw"])
 
     # -------------------------------
     # Normalização de colunas
@@ -148,19 +164,13 @@ def processar_disponibilidade(
     hist = normalize_columns(hist)
 
     # -------------------------------
-    # Merge base_motoristas
+    # Cadastro de motoristas
     # -------------------------------
-    hist = hist.merge(
-        base_motoristas[[
-            "driver_id",
-            "cep_ofertado",
-            "turno"
-        ]].rename(columns={"turno": "turno_base"}),
-        on="driver_id",
-        how="left"
-    )
+    hist["driver_id"] = registro.align(hist["driver_id"])
 
-    hist["turno_base"] = hist["turno_base"].fillna("N/D")
+    cadastro = registro.enrich(hist["driver_id"], ["cep_ofertado", "turno"])
+    hist["cep_ofertado"] = cadastro["cep_ofertado"]
+    hist["turno_base"] = cadastro["turno"].fillna("N/D")
 
     # -------------------------------
     # Merge base_regiao
@@ -181,12 +191,8 @@ def processar_disponibilidade(
         .str[:2]
     )
 
-    hist["cep_base"] = (
-        hist["cep_ofertado"]
-        .astype(str)
-        .str.replace(r"\D", "", regex=True)
-        .str[:2]
-    )
+    # prefixo já calculado no cadastro (o merge acima pode repetir linhas)
+    hist["cep_base"] = registro.enrich(hist["driver_id"], ["cep_prefixo"])["cep_prefixo"]
 
     hist["disponivel"] = hist["cep_motorista"] == hist["cep_base"]
     hist["fora_da_regiao"] = ~hist["disponivel"]
@@ -0,0 +1,53 @@
+import logging
+
+from config.settings import WEEK_INDEXED_TABS
+from data.storage import append_df, PartialAppendError
+from data.keys import filter_new_rows, register_rows
+from data.weeks import ordenar_por_semana
+from metrics.agregados import atualizar_agregados
+from utils.perf import medido
+
+
+logger = logging.getLogger(__name__)
+
+
+def _logar_falha_agregados(nome_tab, erro):
+    logger.warning("Dados salvos em %s, mas os agregados não foram atualizados: %s", nome_tab, erro)
+
+
+@medido()
+def gravar_novos(nome_tab, df, progress=None, ao_falhar_agregados=_logar_falha_agregados):
+    """
+    Filtra duplicados, grava e atualiza índice/agregados; retorna quantas
+    linhas entraram. Mesmo fluxo no app e na CLI.
+    """
+    df_novo = filter_new_rows(nome_tab, df)
+
+    if df_novo.empty:
+        return 0
+
+    if nome_tab in WEEK_INDEXED_TABS:
+        # mesma semana em linhas seguidas: poucas faixas no índice de semanas
+        df_novo = ordenar_por_semana(df_novo)
+
+    try:
+        append_df(nome_tab, df_novo, progress=progress)
+    except PartialAppendError as e:
+        # o que já foi gravado entra no índice, então reenviar não duplica
+        registrar_gravados(nome_tab, df_novo.iloc[:e.rows_sent], ao_falhar_agregados)
+        raise
+
+    registrar_gravados(nome_tab, df_novo, ao_falhar_agregados)
+    return len(df_novo)
+
+
+def registrar_gravados(nome_tab, df, ao_falhar_agregados=_logar_falha_agregados):
+    if df.empty:
+        return
+
+    register_rows(nome_tab, df)
+
+    try:
+        atualizar_agregados(nome_tab, df)
+    except Exception as e:
+        ao_falhar_agregados(nome_tab, e)
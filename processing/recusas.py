@@ -1,67 +1,66 @@
+import re
+
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
 from utils.normalize import normalize_columns
 from utils.validation import validar_colunas
-from utils.dates import calcular_semana
+from utils.dates import calcular_semana, parse_datas
+from data.drivers import as_registry
+from utils.perf import medido
 
 
-def identificar_turno_recusa(valor: str):
-    if not isinstance(valor, str):
-        return None
+# [1414170] FELIPE BOTELHO DA ROCHA → 1414170 / FELIPE BOTELHO DA ROCHA
+PADRAO_DRIVER = re.compile(r"^[^\[]*\[(?P<driver_id>[^\]]*)\](?P<driver_name>[^\]]*)")
 
-    if "05:45" in valor:
-        return "AM"
-    if "12:30" in valor:
-        return "SD"
+# 2026-01-28 12:30 - 15:00 → 2026-01-28
+PADRAO_SLOT = re.compile(r"^(?P<data>\d{4}-\d{2}-\d{2})")
 
-    return None
 
+def extrair_driver(valores: pd.Series) -> pd.DataFrame:
+    """driver_id e driver_name da coluna inteira em um único str.extract."""
+    partes = valores.astype("string").str.extract(PADRAO_DRIVER)
 
-def extrair_data(valor: str):
-    """
-    Extrai a data do Call-up Time Slot
-    Ex: 2026-01-28 12:30 - 15:00 → 2026-01-28
-    """
-    try:
-        return pd.to_datetime(valor[:10]).strftime("%Y-%m-%d")
-    except Exception:
-        return None
+    partes["driver_id"] = partes["driver_id"].str.strip()
+    partes["driver_name"] = partes["driver_name"].str.strip()
 
+    return partes.astype(object)
 
-def extrair_driver_id(valor: str):
-    """
-    [1414170] FELIPE BOTELHO DA ROCHA → 1414170
-    """
-    if not isinstance(valor, str):
-        return None
 
-    if "[" in valor and "]" in valor:
-        return valor.split("[")[1].split("]")[0].strip()
-
-    return None
-
-
-def extrair_driver_name(valor: str):
+def extrair_slot(valores: pd.Series) -> pd.DataFrame:
     """
-    [1414170] FELIPE BOTELHO DA ROCHA → FELIPE BOTELHO DA ROCHA
+    Data (uma vez por dia distinto) e turno do Call-up Time Slot:
+    '05:45' → AM, '12:30' → SD.
     """
-    if not isinstance(valor, str):
-        return None
+    texto = valores.astype("string")
 
-    if "]" in valor:
-        return valor.split("]")[1].strip()
+    # slots sem data casando com o padrão já saem como linhas inválidas
+    data = parse_datas(texto.str.extract(PADRAO_SLOT)["data"])
 
-    return None
+    turno = np.select(
+        [
+            texto.str.contains("05:45", regex=False).fillna(False).to_numpy(bool),
+            texto.str.contains("12:30", regex=False).fillna(False).to_numpy(bool)
+        ],
+        ["AM", "SD"],
+        default=None
+    ).astype(object)
+
+    return pd.DataFrame(
+        {"data": data, "turno_recusa": turno},
+        index=valores.index
+    )
 
 
-def processar_recusas(df: pd.DataFrame, base_motoristas: pd.DataFrame) -> pd.DataFrame:
+@medido()
+def processar_recusas(df: pd.DataFrame, base_motoristas) -> pd.DataFrame:
 
     # -------------------------------
     # Normalização
     # -------------------------------
     df = normalize_columns(df)
-    base_motoristas = normalize_columns(base_motoristas)
+    registro = as_registry(base_motoristas)
 
     # -------------------------------
     # Validação mínima
@@ -73,40 +72,43 @@ def processar_recusas(df: pd.DataFrame, base_motoristas: pd.DataFrame) -> pd.Dat
     ])
 
     # -------------------------------
-    # Extrações principais
+    # Extrações principais (1 passada por coluna)
     # -------------------------------
-    df["driver_id"] = df["driver"].apply(extrair_driver_id)
-    df["driver_name"] = df["driver"].apply(extrair_driver_name)
+    df[["driver_id", "driver_name"]] = extrair_driver(df["driver"])
+    df[["data", "turno_recusa"]] = extrair_slot(df["call-up_time_slot"])
+
+    # Linhas fora do padrão são separadas e reportadas de uma vez
+    motivo = pd.Series(
+        np.select(
+            [
+                df["driver_id"].isna().to_numpy(),
+                df["data"].isna().to_numpy(),
+                df["turno_recusa"].isna().to_numpy()
+            ],
+            ["driver sem [id]", "slot sem data", "slot sem turno AM/SD"],
+            default=""
+        ),
+        index=df.index
+    )
+    validas = motivo == ""
 
-    df["turno_recusa"] = df["call-up_time_slot"].apply(identificar_turno_recusa)
-    df["data"] = df["call-up_time_slot"].apply(extrair_data)
+    invalidas = df.loc[~validas, ["notification_id", "driver", "call-up_time_slot"]]
+    invalidas = invalidas.assign(motivo=motivo[~validas])
 
-    # Remove linhas inválidas
-    df = df[
-        df["driver_id"].notna() &
-        df["data"].notna() &
-        df["turno_recusa"].notna()
-    ]
+    df = df[validas]
 
     # -------------------------------
     # Semana
     # -------------------------------
     df = calcular_semana(df)
-    # Padronizar driver_id como string nos dois DataFrames
-    df["driver_id"] = df["driver_id"].astype(str)
-    base_motoristas["driver_id"] = base_motoristas["driver_id"].astype(str)
+    # Mesmo tipo de id (schema) do cadastro
+    df["driver_id"] = registro.align(df["driver_id"])
 
     # -------------------------------
-    # Merge com base_motoristas
+    # Turno do cadastro de motoristas
     # -------------------------------
-    df = df.merge(
-        base_motoristas[["driver_id", "turno"]],
-        on="driver_id",
-        how="left"
-    )
-
-    df = df.rename(columns={"turno": "turno_base"})
-    df["turno_base"] = df["turno_base"].fillna("N/D")
+    df["turno_base"] = registro.enrich(df["driver_id"], ["turno"])["turno"].fillna("N/D")
+    df = df.reset_index(drop=True)
 
     # -------------------------------
     # Data de importação
@@ -116,7 +118,7 @@ def processar_recusas(df: pd.DataFrame, base_motoristas: pd.DataFrame) -> pd.Dat
     # -------------------------------
     # Seleção final
     # -------------------------------
-    return df[
+    df = df[
         [
             "notification_id",
             "driver_id",
@@ -128,3 +130,6 @@ def processar_recusas(df: pd.DataFrame, base_motoristas: pd.DataFrame) -> pd.Dat
             "data_importacao"
         ]
     ]
+
+    df.attrs["linhas_invalidas"] = invalidas.reset_index(drop=True)
+    return df
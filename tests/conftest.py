@@ -0,0 +1,26 @@
+import pandas as pd
+import pytest
+
+from data import storage
+
+
+@pytest.fixture
+def fake_backend(tmp_path, monkeypatch):
+    """FakeSheetsBackend sem latência nem cota; estado local (.cache) no tmp."""
+    monkeypatch.chdir(tmp_path)
+
+    anterior = storage._backend
+    backend = storage.FakeSheetsBackend(latency=0, reads_per_minute=0, writes_per_minute=0)
+    storage.set_backend(backend)
+
+    yield backend
+
+    storage.set_backend(anterior)
+
+
+def linhas_recusas(n, inicio=0):
+    return pd.DataFrame({
+        "driver_id": [str(1000 + i) for i in range(inicio, inicio + n)],
+        "data": ["03/03/2026"] * n,
+        "semana": ["2026-W10"] * n,
+    })
@@ -0,0 +1,55 @@
+import time
+
+import pandas as pd
+
+from config.settings import DISPONIBILIDADE_TAB, DEVOLUCOES_TAB
+from data import sheets
+from data.serializer import iter_rows
+from processing.gravacao import gravar_novos
+import metrics.agregados as agregados
+
+
+def disponibilidade(ids, dia="2025-01-06"):
+    n = len(ids)
+    return pd.DataFrame({
+        "driver_id": ids,
+        "driver_name": ["x"] * n,
+        "cluster": ["SP"] * n,
+        "vehicle_type": ["v"] * n,
+        "data": [dia] * n,
+        "semana": ["2025-W02"] * n,
+        "turno_ofertado": ["AM"] * n,
+    })
+
+
+def test_conferencia_le_so_as_linhas_novas(fake_backend, monkeypatch):
+    monkeypatch.setattr(sheets, "VERSION_PROBE_SECONDS", 0)
+    fake = fake_backend.spreadsheet
+    fake_backend.seed({
+        DISPONIBILIDADE_TAB: disponibilidade([1, 2]),
+        DEVOLUCOES_TAB: pd.DataFrame(columns=["driver_id", "qtd_pacotes", "data", "semana"]),
+    })
+
+    assert len(agregados.ler_agregados()) == 2
+
+    reconstrucoes = []
+    monkeypatch.setattr(
+        agregados, "reconstruir_agregados", lambda: reconstrucoes.append(1)
+    )
+
+    # conferir o store nunca relê o histórico inteiro
+    def sem_historico(*args, **kwargs):
+        raise AssertionError("load_tabs chamado para conferir os agregados")
+    monkeypatch.setattr(agregados, "load_tabs", sem_historico)
+
+    gravar_novos(DISPONIBILIDADE_TAB, disponibilidade([3]))
+    time.sleep(0.01)
+    assert len(agregados.ler_agregados()) == 3
+    assert reconstrucoes == []
+
+    # linhas gravadas por fora do app: o store precisa ser refeito
+    linhas = [r for bloco in iter_rows(disponibilidade([4, 5])) for r in bloco]
+    fake._append(DISPONIBILIDADE_TAB, linhas)
+    time.sleep(0.01)
+    agregados.ler_agregados()
+    assert reconstrucoes == [1]
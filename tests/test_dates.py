@@ -0,0 +1,19 @@
+import pandas as pd
+
+from utils.dates import coletar_avisos_datas, parse_datas
+
+
+def test_iso_com_dias_ate_12_avisa_ambiguidade():
+    with coletar_avisos_datas() as avisos:
+        datas = parse_datas(pd.Series(["2026-03-04", "2026-05-06"]), coluna="data", avisar=True)
+
+    assert datas.dt.month.tolist() == [3, 5]
+    assert len(avisos) == 1
+    assert "ambígua" in avisos[0] and "mês/dia" in avisos[0]
+
+
+def test_iso_sem_ambiguidade_nao_avisa():
+    with coletar_avisos_datas() as avisos:
+        parse_datas(pd.Series(["2026-03-14", "2026-05-06"]), coluna="data", avisar=True)
+
+    assert avisos == []
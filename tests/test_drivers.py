@@ -0,0 +1,41 @@
+import pandas as pd
+
+from data.drivers import DriverRegistry
+from processing.disponibilidade import processar_disponibilidade
+
+
+BASE = pd.DataFrame({
+    "driver_id": [10, 20],
+    "turno": ["AM", "SD"],
+    "cep_ofertado": ["01310-100", None],
+})
+
+
+def test_driver_fora_do_cadastro_tem_prefixo_vazio():
+    registro = DriverRegistry(BASE)
+    ids = registro.align(pd.Series([10, 20, 99]))
+
+    cadastro = registro.enrich(ids, ["turno", "cep_prefixo"])
+
+    assert cadastro["cep_prefixo"].tolist() == ["01", "", ""]
+    assert cadastro["turno"].iloc[:2].tolist() == ["AM", "SD"]
+    assert pd.isna(cadastro["turno"].iloc[2])
+
+
+def test_disponibilidade_de_driver_desconhecido():
+    upload = pd.DataFrame({
+        "Driver ID": [10, 99],
+        "Driver Name": ["a", "b"],
+        "Cluster": ["01-SP", "01-SP"],
+        "Vehicle Type": ["moto", "moto"],
+        "No Show Time": [0, 0],
+        "03/03/2026": ["05:45 - 09:30", "05:45 - 09:30"],
+    })
+    regiao = pd.DataFrame({"cluster": ["01-SP"], "cep_base": ["01000-000"]})
+
+    df = processar_disponibilidade(upload, BASE, regiao).set_index("driver_id")
+
+    assert df.loc[99, "turno_base"] == "N/D"
+    assert df.loc[99, "cep_base"] == ""
+    assert not df.loc[99, "disponivel"]
+    assert df.loc[10, "disponivel"]
@@ -0,0 +1,54 @@
+from config.settings import RECUSAS_TAB, CANCELAMENTO_TAB
+from data import sheets, storage
+from tests.conftest import linhas_recusas
+
+
+def test_espelho_se_refaz_quando_a_aba_encolhe(fake_backend):
+    fake = fake_backend.spreadsheet
+    fake_backend.seed({
+        RECUSAS_TAB: linhas_recusas(10),
+        CANCELAMENTO_TAB: linhas_recusas(3),
+    })
+
+    storage.read_tabs([RECUSAS_TAB, CANCELAMENTO_TAB])
+    assert sheets.get_mirror().state(RECUSAS_TAB)[1] == 10
+
+    # linhas apagadas direto na planilha: a busca incremental sai da grade
+    with fake._lock:
+        del fake._tabs[RECUSAS_TAB][-6:]
+    fake._touch()
+    storage.invalidate()
+
+    frames = storage.read_tabs([RECUSAS_TAB, CANCELAMENTO_TAB])
+    assert len(frames[RECUSAS_TAB]) == 4
+    assert len(frames[CANCELAMENTO_TAB]) == 3
+    assert sheets.get_mirror().state(RECUSAS_TAB)[1] == 4
+
+    # espelho refeito: a próxima leitura volta a ser um batch incremental
+    fake._touch()
+    storage.invalidate()
+    leituras = fake.stats()["read"]
+
+    assert len(storage.read_tabs([RECUSAS_TAB, CANCELAMENTO_TAB])[RECUSAS_TAB]) == 4
+    assert fake.stats()["read"] - leituras == 1
+
+
+def test_aba_inexistente_e_vazia_sem_erro(fake_backend, monkeypatch):
+    erros = []
+    monkeypatch.setattr(sheets, "_report_error", erros.append)
+
+    df = storage.read_tab(RECUSAS_TAB, strict=True)
+
+    assert df.empty
+    assert erros == []
+
+
+def test_gravar_descarta_as_semanas_da_aba_em_cache(fake_backend, monkeypatch):
+    # versão da planilha parada: só a invalidação do append tira a semana do cache
+    monkeypatch.setattr(sheets, "spreadsheet_version", lambda: "v1")
+    fake_backend.seed({RECUSAS_TAB: linhas_recusas(3)})
+    assert len(storage.read_tab_week(RECUSAS_TAB, "2026-W10")) == 3
+
+    storage.append_df(RECUSAS_TAB, linhas_recusas(2, inicio=3))
+
+    assert len(storage.read_tab_week(RECUSAS_TAB, "2026-W10")) == 5
@@ -0,0 +1,22 @@
+import pandas as pd
+
+from config.settings import RECUSAS_TAB
+from data import storage
+from tests.conftest import linhas_recusas
+
+
+def test_local_append_e_leitura(tmp_path):
+    backend = storage.LocalBackend(str(tmp_path / "rodizio.sqlite"))
+
+    backend.append_df(RECUSAS_TAB, linhas_recusas(3))
+    outra_semana = linhas_recusas(2, inicio=3).assign(data="10/03/2026", semana="2026-W11")
+    backend.append_df(RECUSAS_TAB, outra_semana)
+
+    df = backend.read_tabs([RECUSAS_TAB])[RECUSAS_TAB]
+    assert df["driver_id"].tolist() == [1000, 1001, 1002, 1003, 1004]
+    assert backend.tab_rows([RECUSAS_TAB]) == {RECUSAS_TAB: 5}
+
+    semana = backend.read_tab_week(RECUSAS_TAB, "2026-W11")
+    assert semana["driver_id"].tolist() == [1003, 1004]
+
+    assert backend.read_tabs(["nao_existe"])["nao_existe"].empty
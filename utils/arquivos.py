@@ -0,0 +1,71 @@
+import pandas as pd
+from openpyxl import load_workbook
+
+from utils.perf import medido
+
+
+@medido()
+def ler_arquivo(file):
+    return pd.read_csv(file) if file.name.lower().endswith(".csv") else pd.read_excel(file)
+
+
+def ler_arquivo_em_blocos(file, linhas_por_bloco):
+    """
+    Lê o upload em blocos de até `linhas_por_bloco` linhas, sem carregar
+    o arquivo inteiro: CSV via read_csv(chunksize), XLSX linha a linha
+    com o openpyxl em modo read_only.
+    """
+    if file.name.lower().endswith(".csv"):
+        with pd.read_csv(file, chunksize=linhas_por_bloco) as leitor:
+            yield from leitor
+        return
+
+    yield from _xlsx_em_blocos(file, linhas_por_bloco)
+
+
+def _xlsx_em_blocos(file, linhas_por_bloco):
+    wb = load_workbook(file, read_only=True, data_only=True)
+
+    try:
+        linhas = wb.worksheets[0].iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+
+        if cabecalho is None:
+            return
+
+        # mesmo critério do read_excel: colunas sem nome viram "Unnamed: i"
+        cabecalho = [
+            f"Unnamed: {i}" if c is None else c
+            for i, c in enumerate(cabecalho)
+        ]
+
+        largura = len(cabecalho)
+        bloco = []
+        for linha in linhas:
+            # linhas totalmente vazias são descartadas, como no read_excel
+            if all(v is None for v in linha):
+                continue
+
+            bloco.append(linha[:largura] + (None,) * (largura - len(linha)))
+
+            if len(bloco) >= linhas_por_bloco:
+                yield pd.DataFrame(bloco, columns=cabecalho)
+                bloco = []
+
+        if bloco:
+            yield pd.DataFrame(bloco, columns=cabecalho)
+    finally:
+        wb.close()
+
+
+def ler_cabecalho(file):
+    """Só os nomes das colunas do upload (sem ler as linhas)."""
+    if file.name.lower().endswith(".csv"):
+        return list(pd.read_csv(file, nrows=0).columns)
+
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        linha = next(wb.worksheets[0].iter_rows(max_row=1, values_only=True), ())
+        return [c for c in linha if c is not None]
+    finally:
+        wb.close()
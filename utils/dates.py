@@ -1,7 +1,289 @@
+import contextvars
+import datetime
+import logging
+from contextlib import contextmanager
+
+import numpy as np
 import pandas as pd
 
 
+logger = logging.getLogger(__name__)
+
+# Formatos candidatos, em ordem de preferência (ver parse_datas). Dia antes
+# de mês nos formatos com barra (exports e modelos brasileiros); o
+# "%Y-%d-%m" cobre datas antigas do carregamento gravadas invertidas.
+FORMATOS_DATA = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%d/%m/%Y",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%m/%d/%Y",
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y %H:%M",
+    "%Y-%d-%m",
+]
+
+# Leitura com dia e mês trocados: se ela também lê a coluna inteira, as
+# datas em que as duas discordam são ambíguas (e são avisadas)
+TROCA_DIA_MES = {
+    "%Y-%m-%d": "%Y-%d-%m",
+    "%d/%m/%Y": "%m/%d/%Y",
+    "%d/%m/%Y %H:%M:%S": "%m/%d/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M": "%m/%d/%Y %H:%M",
+}
+
+_avisos = contextvars.ContextVar("avisos_datas", default=None)
+_formatos = contextvars.ContextVar("formatos_datas", default=None)
+
+
+# =====================================================
+# AVISOS (EM LOTE, POR COLUNA)
+# =====================================================
+@contextmanager
+def coletar_avisos_datas():
+    """Junta numa lista os avisos de datas do bloco (ex.: para mostrar no
+    app); fora de um coletor eles vão para o log."""
+    avisos = []
+    token = _avisos.set(avisos)
+    try:
+        yield avisos
+    finally:
+        _avisos.reset(token)
+
+
+def _avisar(mensagem):
+    avisos = _avisos.get()
+    if avisos is None:
+        logger.warning(mensagem)
+    else:
+        avisos.append(mensagem)
+
+
+def _exemplos(valores, n=3):
+    return ", ".join(map(str, valores[:n]))
+
+
+def _avisar_valores(coluna, texto, codigos, problema, consequencia):
+    """Um aviso para todos os valores distintos em `texto` (índices dos únicos)."""
+    if texto.empty:
+        return
+
+    linhas = int(np.isin(codigos, texto.index.to_numpy()).sum())
+    _avisar(
+        f"{coluna or 'datas'}: {linhas} linhas com {problema} "
+        f"({len(texto)} valores distintos, ex.: {_exemplos(texto.tolist())}); {consequencia}"
+    )
+
+
+# =====================================================
+# FORMATO FIXO POR COLUNA (UPLOAD EM BLOCOS)
+# =====================================================
+def fixar_formatos_datas():
+    """
+    A partir daqui, no contexto atual, o formato inferido para cada coluna
+    (parse_datas com `coluna`) é o primeiro a ser tentado nas próximas
+    chamadas da mesma coluna. Os blocos de um upload lido em partes são
+    então lidos do mesmo jeito: um bloco em que todo dia é ≤ 12 não vira
+    mês/dia no meio do arquivo. Chamar dentro de um contexto próprio
+    (contextvars.copy_context().run).
+    """
+    _formatos.set({})
+
+
+# =====================================================
+# PARSE (UMA VEZ POR VALOR DISTINTO)
+# =====================================================
+def _ler(texto, formato):
+    return pd.to_datetime(texto, format=formato, errors="coerce")
+
+
+def _inferir(texto, formatos=FORMATOS_DATA):
+    # a amostra descarta rápido os formatos que nem começam a servir; só
+    # os que a leem são testados na coluna toda (valores distintos)
+    amostra = texto.iloc[:20]
+
+    for formato in formatos:
+        if not _ler(amostra, formato).notna().all():
+            continue
+
+        datas = _ler(texto, formato)
+        if datas.notna().all():
+            return formato, datas
+
+    return None, None
+
+
+def parse_datas(serie, coluna=None, avisar=False):
+    """
+    Coluna de datas → datetime64, parseando cada valor distinto uma vez.
+
+    O formato é inferido uma vez para a coluna: o primeiro de FORMATOS_DATA
+    que lê todos os valores distintos. Coluna com formatos misturados: cada
+    formato só é aplicado ao que o anterior não resolveu, e o resto vai
+    para o parse livre com dia primeiro.
+    Valores que não são data viram NaT.
+
+    Com avisar=True (uploads), datas ambíguas entre dia/mês e mês/dia e
+    valores que não são data geram um aviso por coluna (coletar_avisos_datas
+    ou log), em vez de serem convertidos em silêncio.
+
+    Depois de fixar_formatos_datas, o formato que a coluna já teve vem
+    antes dos demais (mesma leitura em todos os blocos do upload).
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+
+    codigos, unicos = pd.factorize(serie)
+    texto = pd.Series(unicos, dtype=object).astype(str).str.strip()
+    preenchido = texto[texto.ne("")]
+
+    fixos = _formatos.get() if coluna is not None else None
+    formatos = FORMATOS_DATA
+    if fixos is not None and coluna in fixos:
+        formatos = [fixos[coluna]] + [f for f in FORMATOS_DATA if f != fixos[coluna]]
+
+    datas = pd.Series(pd.NaT, index=texto.index, dtype="datetime64[ns]")
+    formato, lidas = _inferir(preenchido, formatos)
+
+    # formato vindo de um bloco anterior do upload: os valores já não são
+    # ambíguos no arquivo, não repetem o aviso
+    herdado = fixos is not None and fixos.get(coluna) == formato
+
+    if fixos is not None and formato is not None and not preenchido.empty:
+        fixos.setdefault(coluna, formato)
+
+    if formato is not None:
+        datas[preenchido.index] = lidas
+
+        troca = TROCA_DIA_MES.get(formato)
+        if avisar and troca is not None and not herdado:
+            trocadas = _ler(preenchido, troca)
+            if trocadas.notna().all():
+                _avisar_valores(
+                    coluna, preenchido[trocadas != datas[preenchido.index]], codigos,
+                    "data ambígua entre dia/mês e mês/dia",
+                    "lidas como dia/mês" if formato.startswith("%d") else "lidas como mês/dia"
+                )
+    else:
+        for formato in formatos:
+            faltando = datas.isna()
+            if not faltando.any():
+                break
+            datas[faltando] = _ler(texto[faltando], formato)
+
+        faltando = datas.isna() & texto.ne("")
+        if faltando.any():
+            datas[faltando] = pd.to_datetime(
+                texto[faltando],
+                format="mixed",
+                dayfirst=True,
+                errors="coerce"
+            )
+
+        if avisar:
+            _avisar_valores(
+                coluna, texto[datas.isna() & texto.ne("")], codigos,
+                "valor que não é data", "ficaram sem data"
+            )
+
+    return pd.Series(
+        datas.array.take(codigos, allow_fill=True),
+        index=serie.index,
+        name=serie.name
+    )
+
+
+def formatar_datas(datas, formato):
+    """strftime uma vez por data distinta (o strftime do pandas é linha a
+    linha); NaT → NaN."""
+    codigos, unicos = pd.factorize(datas)
+    texto = pd.Series(unicos, dtype=datas.dtype).dt.strftime(formato)
+
+    return pd.Series(
+        texto.array.take(codigos, allow_fill=True),
+        index=datas.index,
+        name=datas.name
+    )
+
+
+def dias_desde(datas, hoje=None):
+    """Dias inteiros de cada data até `hoje` (padrão: hoje), em aritmética
+    de datetime64[D] sobre a coluna inteira; sem data → NaN."""
+    hoje = np.datetime64(hoje or datetime.date.today(), "D")
+    dias = parse_datas(pd.Series(datas)).to_numpy(dtype="datetime64[D]")
+
+    return pd.Series(
+        np.where(np.isnat(dias), np.nan, (hoje - dias).astype(np.int64)),
+        index=getattr(datas, "index", None)
+    )
+
+
 def calcular_semana(df, coluna_data="data"):
-    df[coluna_data] = pd.to_datetime(df[coluna_data])
-    df["semana"] = df[coluna_data].dt.isocalendar().week
+    # mesmo padrão 'YYYY-Www' de disponibilidade/carregamento, assim o
+    # histórico novo já chega normalizado para normalizar_semana
+    df[coluna_data] = parse_datas(df[coluna_data], coluna=coluna_data, avisar=True)
+    df["semana"] = formatar_datas(df[coluna_data], "%G-W%V")
+    return df
+
+
+def normalizar_semana(df, coluna="semana", coluna_data="data"):
+    """
+    Padroniza a coluna de semana para 'YYYY-Www', coluna inteira de uma vez.
+
+    - 'YYYY-Www' → mantém
+    - número de semana (legado) → ano da coluna de data + '-W' + semana
+      (ano corrente quando a data está vazia)
+    - qualquer outra coisa → None
+
+    As datas são parseadas uma vez por valor distinto, não por linha.
+    """
+    if df.empty or coluna not in df.columns:
+        return df
+
+    df = df.copy()
+
+    # semana também por valor distinto: com a coluna categórica (schema)
+    # o texto não é materializado linha a linha
+    codigos_semana, semanas = pd.factorize(df[coluna])
+    texto = pd.Series(semanas, dtype=object).astype(str).str.strip()
+
+    iso_unicos = texto.str.contains("-W", regex=False)
+    numero_unicos = pd.to_numeric(
+        texto.where(~iso_unicos & texto.str.fullmatch(r"[+-]?\d+")),
+        errors="coerce"
+    )
+
+    validos = codigos_semana >= 0
+    iso = validos & iso_unicos.to_numpy().take(codigos_semana, mode="clip")
+    legado = validos & numero_unicos.notna().to_numpy().take(codigos_semana, mode="clip")
+
+    ano_atual = datetime.datetime.now().year
+
+    if coluna_data in df.columns:
+        codigos, unicos = pd.factorize(df[coluna_data])
+        anos_unicos = parse_datas(pd.Series(unicos)).dt.year.to_numpy()
+
+        ano = pd.Series(
+            anos_unicos.take(codigos, mode="clip") if len(unicos) else ano_atual,
+            index=df.index,
+            dtype="Float64"
+        )
+        ano = ano.mask(codigos == -1, ano_atual)
+    else:
+        ano = pd.Series(ano_atual, index=df.index, dtype="Float64")
+
+    legado &= ano.notna().to_numpy()
+
+    semana = np.full(len(df), None, dtype=object)
+    semana[iso] = texto.to_numpy()[codigos_semana[iso]]
+    semana[legado] = (
+        ano[legado].astype("Int64").astype(str).to_numpy()
+        + "-W"
+        + pd.Series(numero_unicos.to_numpy()[codigos_semana[legado]])
+        .astype("Int64").astype(str).str.zfill(2).to_numpy()
+    )
+
+    df[coluna] = semana
     return df
@@ -3,7 +3,7 @@ import pandas as pd
 def normalize_columns(df):
     df = df.copy()
     df.columns = (
-        df.columns
+        df.columns.astype(str)
         .str.strip()
         .str.lower()
         .str.replace(" ", "_")
@@ -0,0 +1,165 @@
+"""
+Instrumentação leve por etapa: duração, linhas e bytes.
+
+    with medir("ler_arquivo") as span:
+        df = ler_arquivo(arquivo)
+        span.registrar(df)
+
+    @medido("processar_carregamento")
+    def processar_carregamento(df_raw, base_motoristas): ...
+
+Os spans vão para o coletor ativo no contexto (um por execução do
+script, ver iniciar_coleta); sem coletor, medir só custa dois
+perf_counter. RODIZIO_PROFILE=1 liga também o cProfile da execução.
+"""
+import contextvars
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+from config.settings import PERF_PROFILE_ENV, PROFILES_DIR
+
+
+_coletor = contextvars.ContextVar("perf_coletor", default=None)
+_nivel = contextvars.ContextVar("perf_nivel", default=0)
+
+
+class Span:
+    __slots__ = ("etapa", "inicio", "segundos", "nivel", "linhas_entrada", "linhas", "bytes")
+
+    def __init__(self, etapa, nivel):
+        self.etapa = etapa
+        self.nivel = nivel
+        self.inicio = time.time()
+        self.segundos = None
+        self.linhas_entrada = None
+        self.linhas = None
+        self.bytes = None
+
+    def registrar(self, resultado=None, linhas=None, n_bytes=None):
+        """Linhas/bytes da saída da etapa (DataFrame ou valores explícitos)."""
+        if isinstance(resultado, pd.DataFrame):
+            linhas = len(resultado) if linhas is None else linhas
+            n_bytes = _bytes(resultado) if n_bytes is None else n_bytes
+
+        if linhas is not None:
+            self.linhas = int(linhas)
+        if n_bytes is not None:
+            self.bytes = int(n_bytes)
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+def _bytes(df):
+    # memória rasa: barata de medir, subestima colunas de objeto
+    return int(df.memory_usage(index=False).sum())
+
+
+# =====================================================
+# COLETA
+# =====================================================
+def iniciar_coleta():
+    """Novo coletor para o contexto atual; devolve a lista que vai receber os spans."""
+    spans = []
+    _coletor.set(spans)
+    return spans
+
+
+def spans_coletados():
+    return list(_coletor.get() or [])
+
+
+@contextmanager
+def medir(etapa):
+    spans = _coletor.get()
+    nivel = _nivel.get()
+    span = Span(etapa, nivel)
+
+    token = _nivel.set(nivel + 1)
+    inicio = time.perf_counter()
+    try:
+        yield span
+    finally:
+        span.segundos = round(time.perf_counter() - inicio, 4)
+        _nivel.reset(token)
+
+        if spans is not None:
+            spans.append(span)
+
+
+def medido(etapa=None):
+    """Decorator: mede a função, com linhas do 1º DataFrame de entrada e do retorno."""
+    def decorator(func):
+        nome = etapa or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with medir(nome) as span:
+                entrada = next((a for a in args if isinstance(a, pd.DataFrame)), None)
+                if entrada is not None:
+                    span.linhas_entrada = len(entrada)
+
+                resultado = func(*args, **kwargs)
+                span.registrar(resultado)
+                return resultado
+
+        return wrapper
+
+    return decorator
+
+
+# =====================================================
+# EXPORTAÇÃO
+# =====================================================
+def resumo(spans):
+    """DataFrame com um span por linha, na ordem em que começaram
+    (etapa antes das sub-etapas)."""
+    return pd.DataFrame(
+        [s.as_dict() for s in sorted(spans, key=lambda s: s.inicio)],
+        columns=list(Span.__slots__)
+    )
+
+
+def exportar_jsonl(spans):
+    return "\n".join(json.dumps(s.as_dict(), ensure_ascii=False) for s in spans) + "\n"
+
+
+# =====================================================
+# cPROFILE (OPCIONAL)
+# =====================================================
+def perfil_ativo():
+    return os.environ.get(PERF_PROFILE_ENV, "").lower() in ("1", "true", "sim")
+
+
+def iniciar_perfil(ativo=None):
+    """Liga o cProfile se `ativo` (padrão: RODIZIO_PROFILE); None se desligado."""
+    if not (perfil_ativo() if ativo is None else ativo):
+        return None
+
+    perfil = cProfile.Profile()
+    perfil.enable()
+    return perfil
+
+
+def encerrar_perfil(perfil, top=30):
+    """Desliga o cProfile, grava o .prof em PROFILES_DIR e devolve
+    {"arquivo": caminho, "top": texto do pstats por tempo acumulado}."""
+    perfil.disable()
+
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    caminho = os.path.join(PROFILES_DIR, datetime.now().strftime("%Y%m%d-%H%M%S-%f.prof"))
+    perfil.dump_stats(caminho)
+
+    texto = io.StringIO()
+    pstats.Stats(perfil, stream=texto).sort_stats("cumulative").print_stats(top)
+
+    return {"arquivo": caminho, "top": texto.getvalue()}